@@ -1,9 +1,15 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime
-import pickle
-from surprise import SVD
 import os
+import json
+import uuid
+
+# 首屏只导入轻量模块；numpy / pandas / 推荐核心等重量级模块在用到时才导入，
+# 启动后由后台预热线程提前导入并加载数据和模型（见 warmup.py）
+from perf_trace import export_json, export_prometheus, finish_request, stage, start_request, traced
+from profile_options import (ALL_TAGS, GENDERS, OCCUPATIONS, PLATFORMS, READING_TIMES, UNDISCLOSED,
+                             generate_preferred_tags)
+from warmup import WARMUP_ENABLED, start_warmup, wait_for_warmup, warmup_done, warmup_report
 
 # 页面配置（宽屏 + 图标）
 st.set_page_config(
@@ -64,36 +70,24 @@ def inject_custom_css():
     """
     st.markdown(custom_css, unsafe_allow_html=True)
 
-# 平台图标映射
-PLATFORM_ICONS = {
-    "微信读书": "logos/weixin_reading_logo.png",
-    "QQ 阅读": "logos/qq_reading_logo.png",
-    "Kindle 商店": "logos/kindle_store_logo.png",
-    "番茄小说": "logos/tomato_novel_logo.png",
-    "起点读书": "logos/qidian_reading_logo.png",
-}
-
-# 标签列表
-ALL_TAGS = ["玄幻", "都市", "历史", "科幻", "悬疑", "武侠", "穿越", "奇幻", "冒险",
-            "仙侠", "重生", "灵异", "战争", "言情", "搞笑", "无限流", "修真", "系统",
-            "游戏", "娱乐", "异能", "权谋", "修仙", "校园", "江湖", "末世", "异世界"]
+# 会话内评分选项（第一项表示未评分）
+RATING_OPTIONS = ["未评", 1, 2, 3, 4, 5]
 
-# 加载数据
+# 加载数据（进程级缓存，文件变化时才重新解析）
 def load_data():
+    from recommendation import load_catalog_data
     try:
-        user_ratings_df = pd.read_csv('data/user_ratings.csv')
-        novels_df = pd.read_csv('data/novels.csv')
-        return user_ratings_df, novels_df
+        return load_catalog_data()
     except Exception as e:
+        import pandas as pd
         st.error(f"加载数据失败：{e}")
         return pd.DataFrame(), pd.DataFrame()
 
-# 加载模型
+# 加载模型（进程级缓存）：优先内存映射已发布的模型产物，没有时退回 pickle
 def load_models():
+    from recommendation import load_svd_model
     try:
-        with open('svd_model.pkl', 'rb') as f:
-            algo_svd = pickle.load(f)
-        return algo_svd
+        return load_svd_model()
     except Exception as e:
         st.error(f"加载模型失败：{e}")
         return None
@@ -103,208 +97,179 @@ def get_new_user_data():
     st.subheader("基础信息", anchor=False)
     col1, col2 = st.columns(2)
     with col1:
-        gender = st.selectbox("性别", ("男", "女", "不想透露"), 
+        gender = st.selectbox("性别", GENDERS, 
                              format_func=lambda x: "保密" if x == "不想透露" else x)
         birth_year = st.number_input("出生年份", min_value=1900, 
                                    max_value=datetime.now().year, value=2000,
                                    key="birth_year")
     with col2:
-        occupation = st.selectbox("职业", ('学生', '上班族', '自由职业者', '退休', '不想透露'))
-        reading_time = st.selectbox("每周阅读时长", (
-            "几乎不阅读", "1-3小时", "4-6小时", "7-10小时", "10小时以上"
-        ))
+        occupation = st.selectbox("职业", OCCUPATIONS)
+        reading_time = st.selectbox("每周阅读时长", READING_TIMES)
     
     st.subheader("阅读偏好", anchor=False)
     col1, col2 = st.columns(2)
     with col1:
-        all_tags = ALL_TAGS + ["不想透露"]
+        all_tags = ALL_TAGS + [UNDISCLOSED]
         favorite_tags = st.multiselect("喜欢的标签", all_tags, 
                                      format_func=lambda x: "不透露" if x == "不想透露" else x)
     with col2:
-        all_platforms = ["微信读书", "QQ 阅读", "Kindle 商店", "番茄小说", "起点读书", "不想透露"]
+        all_platforms = PLATFORMS + [UNDISCLOSED]
         preferred_platform = st.multiselect("常用平台", all_platforms,
                                           format_func=lambda x: "不透露" if x == "不想透露" else x)
     
     return gender, birth_year, occupation, reading_time, favorite_tags, preferred_platform
 
-# 获取平台图标路径
-def get_platform_icon(platform_name):
-    for key, path in PLATFORM_ICONS.items():
-        if key in platform_name or platform_name in key:
-            if os.path.exists(path):
-                return path
-    return "logos/default_logo.png"  # 默认图标
+# 新用户的 fold-in 向量及其评分（画像伪评分 + 会话内评分，KNN 按它现场找邻居），按输入缓存在 session_state 中
+def get_visitor_profile(algo_svd, novels_df, favorite_tags, preferred_platforms):
+    from fold_in import fold_in_visitor
+    from recommendation import recommendation_version
+    from svd_scoring import get_svd_factors
+    if algo_svd is None or novels_df.empty:
+        return None, None
+    factors = get_svd_factors(algo_svd)
+    session_ratings = st.session_state.get('session_ratings', {})
+    # 以模型 / 数据文件版本为键（对象 id 在重新加载后可能被复用）
+    key = (recommendation_version(), tuple(sorted(favorite_tags)), tuple(sorted(preferred_platforms)),
+           tuple(sorted(session_ratings.items())))
+    cached = st.session_state.get('folded_user')
+    if cached is None or cached['key'] != key:
+        folded_user, visitor = fold_in_visitor(factors, novels_df, favorite_tags, preferred_platforms,
+                                               session_ratings)
+        cached = {'key': key, 'user': folded_user, 'visitor': visitor}
+        st.session_state.folded_user = cached
+    return cached['user'], cached['visitor']
 
-# 基于用户画像生成偏好标签（内部逻辑，不展示）
-def generate_preferred_tags(gender, birth_year, occupation, reading_time):
-    preferred_tags = []
-    # 性别偏好
-    if gender == '男':
-        preferred_tags.extend(['玄幻', '科幻', '武侠', '战争'])
-    elif gender == '女':
-        preferred_tags.extend(['言情', '校园', '都市', '重生'])
-    # 年龄偏好
-    age = datetime.now().year - birth_year
-    if age < 20:  
-        preferred_tags.extend(['校园', '修真', '异能', '搞笑'])
-    elif age < 30:  
-        preferred_tags.extend(['都市', '系统', '无限流', '职场'])
-    elif age < 40:  
-        preferred_tags.extend(['历史', '权谋', '战争', '悬疑'])
-    else:  
-        preferred_tags.extend(['历史', '现实', '职场', '文学'])
-    # 职业偏好
-    if occupation == '学生':
-        preferred_tags.extend(['校园', '青春', '异能', '修真'])
-    elif occupation == '上班族':
-        preferred_tags.extend(['职场', '现实', '都市', '系统'])
-    elif occupation == '自由职业者':
-        preferred_tags.extend(['冒险', '奇幻', '武侠', '灵异'])
-    elif occupation == '退休':
-        preferred_tags.extend(['历史', '文学', '现实', '战争'])
-    # 阅读时长偏好
-    if reading_time == "几乎不阅读":  
-        preferred_tags.extend(['短篇', '言情', '搞笑', '校园'])
-    elif reading_time == "1-3小时":  
-        preferred_tags.extend(['都市', '修真', '异能', '悬疑'])
-    elif reading_time == "4-6小时":  
-        preferred_tags.extend(['玄幻', '武侠', '无限流', '历史'])
-    elif reading_time == "7-10小时" or reading_time == "10小时以上":  
-        preferred_tags.extend(['长篇', '史诗', '系统', '修仙'])
-    
-    # 统计高频标签（取前4个）
-    tag_counts = {}
-    for tag in preferred_tags:
-        tag_counts[tag] = tag_counts.get(tag, 0) + 1
-    sorted_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)
-    return [tag for tag, _ in sorted_tags[:4]]
+# 按当前画像（及会话内评分）生成混合推荐，结果存入 session_state；
+# 没有会话内评分时，相同画像的结果在各会话间共享缓存
+@traced()
+def refresh_recommendations():
+    from precompute_segments import load_segments_cached, lookup_segment
+    from recommendation import (hybrid_recommendations, profile_candidates, profile_key,
+                                recommendation_content_version, recommendation_version)
+    from recommendation_service import SERVICE_URL, local_rows, request_recommendations
+    from result_cache import get_or_compute
+    user_ratings_df, novels_df = load_data()
+    algo_svd = load_models()
+    user_data = st.session_state.user_data
+    preferred_tags = st.session_state.preferred_tags
 
-# SVD 协同过滤推荐
-def svd_recommendations(algo_svd, novels_df, user_ratings_df, n=100):
-    if algo_svd is None or novels_df.empty:
-        return []
-    predictions = []
-    for _, novel in novels_df.iterrows():
-        novel_id = novel['id']
-        pred = algo_svd.predict(-1, novel_id)
-        platform_rating = novel['rating'] if 'rating' in novel else 0
-        predictions.append({
-            'id': novel_id,
-            'title': novel['title'],
-            'author': novel['author'],
-            'tags': novel['tags'],
-            'platform': novel['platform'],
-            'platform_icon': get_platform_icon(novel['platform']),
-            'predicted_rating': round(pred.est, 2),
-            'platform_rating': round(platform_rating, 2) if platform_rating > 0 else "暂无评分"
-        })
-    # 按预测评分排序
-    predictions.sort(key=lambda x: x['predicted_rating'], reverse=True)
-    return predictions[:n]
+    def compute():
+        folded_user, visitor = get_visitor_profile(algo_svd, novels_df, user_data['favorite_tags'],
+                                                   user_data['preferred_platform'])
+        candidates = profile_candidates(novels_df, user_data['preferred_platform'])
+        recommendations = hybrid_recommendations(algo_svd, novels_df, user_ratings_df,
+                                                 preferred_tags, n=100, folded_user=folded_user,
+                                                 candidates=candidates, visitor=visitor)
+        if not recommendations or algo_svd is None:
+            return None
+        return recommendations['indices'], recommendations['scores']
 
-# 内容推荐（标签匹配）
-def content_based_recommendations(novels_df, preferred_tags, n=50):
-    if novels_df.empty:
-        return []
-    matching_novels = []
-    for _, novel in novels_df.iterrows():
-        match_count = sum(1 for tag in preferred_tags if tag in str(novel['tags']))
-        if match_count > 0:
-            platform_rating = novel['rating'] if 'rating' in novel else 0
-            matching_novels.append({
-                'id': novel['id'],
-                'title': novel['title'],
-                'author': novel['author'],
-                'tags': novel['tags'],
-                'platform': novel['platform'],
-                'platform_icon': get_platform_icon(novel['platform']),
-                'match_score': match_count,
-                'platform_rating': platform_rating
+    # 配置了推荐服务时由服务计算（服务不可用则退回本进程计算）
+    result = None
+    if SERVICE_URL:
+        try:
+            ids, scores = request_recommendations({
+                'preferred_tags': preferred_tags,
+                'favorite_tags': user_data['favorite_tags'],
+                'preferred_platform': user_data['preferred_platform'],
+                'session_ratings': {str(novel_id): rating
+                                    for novel_id, rating in st.session_state.session_ratings.items()},
+                'n': 100,
             })
-    # 按匹配度排序
-    matching_novels.sort(key=lambda x: x['match_score'], reverse=True)
-    return matching_novels[:n]
+            result = local_rows(novels_df, ids, scores)
+        except (OSError, ValueError, KeyError):
+            st.warning("推荐服务暂不可用，已改为本地计算")
+    # 没有会话内评分时先查离线预计算的分群表，未覆盖的画像再走结果缓存 / 现场计算
+    if result is None and st.session_state.session_ratings:
+        result = compute()
+    elif result is None:
+        key, version = profile_key(preferred_tags, user_data), recommendation_version()
+        segments = load_segments_cached()
+        if segments is not None:
+            result = lookup_segment(segments, key, recommendation_content_version())
+        if result is None:
+            result = get_or_compute(key, version, compute)
+    st.session_state.recommendations = {} if result is None else {
+        'catalog': novels_df,
+        'indices': result[0],
+        'scores': result[1],
+    }
 
-# 混合推荐（协同过滤 + 内容推荐）
-def hybrid_recommendations(algo_svd, novels_df, user_ratings_df, preferred_tags, n=100):
-    if novels_df.empty:
-        return []
-    # 1. 协同过滤结果
-    cf_recs = svd_recommendations(algo_svd, novels_df, user_ratings_df, n)
-    # 2. 内容推荐结果
-    content_recs = content_based_recommendations(novels_df, preferred_tags, n)
-    
-    # 3. 融合逻辑（内容推荐优先，去重后合并）
-    hybrid_result = []
-    content_ids = {rec['id'] for rec in content_recs}
-    # 先加内容推荐（取前50）
-    for rec in content_recs[:50]:
-        hybrid_result.append({
-            'id': rec['id'],
-            'title': rec['title'],
-            'author': rec['author'],
-            'tags': rec['tags'],
-            'platform': rec['platform'],
-            'platform_icon': rec['platform_icon'],
-            'predicted_rating': 0,  
-            'platform_rating': round(rec['platform_rating'], 2) if rec['platform_rating'] > 0 else "暂无评分",
-            'match_score': rec['match_score']
-        })
-    # 再加协同过滤（补到100，跳过已存在的）
-    cf_count = 0
-    for rec in cf_recs:
-        if rec['id'] not in content_ids and cf_count < 50:
-            hybrid_result.append({
-                'id': rec['id'],
-                'title': rec['title'],
-                'author': rec['author'],
-                'tags': rec['tags'],
-                'platform': rec['platform'],
-                'platform_icon': rec['platform_icon'],
-                'predicted_rating': rec['predicted_rating'],
-                'platform_rating': rec['platform_rating'],
-                'match_score': 0
-            })
-            cf_count += 1
-    
-    # 4. 计算最终评分（内容匹配度70% + 协同过滤30% + 平台评分校准）
-    if hybrid_result:
-        max_match = max(rec['match_score'] for rec in hybrid_result) or 1
-        max_cf = max(rec['predicted_rating'] for rec in hybrid_result if rec['predicted_rating'] > 0) or 5
-        for rec in hybrid_result:
-            # 基础分计算
-            if rec['match_score'] > 0:
-                content_score = (rec['match_score'] / max_match) * 5
-                base = content_score * 0.7 + 3 * 0.3
-            else:
-                base = rec['predicted_rating']
-            # 平台评分校准
-            if isinstance(rec['platform_rating'], (int, float)) and rec['platform_rating'] > 0:
-                if rec['platform_rating'] > 3:
-                    adj = ((rec['platform_rating'] - 3) / 0.2) * 0.03
-                else:
-                    adj = ((3 - rec['platform_rating']) / 0.2) * (-0.01)
-                final = min(5, max(0, base + adj))
-            else:
-                final = base
-            rec['final_score'] = final
-        # 按最终分排序
-        hybrid_result.sort(key=lambda x: x['final_score'], reverse=True)
-    
-    # 格式化输出
-    return [
-        {
-            'id': rec['id'],
-            'title': rec['title'],
-            'author': rec['author'],
-            'tags': rec['tags'],
-            'platform': rec['platform'],
-            'platform_icon': rec['platform_icon'],
-            'predicted_rating': round(rec['final_score'], 2),
-            'platform_rating': rec['platform_rating']
-        } 
-        for rec in hybrid_result[:n]
-    ]
+# 推荐结果中的小说数量
+def recommendation_count(recommendations):
+    return len(recommendations['indices']) if recommendations else 0
+
+# 侧边栏：推荐结果缓存的命中率与延迟
+def show_cache_stats():
+    from precompute_segments import segment_stats
+    from result_cache import cache_stats as result_cache_stats
+    stats = result_cache_stats()
+    with st.sidebar.expander("推荐缓存统计", expanded=False):
+        st.metric("命中率", f"{stats['hit_rate']:.0%}")
+        st.write(f"命中 {stats['hits']}（磁盘 {stats['disk_hits']}）/ 未命中 {stats['misses']}")
+        st.write(f"平均延迟：命中 {stats['avg_hit_ms']:.2f} ms，未命中 {stats['avg_miss_ms']:.1f} ms")
+        st.write(f"条目 {stats['entries']}，淘汰 {stats['evictions']}，过期 {stats['expired']}，"
+                 f"版本数 {stats['versions']}，磁盘写入失败 {stats['disk_errors']}")
+        segments = segment_stats()
+        st.write(f"分群预计算表：命中 {segments['hits']} / 未命中 {segments['misses']}，"
+                 f"平均查表 {segments['avg_lookup_us']:.1f} µs")
+
+# 侧边栏：冷启动耗时明细（各模块导入、数据 / 模型 / 索引预热）
+def show_warmup_stats():
+    report = warmup_report()
+    if report['state'] == 'idle':
+        return
+    status = {'warming': f"预热中（{report['current']}）", 'ready': "已完成", 'failed': f"失败：{report['error']}"}
+    with st.sidebar.expander("冷启动预热", expanded=False):
+        st.write(f"状态：{status[report['state']]}，用时 {report['seconds']:.2f} s")
+        st.write(f"模块导入 {report['import_ms']:.0f} ms，数据 / 模型 / 索引预热 {report['warmup_ms']:.0f} ms")
+        st.dataframe([{'项目': f"import {item['name']}", '耗时 (ms)': round(item['ms'], 1)}
+                      for item in report['imports']] +
+                     [{'项目': item['name'], '耗时 (ms)': round(item['ms'], 1)} for item in report['stages']],
+                     hide_index=True)
+
+# 调试面板：只由部署方通过环境变量 NOVEL_DEBUG_PANEL=1 开启（面板可开启 cProfile / tracemalloc，不对访客开放）
+DEBUG_PANEL = os.environ.get('NOVEL_DEBUG_PANEL') == '1'
+# 面板中保留的最近运行数
+TRACE_HISTORY = 10
+
+# 侧边栏：最近几次页面运行的逐阶段耗时 / 净分配内存块，可选 cProfile / tracemalloc 采样，导出累计计数器
+def show_debug_panel():
+    if not DEBUG_PANEL:
+        return
+    with st.sidebar.expander("性能调试", expanded=False):
+        st.checkbox("cProfile 采样（下一次操作生效）", key='trace_profile')
+        st.checkbox("tracemalloc 内存追踪（下一次操作生效）", key='trace_memory')
+        traces = st.session_state.get('traces', [])
+        if traces:
+            choice = st.selectbox("最近的运行", range(len(traces)), index=len(traces) - 1,
+                                  format_func=lambda i: f"#{i + 1}：{traces[i]['total_ms']:.0f} ms")
+            trace = traces[choice]
+            st.dataframe([{
+                '阶段': '　' * s['depth'] + s['stage'],
+                '耗时 (ms)': round(s['ms'], 2),
+                '净分配块': s['blocks'],
+            } for s in trace['stages']], hide_index=True)
+            for note in trace['notes']:
+                st.caption(note)
+            if 'memory_peak_mb' in trace:
+                st.write(f"tracemalloc 峰值：{trace['memory_peak_mb']:.1f} MB")
+                st.code('\n'.join(trace['top_allocations']))
+            if 'profile' in trace:
+                st.code(trace['profile'])
+        st.download_button("导出计数器（Prometheus）", export_prometheus(), file_name='novel_metrics.prom')
+        st.download_button("导出计数器（JSON）", json.dumps(export_json(), ensure_ascii=False, indent=2),
+                           file_name='novel_metrics.json')
+
+# 一次页面运行作为一个请求记录各阶段耗时（跳转 / rerun 前的运行也会保留）
+def run_traced():
+    start_request(profile=st.session_state.get('trace_profile', False),
+                  trace_memory=st.session_state.get('trace_memory', False))
+    try:
+        main()
+    finally:
+        st.session_state.traces = (st.session_state.get('traces', []) + [finish_request()])[-TRACE_HISTORY:]
+    show_debug_panel()
 
 # 导航步骤显示
 def show_step_nav(current_step):
@@ -334,11 +299,16 @@ def main():
     if 'current_step' not in st.session_state:
         st.session_state.current_step = 1
     if 'recommendations' not in st.session_state:
-        st.session_state.recommendations = []
+        st.session_state.recommendations = {}
     if 'user_data' not in st.session_state:
         st.session_state.user_data = {}
     if 'satisfaction' not in st.session_state:
         st.session_state.satisfaction = 5
+    if 'session_ratings' not in st.session_state:
+        st.session_state.session_ratings = {}
+    if 'session_user_id' not in st.session_state:
+        # 会话用户 id：63 位随机整数，与评分数据中的用户 id 同为整数类型
+        st.session_state.session_user_id = uuid.uuid4().int >> 65
 
     # 显示步骤导航
     show_step_nav(st.session_state.current_step)
@@ -368,16 +338,15 @@ def main():
             )
             st.session_state.preferred_tags = preferred_tags  # 暂存
             
+            if not warmup_done():
+                st.caption("⏳ 推荐引擎正在后台预热，填写信息的同时即可完成")
             if st.button("生成专属推荐", type="primary", help="点击后系统将基于您的偏好生成个性化推荐"):
-                # 加载数据和模型
-                user_ratings_df, novels_df = load_data()
-                algo_svd = load_models()
-                
+                # 预热尚未完成时显示预热状态，等它完成（数据和模型只加载一次，不重复加载）
+                if not warmup_done():
+                    with st.spinner("推荐引擎预热中，马上就好…"):
+                        wait_for_warmup()
                 # 生成混合推荐
-                st.session_state.recommendations = hybrid_recommendations(
-                    algo_svd, novels_df, user_ratings_df, 
-                    preferred_tags, n=100
-                )
+                refresh_recommendations()
                 
                 # 进入下一步
                 st.session_state.current_step = 2
@@ -385,7 +354,7 @@ def main():
     
     # 步骤2：查看推荐
     elif st.session_state.current_step == 2:
-        if not st.session_state.recommendations:
+        if not recommendation_count(st.session_state.recommendations):
             st.warning("请先填写信息并生成推荐")
             if st.button("返回填写信息", type="secondary"):
                 st.session_state.current_step = 1
@@ -402,37 +371,56 @@ def main():
             
             # 计算当前页显示的书籍
             recommendations = st.session_state.recommendations
+            total_books = recommendation_count(recommendations)
             books_per_page = 8
             start_idx = (st.session_state.current_page - 1) * books_per_page
-            end_idx = min(start_idx + books_per_page, len(recommendations))
-            current_books = recommendations[start_idx:end_idx]
+            end_idx = min(start_idx + books_per_page, total_books)
+            # 只为当前页物化展示字段
+            from catalog import materialize_books
+            with stage('materialize_books'):
+                current_books = materialize_books(
+                    recommendations['catalog'],
+                    recommendations['indices'][start_idx:end_idx],
+                    recommendations['scores'][start_idx:end_idx]
+                )
             
-            st.write(f"为您推荐的小说（共 {len(recommendations)} 本）：")
+            st.write(f"为您推荐的小说（共 {total_books} 本）：")
             
             # 显示书籍卡片（增加文字大小）
-            for book in current_books:
-                with st.container():
-                    col1, col2 = st.columns([1, 4], gap="medium")
-                    with col1:
-                        # 替换 use_column_width 为 use_container_width
-                        if os.path.exists(book['platform_icon']):
-                            st.image(book['platform_icon'], width=80, 
-                                   caption=book['platform'], use_container_width=False)
-                        else:
-                            st.image("logos/default_logo.png", width=80, 
-                                   caption="未知平台", use_container_width=False)
+            with stage('render_cards'):
+                for book in current_books:
+                    with st.container():
+                        col1, col2 = st.columns([1, 4], gap="medium")
+                        with col1:
+                            # 替换 use_column_width 为 use_container_width
+                            if os.path.exists(book['platform_icon']):
+                                st.image(book['platform_icon'], width=80, 
+                                       caption=book['platform'], use_container_width=False)
+                            else:
+                                st.image("logos/default_logo.png", width=80, 
+                                       caption="未知平台", use_container_width=False)
                     
-                    with col2:
-                        st.markdown(f"<h3 class='book-title'>《{book['title']}》</h3>", unsafe_allow_html=True)
-                        st.markdown(f"<p class='book-meta'><strong>作者:</strong> {book['author']}</p>", unsafe_allow_html=True)
-                        st.markdown(f"<p class='book-meta'><strong>类型:</strong> {book['tags']}</p>", unsafe_allow_html=True)
-                        st.markdown(f"<p class='book-meta'><strong>平台评分:</strong> ⭐️ {book['platform_rating']}</p>", unsafe_allow_html=True)
-                        st.markdown(f"<p class=''><strong>推荐评分:</strong> <span class='rating-stars'>{book['predicted_rating']}/5.0</span></p>", unsafe_allow_html=True)
+                        with col2:
+                            st.markdown(f"<h3 class='book-title'>《{book['title']}》</h3>", unsafe_allow_html=True)
+                            st.markdown(f"<p class='book-meta'><strong>作者:</strong> {book['author']}</p>", unsafe_allow_html=True)
+                            st.markdown(f"<p class='book-meta'><strong>类型:</strong> {book['tags']}</p>", unsafe_allow_html=True)
+                            st.markdown(f"<p class='book-meta'><strong>平台评分:</strong> ⭐️ {book['platform_rating']}</p>", unsafe_allow_html=True)
+                            st.markdown(f"<p class=''><strong>推荐评分:</strong> <span class='rating-stars'>{book['predicted_rating']}/5.0</span></p>", unsafe_allow_html=True)
+                            # 会话内评分：用于 fold-in 个性化，更新推荐时生效
+                            my_rating = st.select_slider(
+                                "我的评分", options=RATING_OPTIONS,
+                                value=st.session_state.session_ratings.get(book['id'], RATING_OPTIONS[0]),
+                                key=f"rate_{book['id']}"
+                            )
+                            if my_rating == RATING_OPTIONS[0]:
+                                st.session_state.session_ratings.pop(book['id'], None)
+                            else:
+                                st.session_state.session_ratings[book['id']] = my_rating
                     
-                    st.markdown("---")
+                        st.markdown("---")
             
             # 分页控制
-            total_pages = (len(recommendations) + books_per_page - 1) // books_per_page
+            total_pages = (total_books + books_per_page - 1) // books_per_page
             if total_pages > 1:
                 st.markdown("<div class='page-nav'>", unsafe_allow_html=True)
                 
@@ -454,6 +442,13 @@ def main():
                 
                 st.markdown("</div>", unsafe_allow_html=True)
             
+            # 根据会话内评分重新 fold-in 并刷新推荐
+            if st.session_state.session_ratings and st.button(
+                    "根据我的评分更新推荐", help="用您在本页给出的评分进一步个性化推荐结果"):
+                refresh_recommendations()
+                st.session_state.current_page = 1
+                st.rerun()
+            
             # 进入下一步
             if st.button("前往满意度评价", type="primary",
                        help="对推荐结果进行评价，帮助我们优化系统"):
@@ -462,7 +457,7 @@ def main():
     
     # 步骤3：满意度反馈
     elif st.session_state.current_step == 3:
-        if not st.session_state.recommendations:
+        if not recommendation_count(st.session_state.recommendations):
             st.warning("请先填写信息并生成推荐")
             if st.button("返回填写信息", type="secondary"):
                 st.session_state.current_step = 1
@@ -501,22 +496,31 @@ def main():
                     st.warning("😔 抱歉没能满足您的期望，我们会仔细分析原因并优化推荐算法～")
                     st.markdown("<p class='feedback-text'>您的详细反馈对我们非常重要，请放心，我们会持续优化模型，下次为您提供更精准的推荐。</p>", unsafe_allow_html=True)
                 
-                # 保存反馈数据（实际应用中可保存到数据库）
+                # 保存反馈数据（入队后由后台线程批量写入反馈日志，供重新训练使用）
                 feedback_data = {
+                    'user_id': st.session_state.session_user_id,
                     'satisfaction': st.session_state.satisfaction,
                     'feedback': feedback,
                     'user_data': st.session_state.user_data,
+                    'ratings': st.session_state.session_ratings,
                     'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 }
-                
-                # 这里可以添加保存反馈数据的代码
-                # 例如：save_feedback(feedback_data)
+                from feedback_log import save_feedback
+                save_feedback(feedback_data)
                 
                 st.write("您的反馈已提交，感谢您的支持！")
                 
     
+    # 预热期间不显示缓存统计（避免在首屏同步导入推荐模块）
+    if warmup_done():
+        show_cache_stats()
+    show_warmup_stats()
+    
     # 页脚
     st.markdown("<div class='footer'>© 全平台小说推荐系统 | 为您发现更多好书</div>", unsafe_allow_html=True)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    # 进程内首次运行时启动后台预热（之后的运行无效果），首屏不等待数据和模型加载
+    if WARMUP_ENABLED:
+        start_warmup()
+    run_traced()
\ No newline at end of file
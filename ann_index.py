@@ -0,0 +1,104 @@
+import numpy as np
+
+from svd_scoring import (get_svd_factors, get_item_alignment, score_items, top_n_indices, user_inner_id,
+                         user_params)
+
+# 近似检索索引文件（与模型文件放在一起）
+ANN_INDEX_FILE = 'svd_ann_index.npz'
+
+# 检索向量：物品 [qi, bi]，用户 [pu, 1]，内积即为预测分中与物品有关的部分
+def item_vectors(factors):
+    return np.hstack([factors['qi'], factors['bi'][:, None]]).astype(np.float32)
+
+def user_vector(factors, user=None):
+    n_factors = factors['qi'].shape[1]
+    vec = np.zeros(n_factors + 1, dtype=np.float32)
+    params = user_params(factors, user)
+    if params is not None:
+        vec[:n_factors] = params[1]
+    vec[n_factors] = 1
+    return vec
+
+# 简单 k-means（Lloyd 迭代），样本过多时先抽样训练质心
+def _kmeans(vectors, n_clusters, n_iter=20, sample_size=100000, seed=0):
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample_size:
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    else:
+        sample = vectors
+    centroids = sample[rng.choice(len(sample), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = _assign(sample, centroids)
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        nonempty = counts > 0
+        centroids[nonempty] = sums[nonempty] / counts[nonempty, None]
+    return centroids
+
+# 把向量分配给最近的质心（分批计算距离，控制内存）
+def _assign(vectors, centroids, batch_size=65536):
+    centroid_norms = np.square(centroids).sum(axis=1)
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start:start + batch_size]
+        labels[start:start + batch_size] = np.argmin(centroid_norms - 2 * batch @ centroids.T, axis=1)
+    return labels
+
+# 训练时构建 IVF 索引：k-means 聚类后按簇连续存放物品向量（倒排表）
+def build_ivf_index(factors, n_lists=None, seed=0):
+    vectors = item_vectors(factors)
+    n_items = len(vectors)
+    n_lists = min(n_items, n_lists or max(1, int(np.sqrt(n_items))))
+    centroids = _kmeans(vectors, n_lists, seed=seed)
+    labels = _assign(vectors, centroids)
+    order = np.argsort(labels, kind='stable')
+    return {
+        'centroids': centroids,
+        'indptr': np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=n_lists))]),
+        'item_ids': order,
+        'vectors': vectors[order],
+        # 未知用户只按物品偏置排序，预先排好即可精确取 top-k
+        'bias_order': np.argsort(-factors['bi'], kind='stable'),
+    }
+
+def save_ann_index(index, path=ANN_INDEX_FILE):
+    np.savez(path, **index)
+
+def load_ann_index(path=ANN_INDEX_FILE):
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+# 索引是否由当前模型构建（抽查若干物品向量）
+def index_matches(index, factors, n_checks=16):
+    if len(index['item_ids']) != len(factors['qi']) or index['vectors'].shape[1] != factors['qi'].shape[1] + 1:
+        return False
+    positions = np.linspace(0, len(index['item_ids']) - 1, min(n_checks, len(index['item_ids']))).astype(np.int64)
+    expected = item_vectors({'qi': factors['qi'][index['item_ids'][positions]],
+                             'bi': factors['bi'][index['item_ids'][positions]]})
+    return np.allclose(index['vectors'][positions], expected)
+
+# 近似 top-k：只扫描与用户向量内积最高的 n_probe 个簇，返回模型内部物品 id
+def ann_top_k(index, query, k, n_probe=8):
+    if not query[:-1].any():
+        return index['bias_order'][:k]
+    centroid_scores = index['centroids'] @ query
+    n_probe = min(n_probe, len(centroid_scores))
+    probe = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+    indptr = index['indptr']
+    positions = np.concatenate([np.arange(indptr[c], indptr[c + 1]) for c in probe])
+    scores = index['vectors'][positions] @ query
+    return index['item_ids'][positions[top_n_indices(scores, k)]]
+
+# 近似模式的 SVD 推荐：索引召回候选后精确重打分，返回值与 svd_top_n 相同
+def ann_svd_top_n(algo_svd, novels_df, index, n=100, user_id=-1, n_probe=8, folded_user=None):
+    factors = get_svd_factors(algo_svd)
+    alignment = get_item_alignment(factors, novels_df)
+    user = folded_user if folded_user is not None else user_inner_id(factors, user_id)
+    candidates = ann_top_k(index, user_vector(factors, user), 2 * n, n_probe)
+    rows = alignment['item_rows'][candidates]
+    # 模型未见过的小说分数都相同（全局均值），按目录顺序取前 n 本即可
+    rows = np.sort(np.concatenate([rows[rows >= 0], alignment['unknown_rows'][:n]]))
+    scores = np.round(score_items(factors, alignment['item_inner'][rows], user), 2)
+    top = top_n_indices(scores, n)
+    return rows[top], scores[top]
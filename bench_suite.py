@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from catalog import prepare_catalog
+from mf_training import build_factors, peak_rss_mb, stream_ratings, train_mf_sgd
+from recommendation import (ALL_TAGS, content_based_recommendations, get_platform_icon,
+                            hybrid_recommendations, svd_recommendations)
+from synthetic_data import SYNTHETIC_DIR, default_user_count, write_synthetic_dataset
+
+# 基准结果历史（每次运行追加一行）与基线（按数据规模分别保存）
+BENCH_HISTORY_FILE = 'data/bench_history.jsonl'
+BENCH_BASELINE_FILE = 'bench_baseline.json'
+
+# 预设数据规模
+SCALES = {
+    'small': {'n_novels': 10000, 'n_ratings': 100000},
+    'medium': {'n_novels': 100000, 'n_ratings': 1000000},
+    'large': {'n_novels': 1000000, 'n_ratings': 10000000},
+}
+
+# 越小越好 / 越大越好的指标；超出基线 tolerance 比例即视为退化
+LOWER_IS_BETTER = ('p50_ms', 'p99_ms', 'seconds', 'peak_mb')
+HIGHER_IS_BETTER = ('throughput',)
+TOLERANCE = 0.2
+
+# 当前提交（不在 git 仓库中时为 None）
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# 逐次计时（先预热一次，构建索引 / 对齐缓存），返回延迟分位数与吞吐量；
+# 峰值内存另用 tracemalloc 跑前几次查询测得，不影响计时
+def measure_queries(func, n_queries, memory_queries=10):
+    func(0)
+    times = np.empty(n_queries)
+    for i in range(n_queries):
+        start = time.perf_counter()
+        func(i)
+        times[i] = time.perf_counter() - start
+    tracemalloc.start()
+    for i in range(min(memory_queries, n_queries)):
+        func(i)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'p50_ms': float(np.percentile(times, 50) * 1000),
+        'p99_ms': float(np.percentile(times, 99) * 1000),
+        'mean_ms': float(times.mean() * 1000),
+        'throughput': float(n_queries / times.sum()),
+        'peak_mb': peak / 2**20,
+    }
+
+# 在合成数据上依次测各阶段：流式训练（一次，吞吐量为评分行/秒，峰值为进程 RSS），
+# 以及 SVD / 内容 / 混合推荐（n_queries 个不同的新用户画像，吞吐量为请求/秒）
+# 数据集目录与基线都按 (小说数, 评分数, 用户数, 随机种子) 区分，参数不同的数据集不会被误用
+def run_suite(n_novels, n_ratings, n_users=None, n_queries=200, n_epochs=5, seed=0):
+    n_users = n_users or default_user_count(n_ratings)
+    label = f"{n_novels}x{n_ratings}x{n_users}-seed{seed}"
+    out_dir = os.path.join(SYNTHETIC_DIR, label)
+    novels_path = os.path.join(out_dir, 'novels.csv')
+    ratings_path = os.path.join(out_dir, 'user_ratings.csv')
+    if not (os.path.exists(novels_path) and os.path.exists(ratings_path)):
+        write_synthetic_dataset(out_dir, n_novels, n_ratings, n_users, seed)
+    results = {}
+
+    start = time.perf_counter()
+    data = stream_ratings(ratings_path, os.path.join(out_dir, 'training_cache'))
+    params, _ = train_mf_sgd(data, n_epochs=n_epochs, random_state=seed, verbose=False)
+    factors = build_factors(params, data)
+    elapsed = time.perf_counter() - start
+    results['train_streaming_model'] = {'seconds': elapsed, 'throughput': data['stats']['rows'] / elapsed,
+                                        'peak_mb': peak_rss_mb()}
+
+    novels_df = prepare_catalog(pd.read_csv(novels_path), get_platform_icon)
+    rng = np.random.default_rng(seed)
+    pu_std = float(np.std(factors['pu']))
+    users = [{'bu': 0.0, 'pu': rng.normal(0, pu_std, factors['qi'].shape[1])} for _ in range(n_queries)]
+    tags = [rng.choice(ALL_TAGS, 4, replace=False).tolist() for _ in range(n_queries)]
+    stages = {
+        'svd_recommendations':
+            lambda i: svd_recommendations(factors, novels_df, None, 100, folded_user=users[i]),
+        'content_based_recommendations':
+            lambda i: content_based_recommendations(novels_df, tags[i], 100),
+        'hybrid_recommendations':
+            lambda i: hybrid_recommendations(factors, novels_df, None, tags[i], 100, users[i]),
+    }
+    for name, func in stages.items():
+        results[name] = measure_queries(func, n_queries)
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'scale': label,
+        'n_novels': n_novels,
+        'n_ratings': n_ratings,
+        'n_users': n_users,
+        'seed': seed,
+        'n_queries': n_queries,
+        'results': results,
+    }
+
+# 与同规模的基线比较，返回退化项说明
+def find_regressions(record, baseline, tolerance=TOLERANCE):
+    regressions = []
+    for stage, metrics in record['results'].items():
+        base = baseline.get('results', {}).get(stage, {})
+        for metric, value in metrics.items():
+            reference = base.get(metric)
+            if not reference:
+                continue
+            if metric in LOWER_IS_BETTER and value > reference * (1 + tolerance):
+                regressions.append(f"{stage}.{metric}: {reference:.2f} -> {value:.2f}")
+            elif metric in HIGHER_IS_BETTER and value < reference * (1 - tolerance):
+                regressions.append(f"{stage}.{metric}: {reference:.2f} -> {value:.2f}")
+    return regressions
+
+def print_record(record):
+    print(f"规模 {record['scale']}（小说 x 评分 x 用户-种子）, 提交 {record['commit']}")
+    for stage, metrics in record['results'].items():
+        print(f"  {stage:<32}" + ", ".join(f"{metric} {value:.2f}" for metric, value in metrics.items()))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="推荐流程分阶段基准：延迟分位数、峰值内存、吞吐量，并与基线比较")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small', help="预设数据规模")
+    parser.add_argument('--novels', type=int, default=None, help="小说数（覆盖预设）")
+    parser.add_argument('--ratings', type=int, default=None, help="评分行数（覆盖预设）")
+    parser.add_argument('--users', type=int, default=None, help="用户数（默认评分数 / 20）")
+    parser.add_argument('--seed', type=int, default=0, help="合成数据与查询画像的随机种子")
+    parser.add_argument('--queries', type=int, default=200, help="每个推荐阶段的请求数")
+    parser.add_argument('--epochs', type=int, default=5, help="训练轮数")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help="允许的退化比例")
+    parser.add_argument('--history', default=BENCH_HISTORY_FILE, help="结果历史（JSONL）")
+    parser.add_argument('--baseline', default=BENCH_BASELINE_FILE, help="基线文件")
+    parser.add_argument('--save-baseline', action='store_true', help="把本次结果保存为该规模的基线")
+    args = parser.parse_args()
+
+    scale = SCALES[args.scale]
+    record = run_suite(args.novels or scale['n_novels'], args.ratings or scale['n_ratings'], args.users,
+                       args.queries, args.epochs, args.seed)
+    print_record(record)
+    os.makedirs(os.path.dirname(args.history) or '.', exist_ok=True)
+    with open(args.history, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baselines = json.load(f)
+    if args.save_baseline:
+        baselines[record['scale']] = record
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2)
+        print(f"已保存基线 -> {args.baseline}")
+    elif record['scale'] in baselines:
+        regressions = find_regressions(record, baselines[record['scale']], args.tolerance)
+        for regression in regressions:
+            print(f"性能退化: {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"与基线（{baselines[record['scale']]['commit']}）相比没有超过 {args.tolerance:.0%} 的退化")
+    else:
+        print(f"规模 {record['scale']} 还没有基线（--save-baseline 保存）")
@@ -0,0 +1,426 @@
+import argparse
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from surprise import Reader, Dataset, KNNBasic, SVD
+
+from svd_scoring import (get_svd_factors, align_item_ids, score_items, score_items_batch, score_pairs,
+                         top_n_indices)
+from ann_index import ann_top_k, build_ivf_index, item_vectors
+from catalog_snapshot import convert_to_snapshot
+from mf_training import build_factors, train_mf_sgd
+from model_artifact import publish_artifact, user_raw_ids
+from filter_index import build_filter_index, candidate_rows, evaluate
+from fold_in import fold_in_profile
+from fusion_reference import fuse_candidates_loop, random_fusion_inputs
+from hybrid_fusion import fuse_candidates
+from incremental_update import incremental_fit
+from knn_neighbors import train_knn_model
+from parallel_sgd import train_mf_dsgd
+from synthetic_data import synthetic_novels, write_synthetic_dataset
+from tag_index import build_tag_index, tag_top_n
+
+# 计时工具：返回 (结果, 耗时秒数)
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+# 生成合成评分数据并训练一个小型 SVD（只有部分小说有评分，与真实数据一致）
+def train_synthetic_svd(n_novels, n_users=2000, n_ratings=50000, seed=0):
+    rng = np.random.default_rng(seed)
+    ratings_df = pd.DataFrame({
+        'user_id': rng.integers(0, n_users, n_ratings),
+        'novel_id': rng.integers(0, n_novels // 2, n_ratings),
+        'rating': np.round(rng.uniform(1, 5, n_ratings), 1),
+    })
+    reader = Reader(rating_scale=(1, 5))
+    data = Dataset.load_from_df(ratings_df[['user_id', 'novel_id', 'rating']], reader)
+    algo_svd = SVD(n_epochs=5, random_state=seed)
+    algo_svd.fit(data.build_full_trainset())
+    return algo_svd
+
+# 逐行 predict 的旧实现（作为对照基准）
+def predict_loop_top_n(algo_svd, novel_ids, n, user_id=-1):
+    predictions = [(novel_id, round(algo_svd.predict(user_id, novel_id).est, 2))
+                   for novel_id in novel_ids]
+    predictions.sort(key=lambda x: x[1], reverse=True)
+    return predictions[:n]
+
+# 批量打分引擎 vs 逐行 predict 的耗时（一致性见 tests/test_svd_scoring.py）
+def bench_svd_scoring(n_novels=100000, n=100):
+    algo_svd = train_synthetic_svd(n_novels)
+    novel_ids = np.arange(n_novels)
+    factors = get_svd_factors(algo_svd)
+    _, loop_time = timed(predict_loop_top_n, algo_svd, novel_ids, n)
+
+    def vectorized():
+        scores = np.round(score_items(factors, align_item_ids(factors, novel_ids)), 2)
+        return top_n_indices(scores, n)
+    _, vec_time = timed(vectorized)
+
+    print(f"SVD 打分 {n_novels} 本小说: 逐行 predict {loop_time * 1000:.1f} ms, "
+          f"矩阵打分 {vec_time * 1000:.2f} ms, 加速 {loop_time / vec_time:.0f}x")
+
+# 旧实现：逐行子串匹配
+def substring_match_counts(novels_df, preferred_tags):
+    return np.array([sum(1 for tag in preferred_tags if tag in str(tags)) for tags in novels_df['tags']])
+
+# 标签倒排索引 vs 逐行子串扫描的耗时（正确性见 tests/test_tag_index.py）
+def bench_tag_index(n_novels=1000000, n=50):
+    preferred_tags = ['都市', '异能', '修真', '玄幻']
+    novels_df = synthetic_novels(n_novels)
+    index, build_time = timed(build_tag_index, novels_df)
+    (top, _), query_time = timed(tag_top_n, index, preferred_tags, n)
+    sample_size = min(n_novels, 50000)
+    _, scan_time = timed(substring_match_counts, novels_df.iloc[:sample_size], preferred_tags)
+    scan_time *= n_novels / sample_size
+    print(f"标签匹配 {n_novels} 本小说: 建索引 {build_time * 1000:.0f} ms（一次性）, "
+          f"查询 {query_time * 1000:.2f} ms, 逐行扫描约 {scan_time * 1000:.0f} ms"
+          f"（按 {sample_size} 行外推）, 加速 {scan_time / query_time:.0f}x")
+
+# 数组化融合 vs Python 循环融合的延迟（与旧实现的一致性见 tests/test_hybrid_fusion.py）
+def bench_hybrid_fusion(trials=500, n=100):
+    rng = np.random.default_rng(0)
+    loop_time = vec_time = 0.0
+    for _ in range(trials):
+        inputs = random_fusion_inputs(rng, n=n)
+        loop_time += timed(fuse_candidates_loop, *inputs, n=n)[1]
+        vec_time += timed(fuse_candidates, *inputs, n=n)[1]
+    print(f"混合融合 {trials} 次（每次约 {2 * n} 个候选）: Python 循环 {loop_time / trials * 1e6:.0f} µs/次, "
+          f"数组运算 {vec_time / trials * 1e6:.0f} µs/次")
+
+# 合成 SVD 因子：物品向量按若干主题聚集，接近真实模型的分布
+def synthetic_factors(n_items, n_users=1000, n_factors=32, n_topics=200, seed=0):
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(0, 0.3, (n_topics, n_factors))
+    qi = (topics[rng.integers(0, n_topics, n_items)] + rng.normal(0, 0.1, (n_items, n_factors)))
+    return {
+        'global_mean': 3.2,
+        'bu': rng.normal(0, 0.1, n_users),
+        'bi': rng.normal(0, 0.3, n_items),
+        'pu': rng.normal(0, 0.3, (n_users, n_factors)),
+        'qi': qi,
+        'biased': True,
+        'rating_scale': (1, 5),
+    }
+
+# IVF 近似检索 vs 全量精确打分：recall@k 与单次查询延迟
+def bench_ann_index(n_items=1000000, k=100, n_queries=50, probes=(4, 8, 16, 32)):
+    factors = synthetic_factors(n_items)
+    index, build_time = timed(build_ivf_index, factors)
+    vectors = item_vectors(factors)
+    queries = np.hstack([factors['pu'][:n_queries], np.ones((n_queries, 1))]).astype(np.float32)
+    exact_time, exact_top = 0.0, []
+    for query in queries:
+        top, elapsed = timed(lambda: top_n_indices(vectors @ query, k))
+        exact_time += elapsed
+        exact_top.append(set(top.tolist()))
+    print(f"IVF 索引 {n_items} 个物品: 构建 {build_time:.1f} s, {len(index['centroids'])} 个簇, "
+          f"精确扫描 {exact_time / n_queries * 1000:.1f} ms/次")
+    for n_probe in probes:
+        ann_time, hits = 0.0, 0
+        for query, expected in zip(queries, exact_top):
+            found, elapsed = timed(ann_top_k, index, query, k, n_probe)
+            ann_time += elapsed
+            hits += len(expected & set(found.tolist()))
+        print(f"  n_probe={n_probe}: recall@{k} {hits / (k * n_queries):.3f}, "
+              f"{ann_time / n_queries * 1000:.2f} ms/次")
+
+# 在新进程中加载模型，返回 (加载耗时秒数, 常驻内存增量 MB)
+LOAD_PROBE = """
+import sys, time
+def rss_mb():
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmRSS')) / 1024
+import pickle, numpy, pandas, surprise, model_artifact
+before = rss_mb()
+start = time.perf_counter()
+if sys.argv[1] == 'pickle':
+    with open(sys.argv[2], 'rb') as f:
+        model = pickle.load(f)
+else:
+    model = model_artifact.load_artifact(sys.argv[2])
+print(time.perf_counter() - start, rss_mb() - before)
+"""
+
+def probe_model_load(kind, path):
+    output = subprocess.run([sys.executable, '-c', LOAD_PROBE, kind, path], check=True,
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    seconds, rss = output.stdout.split()
+    return float(seconds), float(rss)
+
+# pickle 模型 vs 内存映射模型产物：新进程中的加载耗时与内存占用
+def bench_model_artifact(n_users=200000, n_novels=50000, n_ratings=1000000):
+    rng = np.random.default_rng(0)
+    ratings_df = pd.DataFrame({
+        'user_id': rng.integers(0, n_users, n_ratings),
+        'novel_id': rng.integers(0, n_novels, n_ratings),
+        'rating': np.round(rng.uniform(1, 5, n_ratings), 1),
+    })
+    data = Dataset.load_from_df(ratings_df, Reader(rating_scale=(1, 5)))
+    algo_svd = SVD(n_epochs=1, random_state=0)
+    algo_svd.fit(data.build_full_trainset())
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pickle_path = os.path.join(tmp_dir, 'svd_model.pkl')
+        with open(pickle_path, 'wb') as f:
+            pickle.dump(algo_svd, f)
+        store = os.path.join(tmp_dir, 'svd')
+        publish_artifact(get_svd_factors(algo_svd), store)
+        artifact_size = sum(os.path.getsize(os.path.join(root, name))
+                            for root, _, names in os.walk(store) for name in names)
+        print(f"模型大小: pickle {os.path.getsize(pickle_path) / 2**20:.0f} MB, "
+              f"产物 {artifact_size / 2**20:.0f} MB")
+        for kind, path in (('pickle', pickle_path), ('artifact', store)):
+            seconds, rss = probe_model_load(kind, path)
+            print(f"  {kind}: 加载 {seconds * 1000:.1f} ms, 常驻内存增量 {rss:.0f} MB")
+
+# 新用户 fold-in 延迟：画像伪评分 + 少量会话评分，解一次正则最小二乘
+def bench_fold_in(n_novels=100000, trials=50, novels_path='data/novels.csv'):
+    novels_df = synthetic_novels(n_novels, novels_path=novels_path)
+    factors = synthetic_factors(n_novels, n_factors=100)
+    factors.update({'user_ids': {}, 'item_index': pd.Index(novels_df['id']),
+                    'item_inner': np.arange(n_novels, dtype=np.int64)})
+    favorite_tags = novels_df['tags'].str.split('、').explode().value_counts().index[:3].tolist()
+    platforms = novels_df['platform'].unique()[:1].tolist()
+    session_ratings = {int(i): 5 for i in range(0, n_novels, n_novels // 10)}
+    fold_in_profile(factors, novels_df, favorite_tags, platforms, session_ratings)  # 预热索引与对齐缓存
+    start = time.perf_counter()
+    for _ in range(trials):
+        fold_in_profile(factors, novels_df, favorite_tags, platforms, session_ratings)
+    print(f"fold-in ({n_novels} 本小说, 100 维): {(time.perf_counter() - start) / trials * 1000:.2f} ms/次")
+
+# 由低秩“真实”偏好生成的合成评分（带噪声）
+def synthetic_ratings(n_users, n_items, n_ratings, n_factors=10, seed=0):
+    rng = np.random.default_rng(seed)
+    pu = rng.normal(0, 0.5, (n_users, n_factors))
+    qi = rng.normal(0, 0.5, (n_items, n_factors))
+    users = rng.integers(0, n_users, n_ratings)
+    items = rng.integers(0, n_items, n_ratings)
+    ratings = 3.2 + np.einsum('ij,ij->i', pu[users], qi[items]) + rng.normal(0, 0.3, n_ratings)
+    return pd.DataFrame({'user_id': users, 'novel_id': items, 'rating': np.clip(ratings, 1, 5)})
+
+# 在评分表上完整训练（默认与流式训练相同的 SGD），返回因子字典
+def fit_full_mf(ratings_df, trainer=train_mf_sgd, **sgd_options):
+    user_codes, user_raw = pd.factorize(ratings_df['user_id'])
+    item_codes, item_raw = pd.factorize(ratings_df['novel_id'])
+    data = {
+        'users': user_codes.astype(np.int32),
+        'items': item_codes.astype(np.int32),
+        'ratings': ratings_df['rating'].to_numpy(dtype=np.float32),
+        'user_ids': dict(zip(user_raw.tolist(), range(len(user_raw)))),
+        'item_ids': dict(zip(item_raw.tolist(), range(len(item_raw)))),
+        'global_mean': float(ratings_df['rating'].mean()),
+    }
+    params, _ = trainer(data, verbose=False, **sgd_options)
+    return build_factors(params, data)
+
+def holdout_rmse(factors, holdout_df):
+    users = pd.Index(user_raw_ids(factors)).get_indexer(holdout_df['user_id'])
+    items = align_item_ids(factors, holdout_df['novel_id'].to_numpy())
+    est = score_pairs(factors, users, items)
+    return float(np.sqrt(np.mean(np.square(est - holdout_df['rating'].to_numpy()))))
+
+# 增量更新 vs 完整重训：基础模型训练后到来 new_fraction 的新评分（含一批新用户），
+# 比较更新耗时与留出集 RMSE 的漂移
+def bench_incremental_update(n_users=50000, n_items=20000, n_ratings=2000000, new_fraction=0.05,
+                             n_epochs=10, update_epochs=3, n_factors=50):
+    ratings_df = synthetic_ratings(n_users, n_items, n_ratings)
+    rng = np.random.default_rng(1)
+    holdout = rng.random(len(ratings_df)) < 0.02
+    train_df, holdout_df = ratings_df[~holdout], ratings_df[holdout]
+    late = (train_df['user_id'] >= n_users * (1 - new_fraction)).to_numpy() | \
+           (rng.random(len(train_df)) < new_fraction)
+    base_df, new_df = train_df[~late], train_df[late]
+
+    base, base_time = timed(fit_full_mf, base_df, n_epochs=n_epochs, n_factors=n_factors)
+    (updated, stats), update_time = timed(incremental_fit, base, new_df, n_epochs=update_epochs)
+    full, full_time = timed(fit_full_mf, train_df, n_epochs=n_epochs, n_factors=n_factors)
+    print(f"新评分 {len(new_df)} 条（新用户 {stats['new_users']}），留出集 {len(holdout_df)} 条")
+    print(f"  基础模型: RMSE {holdout_rmse(base, holdout_df):.4f}（训练 {base_time:.1f} s）")
+    print(f"  增量更新: RMSE {holdout_rmse(updated, holdout_df):.4f}，{update_time:.2f} s")
+    print(f"  完整重训: RMSE {holdout_rmse(full, holdout_df):.4f}，{full_time:.1f} s，"
+          f"增量提速 {full_time / update_time:.0f}x")
+
+# Python 层分配的峰值内存（numpy / scipy 数组都会计入）
+def traced_peak_mb(func, *args, **kwargs):
+    tracemalloc.start()
+    try:
+        result, seconds = timed(func, *args, **kwargs)
+        return result, seconds, tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+# 稀疏 top-k KNN vs 稠密 KNNBasic：不同用户规模下的训练耗时、峰值内存与模型大小
+# （稠密版本需要 用户数² 的相似度矩阵，只在 dense_limit 以内实际运行）
+def bench_knn_neighbors(user_counts=(10000, 100000, 1000000), ratings_per_user=20, n_novels=50000,
+                        k=40, n_jobs=1, dense_limit=10000):
+    rng = np.random.default_rng(0)
+    for n_users in user_counts:
+        n_ratings = n_users * ratings_per_user
+        users = rng.integers(0, n_users, n_ratings)
+        # 小说热度服从长尾分布，热门小说把大量用户连在一起
+        items = np.minimum(rng.zipf(1.3, n_ratings) - 1, n_novels - 1)
+        ratings = np.round(rng.uniform(1, 5, n_ratings), 1)
+        model, seconds, peak = traced_peak_mb(train_knn_model, users, items, ratings,
+                                              np.arange(n_users), np.arange(n_novels), k=k, n_jobs=n_jobs)
+        sparse_mb = sum(model[key].nbytes for key in ('indptr', 'neighbors', 'sims')) / 2**20
+        print(f"{n_users} 用户: 稀疏 KNN {seconds:.1f} s, 峰值内存 {peak:.0f} MB, "
+              f"邻居存储 {sparse_mb:.1f} MB（稠密相似度矩阵 {n_users ** 2 * 8 / 2**20:.0f} MB）")
+        if n_users <= dense_limit:
+            ratings_df = pd.DataFrame({'user_id': users, 'novel_id': items, 'rating': ratings})
+            ratings_df = ratings_df.drop_duplicates(['user_id', 'novel_id'], keep='last')
+            data = Dataset.load_from_df(ratings_df, Reader(rating_scale=(1, 5)))
+            algo_knn = KNNBasic(sim_options={'name': 'cosine', 'user_based': True}, verbose=False)
+            _, seconds, peak = traced_peak_mb(algo_knn.fit, data.build_full_trainset())
+            print(f"  稠密 KNNBasic {seconds:.1f} s, 峰值内存 {peak:.0f} MB, "
+                  f"pickle {len(pickle.dumps(algo_knn)) / 2**20:.0f} MB")
+
+# 服务端微批处理：逐个用户打分 vs 一批用户一次矩阵打分（每个请求的平均耗时）
+def bench_batch_scoring(n_novels=100000, n_requests=256, batch_sizes=(1, 8, 32, 64), n=100):
+    factors = synthetic_factors(n_novels, n_users=n_requests, n_factors=100)
+    item_inner = np.arange(n_novels, dtype=np.int64)
+    users = [{'bu': factors['bu'][u], 'pu': factors['pu'][u]} for u in range(n_requests)]
+    start = time.perf_counter()
+    for user in users:
+        top_n_indices(np.round(score_items(factors, item_inner, user), 2), n)
+    print(f"逐个打分 ({n_novels} 本小说): {(time.perf_counter() - start) / n_requests * 1000:.2f} ms/请求")
+    for size in batch_sizes:
+        start = time.perf_counter()
+        for i in range(0, n_requests, size):
+            for row in np.round(score_items_batch(factors, item_inner, users[i:i + size]), 2):
+                top_n_indices(row, n)
+        print(f"  微批 {size:>3}: {(time.perf_counter() - start) / n_requests * 1000:.2f} ms/请求")
+
+# 位图过滤索引：过滤表达式耗时，以及只为候选打分 vs 全目录打分（SVD + 标签匹配）
+def bench_filter_index(n_novels=1000000, n=100, trials=20):
+    novels_df = synthetic_novels(n_novels)
+    factors = synthetic_factors(n_novels, n_factors=100)
+    item_inner = np.arange(n_novels, dtype=np.int64)
+    index, build_time = timed(build_filter_index, novels_df)
+    tag_index = build_tag_index(novels_df)
+    platforms = novels_df['platform'].value_counts().index
+    tags = novels_df['tags'].str.split('、').explode().value_counts().index
+    expressions = {
+        '单平台': ('platform', platforms[0]),
+        '两平台 AND 标签': ('and', ('or', ('platform', platforms[0]), ('platform', platforms[1])),
+                           ('tag', tags[0])),
+        '单平台 AND NOT 标签': ('and', ('platform', platforms[0]), ('not', ('tag', tags[1]))),
+    }
+    print(f"位图过滤索引 ({n_novels} 本小说): 建索引 {build_time * 1000:.0f} ms（一次性）")
+    for label, expr in expressions.items():
+        bits, eval_time = timed(evaluate, index, expr)
+        rows, rows_time = timed(candidate_rows, index, expr)
+        print(f"  {label}: 位运算 {eval_time * 1e6:.0f} µs, 展开为 {len(rows)} 个候选 {rows_time * 1000:.2f} ms")
+
+    rows = candidate_rows(index, expressions['单平台'])
+    user = {'bu': 0.1, 'pu': factors['pu'][0]}
+    preferred_tags = tags[:4].tolist()
+
+    def full():
+        top_n_indices(np.round(score_items(factors, item_inner, user), 2), n)
+        tag_top_n(tag_index, preferred_tags, n)
+
+    def filtered():
+        candidates = candidate_rows(index, expressions['单平台'])
+        top_n_indices(np.round(score_items(factors, item_inner[candidates], user), 2), n)
+        tag_top_n(tag_index, preferred_tags, n, candidates)
+    full_time = min(timed(full)[1] for _ in range(trials))
+    filtered_time = min(timed(filtered)[1] for _ in range(trials))
+    print(f"SVD + 标签打分: 全目录 {full_time * 1000:.1f} ms, 单平台候选 {len(rows)} 本 "
+          f"{filtered_time * 1000:.1f} ms（含过滤）, 加速 {full_time / filtered_time:.1f}x")
+
+# 在新进程中读取目录和评分表（CSV 或快照），返回 (解析耗时秒数, 常驻内存增量 MB)
+READ_PROBE = """
+import sys, time
+def rss_mb():
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmRSS')) / 1024
+import numpy, pandas, pyarrow, catalog_snapshot
+novels_csv, ratings_csv, snapshot_dir = sys.argv[2:5]
+if sys.argv[1] == 'csv':
+    snapshot_dir = '/nonexistent'
+before = rss_mb()
+start = time.perf_counter()
+ratings = catalog_snapshot.read_ratings(ratings_csv, snapshot_dir=snapshot_dir)
+novels = catalog_snapshot.read_novels(novels_csv, snapshot_dir=snapshot_dir)
+print(time.perf_counter() - start, rss_mb() - before)
+"""
+
+# CSV vs 类型化 Parquet 快照：新进程中读取目录和评分表（打分所需列）的耗时与内存占用
+def bench_catalog_snapshot(n_novels=100000, n_ratings=10000000):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        write_synthetic_dataset(tmp_dir, n_novels, n_ratings)
+        novels_csv = os.path.join(tmp_dir, 'novels.csv')
+        ratings_csv = os.path.join(tmp_dir, 'user_ratings.csv')
+        snapshot_dir = os.path.join(tmp_dir, 'snapshot')
+        _, convert_time = timed(convert_to_snapshot, novels_csv, ratings_csv, snapshot_dir)
+        size = {
+            'csv': os.path.getsize(novels_csv) + os.path.getsize(ratings_csv),
+            'snapshot': sum(os.path.getsize(os.path.join(snapshot_dir, name)) for name in os.listdir(snapshot_dir)),
+        }
+        print(f"目录 {n_novels} 本 + 评分 {n_ratings} 行: 转换快照 {convert_time:.1f} s（一次性）")
+        for kind in ('csv', 'snapshot'):
+            output = subprocess.run([sys.executable, '-c', READ_PROBE, kind, novels_csv, ratings_csv, snapshot_dir],
+                                    check=True, capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__)))
+            seconds, rss = map(float, output.stdout.split())
+            print(f"  {kind}: 文件 {size[kind] / 2**20:.0f} MB, 读取 {seconds:.2f} s, 常驻内存增量 {rss:.0f} MB")
+
+# 多核 DSGD 的扩展性：1/2/4/8 个进程的训练耗时与加速比，留出集 RMSE 与串行 Surprise SVD 对照；
+# 任一进程数下 RMSE 比 Surprise 高出 rmse_tolerance 以上时报错（并行训练的精度不能明显下降）
+def bench_parallel_sgd(n_users=100000, n_items=20000, n_ratings=5000000, workers=(1, 2, 4, 8), n_epochs=20,
+                       rmse_tolerance=0.01):
+    ratings_df = synthetic_ratings(n_users, n_items, n_ratings)
+    holdout = np.random.default_rng(1).random(len(ratings_df)) < 0.02
+    train_df, holdout_df = ratings_df[~holdout], ratings_df[holdout]
+    data = Dataset.load_from_df(train_df[['user_id', 'novel_id', 'rating']], Reader(rating_scale=(1, 5)))
+    algo_svd = SVD(n_epochs=n_epochs, random_state=0)
+    _, surprise_time = timed(algo_svd.fit, data.build_full_trainset())
+    print(f"训练 {len(train_df)} 条评分 x {n_epochs} 轮，留出集 {len(holdout_df)} 条")
+    surprise_rmse = holdout_rmse(get_svd_factors(algo_svd), holdout_df)
+    print(f"  Surprise SVD（串行）: {surprise_time:.1f} s, RMSE {surprise_rmse:.4f}")
+    base_time, failed = None, []
+    for n_workers in workers:
+        factors, seconds = timed(fit_full_mf, train_df, trainer=train_mf_dsgd, n_workers=n_workers,
+                                 n_epochs=n_epochs)
+        base_time = base_time or seconds
+        rmse = holdout_rmse(factors, holdout_df)
+        if rmse - surprise_rmse > rmse_tolerance:
+            failed.append(n_workers)
+        print(f"  DSGD {n_workers} 进程: {seconds:.1f} s（相对 1 进程 {base_time / seconds:.1f}x，"
+              f"相对 Surprise {surprise_time / seconds:.1f}x）, RMSE {rmse:.4f}（{rmse - surprise_rmse:+.4f}）")
+    if failed:
+        raise RuntimeError(f"DSGD {failed} 进程的留出集 RMSE 比 Surprise 高出 {rmse_tolerance} 以上")
+
+BENCHMARKS = {
+    'svd_scoring': bench_svd_scoring,
+    'tag_index': bench_tag_index,
+    'hybrid_fusion': bench_hybrid_fusion,
+    'ann_index': bench_ann_index,
+    'model_artifact': bench_model_artifact,
+    'knn_neighbors': bench_knn_neighbors,
+    'fold_in': bench_fold_in,
+    'incremental_update': bench_incremental_update,
+    'batch_scoring': bench_batch_scoring,
+    'filter_index': bench_filter_index,
+    'catalog_snapshot': bench_catalog_snapshot,
+    'parallel_sgd': bench_parallel_sgd,
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="推荐流程性能基准")
+    parser.add_argument('names', nargs='*', help=f"要运行的基准（默认全部）：{', '.join(BENCHMARKS)}")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"未知的基准: {', '.join(unknown)}（可选: {', '.join(BENCHMARKS)}）")
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+# 无平台评分时的展示文本
+NO_RATING_TEXT = "暂无评分"
+
+# 预处理小说目录：按列一次性算好展示字段，推荐阶段只需按下标取值
+def prepare_catalog(novels_df, icon_resolver):
+    catalog = novels_df.copy()
+    # 平台图标：每个不同平台只解析一次
+    platforms = catalog['platform'].astype(str)
+    icons = {platform: icon_resolver(platform) for platform in platforms.unique()}
+    catalog['platform_icon'] = platforms.map(icons)
+    # 平台评分：保留两位小数，无评分（缺失或 <= 0）记为 NaN
+    if 'rating' in catalog:
+        ratings = pd.to_numeric(catalog['rating'], errors='coerce').round(2)
+    else:
+        ratings = pd.Series(np.nan, index=catalog.index)
+    ratings = ratings.where(ratings > 0)
+    catalog['platform_rating'] = ratings
+    # 展示文本固定一位小数（与数据源一致），不随列的数值类型变化
+    catalog['platform_rating_text'] = ratings.map(lambda r: f"{r:.1f}").where(ratings.notna(), NO_RATING_TEXT)
+    return catalog
+
+# 把推荐结果（目录下标 + 推荐评分）物化成展示用的字典，只对当前页调用
+def materialize_books(catalog, indices, scores):
+    rows = catalog.iloc[np.asarray(indices)]
+    return [
+        {
+            'id': novel_id,
+            'title': title,
+            'author': author,
+            'tags': tags,
+            'platform': platform,
+            'platform_icon': icon,
+            'predicted_rating': round(float(score), 2),
+            'platform_rating': rating_text
+        }
+        for novel_id, title, author, tags, platform, icon, rating_text, score in zip(
+            rows['id'].tolist(), rows['title'].tolist(), rows['author'].tolist(),
+            rows['tags'].tolist(), rows['platform'].tolist(), rows['platform_icon'].tolist(),
+            rows['platform_rating_text'].tolist(), np.asarray(scores).tolist()
+        )
+    ]
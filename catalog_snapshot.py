@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from mf_training import RATING_COLUMNS, read_csv_range
+from tag_index import TAG_SEPARATORS
+
+# 类型化列式快照（Parquet）：由 CSV 转换而来，启动时代替 CSV 解析；快照缺失或过期时读 CSV
+SNAPSHOT_DIR = 'data/snapshot'
+NOVELS_SNAPSHOT = 'novels.parquet'
+RATINGS_SNAPSHOT = 'user_ratings.parquet'
+MANIFEST_FILE = 'snapshot.json'
+FORMAT_VERSION = 1
+
+NOVELS_CSV = 'data/novels.csv'
+RATINGS_CSV = 'data/user_ratings.csv'
+
+# 读取时还原为 pandas 分类类型的列（Parquet 中为字典编码字符串）
+CATEGORY_COLUMNS = ('platform', 'gender', 'interests')
+# 评分表各列的紧凑类型（未列出的列不写入快照）
+RATING_TYPES = {
+    'user_id': 'int32',
+    'novel_id': 'int32',
+    'rating': 'float32',
+    'gender': 'string',
+    'age': 'float32',
+    'interests': 'string',
+    'reading_time': 'float32',
+}
+
+# 源 CSV 的签名（大小 + 修改时间），用于判断快照是否过期
+def _source_signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def load_manifest(snapshot_dir=SNAPSHOT_DIR):
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# 整数 id 转为 int32，超出范围时报错（不静默截断）
+def _to_int32(values, column):
+    values = pd.to_numeric(values)
+    if len(values) and (values.max() > np.iinfo(np.int32).max or values.min() < np.iinfo(np.int32).min):
+        raise ValueError(f"{column} 超出 int32 范围，无法写入快照")
+    return values.astype(np.int32)
+
+# 标签字符串 -> 标签列表（去掉空标签）
+def split_tags(tags):
+    return tags.fillna('').astype(str).str.split(TAG_SEPARATORS, regex=True).map(
+        lambda values: [tag for tag in values if tag])
+
+# 小说目录 -> 类型化表：int32 id、float32 评分、分类平台、预先拆分的标签列表
+def _typed_novels(novels_df):
+    novels_df = novels_df.copy()
+    novels_df['id'] = _to_int32(novels_df['id'], 'id')
+    if 'rating' in novels_df:
+        novels_df['rating'] = pd.to_numeric(novels_df['rating'], errors='coerce').astype(np.float32)
+    novels_df['platform'] = novels_df['platform'].astype(str).astype('category')
+    novels_df['tag_list'] = split_tags(novels_df['tags'])
+    return novels_df
+
+# 评分块 -> 类型化块
+def _typed_ratings(chunk):
+    chunk = chunk[[column for column in RATING_TYPES if column in chunk]].copy()
+    for column in ('user_id', 'novel_id'):
+        chunk[column] = _to_int32(chunk[column], column)
+    for column, dtype in RATING_TYPES.items():
+        if column in chunk and dtype == 'float32':
+            chunk[column] = pd.to_numeric(chunk[column], errors='coerce').astype(np.float32)
+        elif column in chunk and dtype == 'string':
+            chunk[column] = chunk[column].astype(str).where(chunk[column].notna(), None)
+    return chunk
+
+# 把 CSV 转换为快照：评分表分块转换、按行组追加写入，内存占用与总行数无关；
+# 全部写完后才更新清单，读取端不会用到写了一半的快照
+def convert_to_snapshot(novels_csv=NOVELS_CSV, ratings_csv=RATINGS_CSV, snapshot_dir=SNAPSHOT_DIR,
+                        chunksize=1000000):
+    import pyarrow as pa  # 只有转换时需要直接使用 pyarrow
+    import pyarrow.parquet as pq
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    sources = {'novels': _source_signature(novels_csv), 'ratings': _source_signature(ratings_csv)}
+    start = time.perf_counter()
+    novels_path = os.path.join(snapshot_dir, NOVELS_SNAPSHOT)
+    novels_df = _typed_novels(pd.read_csv(novels_csv))
+    novels_df.to_parquet(novels_path + '.tmp', index=False)
+    os.replace(novels_path + '.tmp', novels_path)
+
+    ratings_path = os.path.join(snapshot_dir, RATINGS_SNAPSHOT)
+    arrow_types = {'int32': pa.int32(), 'float32': pa.float32(), 'string': pa.string()}
+
+    def arrow_schema(columns):
+        return pa.schema([(column, arrow_types[RATING_TYPES[column]]) for column in columns])
+    writer, n_rows = None, 0
+    try:
+        for chunk in pd.read_csv(ratings_csv, chunksize=chunksize):
+            chunk = _typed_ratings(chunk)
+            if writer is None:
+                schema = arrow_schema(chunk.columns)
+                writer = pq.ParquetWriter(ratings_path + '.tmp', schema)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            n_rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    # 只有表头的评分 CSV 不产生任何块：按表头的列写一个空表
+    if writer is None:
+        schema = arrow_schema(_typed_ratings(pd.read_csv(ratings_csv, nrows=0)).columns)
+        pq.write_table(schema.empty_table(), ratings_path + '.tmp')
+    os.replace(ratings_path + '.tmp', ratings_path)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'sources': {'novels': [novels_csv] + sources['novels'], 'ratings': [ratings_csv] + sources['ratings']},
+        'columns': {'novels': list(novels_df.columns), 'ratings': list(schema.names)},
+        'rows': {'ratings': n_rows},
+    }
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    print(f"快照 -> {snapshot_dir}: 评分 {n_rows} 行, {time.perf_counter() - start:.1f} s")
+    return manifest
+
+# 与 csv_path 对应且未过期的快照文件及其列名；指定 size 时还要求快照恰好覆盖源文件的前 size 字节。没有时返回 None
+def snapshot_file(name, csv_path, snapshot_dir=SNAPSHOT_DIR, size=None):
+    manifest = load_manifest(snapshot_dir)
+    if manifest is None or manifest.get('format_version') != FORMAT_VERSION:
+        return None
+    source = manifest['sources'].get(name)
+    try:
+        if source is None or source != [csv_path] + _source_signature(csv_path):
+            return None
+        if size is not None and source[1] != size:
+            return None
+    except FileNotFoundError:
+        return None
+    path = os.path.join(snapshot_dir, NOVELS_SNAPSHOT if name == 'novels' else RATINGS_SNAPSHOT)
+    return (path, manifest['columns'][name]) if os.path.exists(path) else None
+
+# 读快照（只读需要的列，分类列直接读成 pandas 分类类型；read_dictionary 是 pyarrow 引擎的参数）；
+# 快照缺少所需的列、未安装 pyarrow 或其版本不支持该参数时返回 None
+def _read_snapshot(snapshot, columns):
+    if snapshot is None:
+        return None
+    path, file_columns = snapshot
+    columns = file_columns if columns is None else list(columns)
+    if not set(columns) <= set(file_columns):
+        return None
+    try:
+        return pd.read_parquet(path, engine='pyarrow', columns=columns,
+                               read_dictionary=[c for c in CATEGORY_COLUMNS if c in columns])
+    except (ImportError, TypeError):
+        return None
+
+# 读小说目录：优先类型化快照，否则解析 CSV（CSV 没有 tag_list 列，按需现场拆分）
+def read_novels(csv_path=NOVELS_CSV, columns=None, snapshot_dir=SNAPSHOT_DIR):
+    novels_df = _read_snapshot(snapshot_file('novels', csv_path, snapshot_dir), columns)
+    if novels_df is None:
+        csv_columns = None if columns is None else [c for c in columns if c != 'tag_list']
+        novels_df = pd.read_csv(csv_path, usecols=csv_columns)
+        if columns is not None and 'tag_list' in columns:
+            novels_df['tag_list'] = split_tags(novels_df['tags'])
+    return novels_df
+
+# 读评分表：默认只读训练 / 打分需要的列，优先类型化快照，否则解析 CSV；
+# end 为评分日志水位时只读到水位为止（快照须恰好覆盖这些字节，否则按字节范围读 CSV）
+def read_ratings(csv_path=RATINGS_CSV, columns=RATING_COLUMNS, snapshot_dir=SNAPSHOT_DIR, end=None):
+    usecols = None if columns is None else list(columns)
+    ratings_df = _read_snapshot(snapshot_file('ratings', csv_path, snapshot_dir, end), columns)
+    if ratings_df is None and end is None:
+        ratings_df = pd.read_csv(csv_path, usecols=usecols)
+    elif ratings_df is None:
+        chunks = list(read_csv_range(csv_path, end=end, usecols=usecols))
+        if not chunks:
+            chunks = [pd.read_csv(csv_path, usecols=usecols, nrows=0)]
+        ratings_df = pd.concat(chunks, ignore_index=True)
+    return ratings_df
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="把小说目录和评分 CSV 转换为类型化 Parquet 快照")
+    parser.add_argument('--novels', default=NOVELS_CSV)
+    parser.add_argument('--ratings', default=RATINGS_CSV)
+    parser.add_argument('--out', default=SNAPSHOT_DIR, help="快照目录")
+    parser.add_argument('--chunksize', type=int, default=1000000, help="评分表每块转换的行数")
+    args = parser.parse_args()
+    convert_to_snapshot(args.novels, args.ratings, args.out, args.chunksize)
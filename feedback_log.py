@@ -0,0 +1,192 @@
+import atexit
+import copy
+import glob
+import json
+import os
+import queue
+import threading
+import time
+
+import pandas as pd
+
+# 反馈日志：只追加的 JSONL 分段文件，单段超过 SEGMENT_MAX_BYTES 后切换到新段
+FEEDBACK_DIR = 'data/feedback'
+SEGMENT_PATTERN = 'feedback-{:06d}.jsonl'
+SEGMENT_MAX_BYTES = 64 * 2**20
+
+# 后台线程每攒够 BATCH_SIZE 条或等待 FLUSH_INTERVAL 秒写一次盘
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 1.0
+
+# 进程级写入队列与后台写线程（首次写入时启动）
+_QUEUE = queue.Queue()
+_LOCK = threading.Lock()
+_WRITER = {'thread': None, 'atexit': False}
+_STATS = {'queued': 0, 'written': 0, 'batches': 0, 'errors': 0}
+
+# 统计计数：写线程与调用方线程都会更新，一律持锁
+def _count(name, n=1):
+    with _LOCK:
+        _STATS[name] += n
+
+# 目录下已有的分段，按序号排列
+def list_segments(log_dir=FEEDBACK_DIR):
+    return sorted(glob.glob(os.path.join(log_dir, SEGMENT_PATTERN.replace('{:06d}', '[0-9]' * 6))))
+
+def _segment_number(path):
+    return int(os.path.basename(path).split('-')[1].split('.')[0])
+
+# 打开当前写入段：续写最后一段（进程重启后接着写），写满则切换到下一段
+def _open_segment(log_dir, min_number=1):
+    os.makedirs(log_dir, exist_ok=True)
+    segments = list_segments(log_dir)
+    number = max(_segment_number(segments[-1]) if segments else 1, min_number)
+    path = os.path.join(log_dir, SEGMENT_PATTERN.format(number))
+    if os.path.exists(path) and os.path.getsize(path) >= SEGMENT_MAX_BYTES:
+        path = os.path.join(log_dir, SEGMENT_PATTERN.format(number + 1))
+    f = open(path, 'ab')
+    # 上次进程在写一行的中途退出时，补一个换行，残缺行由读取端跳过
+    if f.tell() > 0:
+        with open(path, 'rb') as tail:
+            tail.seek(-1, os.SEEK_END)
+            if tail.read(1) != b'\n':
+                f.write(b'\n')
+    return f, _segment_number(path)
+
+# 把一批记录序列化后追加到 log_dir 的当前段，一批只做一次 write + fsync；
+# 单条记录无法序列化时只丢弃该条并计入 errors，不影响同批其他记录
+def _write_batch(segment, log_dir, records):
+    f, number = segment
+    lines = []
+    for record in records:
+        try:
+            lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+        except Exception:
+            _count('errors')
+    if lines:
+        f.write(''.join(lines).encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+        with _LOCK:
+            _STATS['written'] += len(lines)
+            _STATS['batches'] += 1
+    if f.tell() >= SEGMENT_MAX_BYTES:
+        f.close()
+        segment[:] = _open_segment(log_dir, number + 1)
+
+# 后台写线程：阻塞等待第一条记录，之后最多再等 FLUSH_INTERVAL 秒凑成一批，
+# 按目录分组写盘；有 flush 请求时不再等待。写盘出错不终止线程，flush 等待方总会被唤醒
+def _writer_loop():
+    segments = {}
+    while True:
+        item = _QUEUE.get()
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        batches, waiters, size = {}, [], 0
+        while item is not None:
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+            else:
+                log_dir, record = item
+                batches.setdefault(log_dir, []).append(record)
+                size += 1
+            if size >= BATCH_SIZE:
+                break
+            try:
+                if waiters:
+                    item = _QUEUE.get_nowait()
+                else:
+                    item = _QUEUE.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+        try:
+            for log_dir, records in batches.items():
+                try:
+                    if log_dir not in segments:
+                        segments[log_dir] = list(_open_segment(log_dir))
+                    _write_batch(segments[log_dir], log_dir, records)
+                except Exception:
+                    _count('errors')
+        finally:
+            for waiter in waiters:
+                waiter.set()
+        if item is None:
+            for f, _ in segments.values():
+                f.close()
+            return
+
+def _ensure_writer():
+    with _LOCK:
+        thread = _WRITER['thread']
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=_writer_loop, name='feedback-writer', daemon=True)
+            thread.start()
+            _WRITER['thread'] = thread
+            if not _WRITER['atexit']:
+                atexit.register(close)
+                _WRITER['atexit'] = True
+
+# 记录一条反馈：入队时深拷贝一份（调用方之后修改原字典不影响落盘内容），立即返回，不阻塞界面；
+# 不同 log_dir 的记录由同一写线程分别写入各自目录
+def save_feedback(record, log_dir=FEEDBACK_DIR):
+    _ensure_writer()
+    _QUEUE.put((log_dir, copy.deepcopy(record)))
+    _count('queued')
+
+# 等待此前入队的记录全部落盘
+def flush(timeout=None):
+    if _WRITER['thread'] is None or not _WRITER['thread'].is_alive():
+        return True
+    done = threading.Event()
+    _QUEUE.put(done)
+    return done.wait(timeout)
+
+# 落盘并停止写线程（进程退出时自动调用）
+def close(timeout=10):
+    with _LOCK:
+        thread = _WRITER['thread']
+        _WRITER['thread'] = None
+    if thread is not None and thread.is_alive():
+        _QUEUE.put(None)
+        thread.join(timeout)
+
+# 写入统计（已入队 / 已写入条数、批次数、写入失败次数）
+def feedback_stats():
+    with _LOCK:
+        stats = dict(_STATS)
+    return dict(stats, pending=_QUEUE.qsize())
+
+# 按写入顺序流式读取反馈记录，从 start=(段号, 字节偏移) 开始（默认从头）；跳过崩溃时留下的残缺行。
+# 传入 position 字典时，读取过程中把最后一整行之后的位置写入 position['segment'] / ['offset']，
+# 下次以此为 start 即可只读新增记录（未写完的末行留到下次再读）
+def read_feedback(log_dir=FEEDBACK_DIR, start=None, position=None):
+    start_segment, start_offset = start or (0, 0)
+    for path in list_segments(log_dir):
+        number = _segment_number(path)
+        if number < start_segment:
+            continue
+        offset = start_offset if number == start_segment else 0
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                if position is not None:
+                    position.update(segment=number, offset=offset)
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+# 把反馈中的会话内评分流式转换为训练用的评分块（列与 user_ratings.csv 相同）
+def feedback_rating_chunks(log_dir=FEEDBACK_DIR, chunksize=100000, start=None, position=None):
+    rows = []
+    for record in read_feedback(log_dir, start, position):
+        user_id = record.get('user_id')
+        for novel_id, rating in (record.get('ratings') or {}).items():
+            rows.append((user_id, int(novel_id), float(rating)))
+        if len(rows) >= chunksize:
+            yield pd.DataFrame(rows, columns=['user_id', 'novel_id', 'rating'])
+            rows = []
+    if rows:
+        yield pd.DataFrame(rows, columns=['user_id', 'novel_id', 'rating'])
@@ -0,0 +1,78 @@
+import weakref
+
+import numpy as np
+
+from tag_index import get_tag_index
+
+# 每个小说表只建一次过滤索引（表被回收后自动清除）
+_INDEX_CACHE = {}
+
+# 布尔下标 -> 位图（按 64 位字存放，第 i 本小说对应第 i // 64 个字的第 i % 64 位）
+def _pack(mask):
+    n_words = (len(mask) + 63) // 64
+    padded = np.zeros(n_words * 64, dtype=bool)
+    padded[:len(mask)] = mask
+    return np.packbits(padded, bitorder='little').view(np.uint64)
+
+# 由小说表构建位图索引：每个平台、每个标签一个位图
+def build_filter_index(novels_df):
+    n_novels = len(novels_df)
+    codes, platforms = novels_df['platform'].astype(str).factorize()
+    tag_index = get_tag_index(novels_df)
+    tag_bits = {}
+    for tag, i in tag_index['tag_ids'].items():
+        mask = np.zeros(n_novels, dtype=bool)
+        mask[tag_index['indices'][tag_index['indptr'][i]:tag_index['indptr'][i + 1]]] = True
+        tag_bits[tag] = _pack(mask)
+    return {
+        'platform': {platform: _pack(codes == i) for i, platform in enumerate(platforms)},
+        'tag': tag_bits,
+        'all': _pack(np.ones(n_novels, dtype=bool)),
+        'n_novels': n_novels,
+    }
+
+# 获取（并缓存）小说表的过滤索引
+def get_filter_index(novels_df):
+    key = id(novels_df)
+    index = _INDEX_CACHE.get(key)
+    if index is None:
+        index = build_filter_index(novels_df)
+        _INDEX_CACHE[key] = index
+        weakref.finalize(novels_df, _INDEX_CACHE.pop, key, None)
+    return index
+
+# 计算过滤表达式，返回位图。表达式为嵌套元组：
+# ('platform', 名称) / ('tag', 名称) / ('all',) / ('and', e1, e2, ...) / ('or', e1, ...) / ('not', e)；
+# 目录中不存在的平台 / 标签为空集
+def evaluate(index, expr):
+    op = expr[0]
+    if op in ('platform', 'tag'):
+        bits = index[op].get(expr[1])
+        return bits if bits is not None else np.zeros_like(index['all'])
+    if op == 'all':
+        return index['all']
+    if op == 'not':
+        return ~evaluate(index, expr[1]) & index['all']
+    if op in ('and', 'or'):
+        combine = np.bitwise_and if op == 'and' else np.bitwise_or
+        result = evaluate(index, expr[1]).copy()
+        for operand in expr[2:]:
+            combine(result, evaluate(index, operand), out=result)
+        return result
+    raise ValueError(f"未知的过滤运算: {op}")
+
+# 位图 -> 候选目录行号（升序，即目录顺序）
+def bits_to_rows(index, bits):
+    mask = np.unpackbits(bits.view(np.uint8), count=index['n_novels'], bitorder='little')
+    return np.flatnonzero(mask)
+
+# 满足过滤表达式的候选目录行号
+def candidate_rows(index, expr):
+    return bits_to_rows(index, evaluate(index, expr))
+
+# 由用户的常用平台生成过滤表达式（OR）；未选择平台时不过滤，返回 None
+def platform_filter(platforms):
+    platforms = sorted(set(platforms))
+    if not platforms:
+        return None
+    return ('or',) + tuple(('platform', platform) for platform in platforms)
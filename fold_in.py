@@ -0,0 +1,69 @@
+import numpy as np
+
+from profile_options import UNDISCLOSED
+from svd_scoring import align_item_ids, top_n_indices
+from tag_index import get_tag_index, match_counts
+
+# 画像伪评分：中性分 3 起，每命中一个喜欢的标签加 TAG_STEP（最多计 MAX_TAG_MATCHES 个），
+# 小说在常用平台上再加 PLATFORM_BONUS；只取伪评分最高的 MAX_PROFILE_ITEMS 本
+NEUTRAL_RATING = 3.0
+TAG_STEP = 0.6
+MAX_TAG_MATCHES = 3
+PLATFORM_BONUS = 0.3
+MAX_PROFILE_ITEMS = 200
+
+# 伪评分相对会话内真实评分的权重，以及最小二乘的 L2 正则系数
+PROFILE_WEIGHT = 0.3
+FOLD_IN_REG = 1.0
+
+# 由画像（喜欢的标签、常用平台）生成伪评分，返回目录下标和伪评分
+def profile_pseudo_ratings(novels_df, favorite_tags, preferred_platforms, limit=MAX_PROFILE_ITEMS):
+    tags = [tag for tag in favorite_tags if tag != UNDISCLOSED]
+    platforms = [platform for platform in preferred_platforms if platform != UNDISCLOSED]
+    counts = match_counts(get_tag_index(novels_df), tags)
+    pseudo = NEUTRAL_RATING + TAG_STEP * np.minimum(counts, MAX_TAG_MATCHES)
+    if platforms:
+        pseudo += PLATFORM_BONUS * novels_df['platform'].isin(platforms).to_numpy()
+    top = top_n_indices(pseudo, limit)
+    top = top[pseudo[top] > NEUTRAL_RATING]
+    return top, np.minimum(pseudo[top], 5.0)
+
+# 在固定的物品因子上解带权 L2 正则最小二乘，得到用户偏置和隐向量：
+# min Σ w (r - μ - b_i - b_u - p·q_i)² + reg (b_u² + |p|²)；没有模型认识的小说时返回 None
+def fold_in_user(factors, item_inner, ratings, weights, reg=FOLD_IN_REG):
+    known = item_inner >= 0
+    if not known.any():
+        return None
+    inner, ratings, weights = item_inner[known], np.asarray(ratings)[known], np.asarray(weights)[known]
+    qi = np.asarray(factors['qi'][inner], dtype=np.float64)
+    if factors['biased']:
+        x = np.hstack([qi, np.ones((len(inner), 1))])
+        y = ratings - factors['global_mean'] - factors['bi'][inner]
+    else:
+        x, y = qi, ratings
+    solution = np.linalg.solve((x.T * weights) @ x + reg * np.eye(x.shape[1]), x.T @ (weights * y))
+    n_factors = qi.shape[1]
+    return {'bu': float(solution[n_factors]) if factors['biased'] else 0.0, 'pu': solution[:n_factors]}
+
+# 新用户的评分输入：画像伪评分 + 会话内评分（{小说 id: 评分}，同一小说以会话评分为准），
+# 返回小说 id、评分和最小二乘权重
+def visitor_ratings(novels_df, favorite_tags, preferred_platforms, session_ratings=None):
+    rows, pseudo = profile_pseudo_ratings(novels_df, favorite_tags, preferred_platforms)
+    session_ratings = session_ratings or {}
+    rated_ids = np.array(list(session_ratings), dtype=novels_df['id'].dtype)
+    keep = ~np.isin(novels_df['id'].to_numpy()[rows], rated_ids)
+    rows, pseudo = rows[keep], pseudo[keep]
+    ids = np.concatenate([novels_df['id'].to_numpy()[rows], rated_ids])
+    ratings = np.concatenate([pseudo, np.fromiter(session_ratings.values(), dtype=np.float64,
+                                                  count=len(session_ratings))])
+    weights = np.concatenate([np.full(len(rows), PROFILE_WEIGHT), np.ones(len(session_ratings))])
+    return ids, ratings, weights
+
+# 新用户 fold-in，同时返回其评分 (小说 id, 评分)（KNN 按它为访客找邻居）
+def fold_in_visitor(factors, novels_df, favorite_tags, preferred_platforms, session_ratings=None):
+    ids, ratings, weights = visitor_ratings(novels_df, favorite_tags, preferred_platforms, session_ratings)
+    return fold_in_user(factors, align_item_ids(factors, ids), ratings, weights), (ids, ratings)
+
+# 新用户 fold-in：画像伪评分 + 会话内评分
+def fold_in_profile(factors, novels_df, favorite_tags, preferred_platforms, session_ratings=None):
+    return fold_in_visitor(factors, novels_df, favorite_tags, preferred_platforms, session_ratings)[0]
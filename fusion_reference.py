@@ -0,0 +1,44 @@
+import numpy as np
+
+# 混合融合的参考实现与随机输入（tests/test_hybrid_fusion.py 与 benchmarks.py 共用）：
+# 旧实现是逐条记录的 Python 融合循环，既是测试的黄金输出，也是基准测试的计时对照
+def fuse_candidates_loop(novel_ids, platform_ratings, content_idx, match_counts, cf_idx, cf_scores, n=100):
+    content_ids = set(novel_ids[content_idx].tolist())
+    candidates = [(idx, match, 0) for idx, match in zip(content_idx[:50].tolist(), match_counts[:50].tolist())]
+    cf_count = 0
+    for idx, score in zip(cf_idx.tolist(), cf_scores.tolist()):
+        if novel_ids[idx] not in content_ids and cf_count < 50:
+            candidates.append((idx, 0, score))
+            cf_count += 1
+    final_scores = []
+    if candidates:
+        max_match = max(match for _, match, _ in candidates) or 1
+        for idx, match, predicted in candidates:
+            if match > 0:
+                base = (match / max_match) * 5 * 0.7 + 3 * 0.3
+            else:
+                base = predicted
+            platform_rating = platform_ratings[idx]
+            if platform_rating > 0:
+                if platform_rating > 3:
+                    adj = ((platform_rating - 3) / 0.2) * 0.03
+                else:
+                    adj = ((3 - platform_rating) / 0.2) * (-0.01)
+                final = min(5, max(0, base + adj))
+            else:
+                final = base
+            final_scores.append(final)
+    order = sorted(range(len(candidates)), key=lambda i: final_scores[i], reverse=True)[:n]
+    return [candidates[i][0] for i in order], [final_scores[i] for i in order]
+
+# 随机生成一组融合输入：重叠的候选、同分、缺失的平台评分都会出现
+def random_fusion_inputs(rng, n_novels=5000, n=100):
+    platform_ratings = np.round(rng.uniform(0, 5, n_novels), 1)
+    platform_ratings[rng.random(n_novels) < 0.1] = np.nan
+    n_content = rng.integers(0, n + 1)
+    content_idx = rng.choice(n_novels, n_content, replace=False)
+    match_counts = np.sort(rng.integers(1, 5, n_content))[::-1]
+    cf_idx = np.concatenate([rng.choice(content_idx, min(n_content, 20), replace=False),
+                             rng.choice(n_novels, n, replace=False)])[:n]
+    cf_scores = np.sort(np.round(rng.uniform(1, 5, len(cf_idx)), 2))[::-1]
+    return np.arange(n_novels), platform_ratings, content_idx, match_counts, cf_idx, cf_scores
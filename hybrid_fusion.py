@@ -0,0 +1,39 @@
+import numpy as np
+
+from svd_scoring import top_n_indices
+
+# 融合权重：内容匹配度 70% + 协同过滤 30%（协同过滤部分按中性分 3 计）
+CONTENT_WEIGHT = 0.7
+CF_WEIGHT = 0.3
+
+# 平台评分校准后的最终分（平台评分缺失时不校准）
+def calibrate_scores(base, platform_ratings):
+    rated = platform_ratings > 0
+    adj = np.where(platform_ratings > 3,
+                   ((platform_ratings - 3) / 0.2) * 0.03,
+                   ((3 - platform_ratings) / 0.2) * (-0.01))
+    return np.where(rated, np.clip(base + adj, 0, 5), base)
+
+# 混合推荐融合：内容推荐优先取前 content_quota 本，再补不重复的协同过滤结果，
+# 计算最终分后稳定排序取 top-n；返回目录下标和最终分
+def fuse_candidates(novel_ids, platform_ratings, content_idx, match_counts, cf_idx, cf_scores,
+                    n=100, content_quota=50, cf_quota=50):
+    # 1. 去重：跳过已出现在内容推荐（完整列表）中的协同过滤结果
+    cf_keep = np.isin(novel_ids[cf_idx], novel_ids[content_idx], invert=True)
+    cf_idx = cf_idx[cf_keep][:cf_quota]
+    cf_scores = cf_scores[cf_keep][:cf_quota]
+    content_idx = content_idx[:content_quota]
+    match_counts = match_counts[:content_quota]
+
+    # 2. 基础分：命中标签的按匹配度折算，其余用协同过滤预测分
+    indices = np.concatenate([content_idx, cf_idx]).astype(np.int64)
+    matches = np.concatenate([match_counts, np.zeros(len(cf_idx))])
+    predicted = np.concatenate([np.zeros(len(content_idx)), cf_scores])
+    max_match = matches.max() if len(matches) and matches.max() > 0 else 1
+    content_score = (matches / max_match) * 5
+    base = np.where(matches > 0, content_score * CONTENT_WEIGHT + 3 * CF_WEIGHT, predicted)
+
+    # 3. 平台评分校准 + top-n
+    final = calibrate_scores(base, platform_ratings[indices])
+    top = top_n_indices(final, n)
+    return indices[top], final[top]
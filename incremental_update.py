@@ -0,0 +1,111 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from ann_index import ANN_INDEX_FILE, build_ivf_index, save_ann_index
+from feedback_log import FEEDBACK_DIR, feedback_rating_chunks
+from mf_training import RATING_COLUMNS, train_mf_sgd
+from model_artifact import MODEL_STORE, item_raw_ids, load_artifact, publish_artifact, user_raw_ids
+
+# 评分日志（只追加），水位记录已训练到的字节偏移
+RATINGS_FILE = 'data/user_ratings.csv'
+
+# 评分日志当前的水位：最后一个完整行之后的字节偏移（正在追加的半行不计入）
+def ratings_watermark(path=RATINGS_FILE):
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.seek(max(0, size - (1 << 16)))
+        tail = f.read()
+    return size - len(tail) + tail.rfind(b'\n') + 1
+
+# 读取水位之后新追加的评分，返回 (评分表, 新水位)；只读新增部分，不重新解析整份日志
+def read_new_ratings(path, offset):
+    with open(path, 'rb') as f:
+        header = f.readline()
+        start = max(offset, len(header))
+        f.seek(start)
+        tail = f.read()
+    tail = tail[:tail.rfind(b'\n') + 1]
+    if not tail:
+        return pd.DataFrame(columns=RATING_COLUMNS), start
+    ratings_df = pd.read_csv(io.BytesIO(header + tail), usecols=RATING_COLUMNS).dropna()
+    return ratings_df, start + len(tail)
+
+# 训练用的水位记录（写入模型清单）：评分日志偏移 + 反馈日志位置（未并入反馈时为 None）
+def make_watermark(ratings_path, ratings_offset, feedback=None):
+    return {'ratings_file': ratings_path, 'ratings_offset': int(ratings_offset),
+            'feedback': [feedback['segment'], feedback['offset']] if feedback else None}
+
+# 在已有 SVD 因子上增量训练：为新用户 / 新小说追加随机初始化的因子行，
+# 只在新评分上跑几轮 SGD（全局均值保持不变），返回新的因子字典和训练统计
+def incremental_fit(factors, ratings_df, n_epochs=3, lr=0.005, reg=0.02, init_std=0.1,
+                    batch_size=1024, random_state=0, verbose=False):
+    if not factors['biased']:
+        raise ValueError("增量更新只支持带偏置的 SVD 模型")
+    rng = np.random.default_rng(random_state)
+    user_index = pd.Index(user_raw_ids(factors))
+    item_index = pd.Index(item_raw_ids(factors))
+    new_users = pd.Index(pd.unique(ratings_df['user_id'])).difference(user_index, sort=False)
+    new_items = pd.Index(pd.unique(ratings_df['novel_id'])).difference(item_index, sort=False)
+    n_factors = factors['qi'].shape[1]
+
+    def extend(values, n_new, shape=()):
+        rows = rng.normal(0, init_std, (n_new,) + shape) if shape else np.zeros(n_new)
+        return np.concatenate([np.asarray(values, dtype=np.float32), rows.astype(np.float32)])
+    params = {
+        'bu': extend(factors['bu'], len(new_users)),
+        'bi': extend(factors['bi'], len(new_items)),
+        'pu': extend(factors['pu'], len(new_users), (n_factors,)),
+        'qi': extend(factors['qi'], len(new_items), (n_factors,)),
+    }
+    user_index, item_index = user_index.append(new_users), item_index.append(new_items)
+    data = {
+        'users': user_index.get_indexer(ratings_df['user_id']).astype(np.int32),
+        'items': item_index.get_indexer(ratings_df['novel_id']).astype(np.int32),
+        'ratings': ratings_df['rating'].to_numpy(dtype=np.float32),
+        'global_mean': factors['global_mean'],
+    }
+    _, stats = train_mf_sgd(data, n_epochs=n_epochs, lr=lr, reg=reg, batch_size=batch_size,
+                            random_state=random_state, verbose=verbose, params=params)
+    stats.update(new_users=len(new_users), new_items=len(new_items), rows=len(data['ratings']))
+    updated = dict(params, global_mean=factors['global_mean'], biased=True,
+                   rating_scale=tuple(factors['rating_scale']), user_ids=user_index,
+                   item_index=item_index, item_inner=np.arange(len(item_index), dtype=np.int64))
+    return updated, stats
+
+# 增量更新当前模型版本：读取水位之后的新评分（及反馈），增量训练后发布新版本并重建近似检索索引；
+# 运行中的 App 检测到 CURRENT 变化后自动换用新版本。没有新评分时返回 None
+def update_model(store=MODEL_STORE, feedback_dir=FEEDBACK_DIR, ann_index_path=ANN_INDEX_FILE, **sgd_options):
+    current = load_artifact(store)
+    training = current['manifest']['training']
+    watermark = training.get('watermark')
+    if not watermark:
+        raise ValueError("当前模型版本没有记录水位，请先完整训练一次")
+    ratings_df, ratings_offset = read_new_ratings(watermark['ratings_file'], watermark['ratings_offset'])
+    # 反馈位置：未读到新反馈（或不并入反馈）时沿用原水位
+    chunks, position = [ratings_df], {}
+    if watermark['feedback']:
+        position.update(segment=watermark['feedback'][0], offset=watermark['feedback'][1])
+    if feedback_dir:
+        chunks += feedback_rating_chunks(feedback_dir, start=watermark['feedback'], position=position)
+    new_ratings = pd.concat(chunks, ignore_index=True)
+    if new_ratings.empty:
+        print("没有新评分，模型保持不变")
+        return None
+
+    factors, stats = incremental_fit(current, new_ratings, **sgd_options)
+    version = publish_artifact(factors, store, metadata={
+        'trainer': 'incremental_update.incremental_fit',
+        'base_version': current['manifest']['model_version'],
+        'n_ratings': training.get('n_ratings', 0) + len(new_ratings),
+        'params': sgd_options,
+        'watermark': make_watermark(watermark['ratings_file'], ratings_offset, position),
+    })
+    # 已有小说的 qi / bi 都变了、新小说追加了因子行：旧索引与新版本不再匹配，
+    # 不重建的话近似模式会一直退回全量精确打分
+    save_ann_index(build_ivf_index(factors), ann_index_path)
+    print(f"增量更新 {current['manifest']['model_version']} -> {version}: 新评分 {stats['rows']} 条, "
+          f"新用户 {stats['new_users']}, 新小说 {stats['new_items']}, 训练 {stats['seconds']:.2f} s")
+    return version
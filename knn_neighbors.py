@@ -0,0 +1,181 @@
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from scipy import sparse
+
+from svd_scoring import align_item_ids, top_n_indices, user_inner_id
+
+# 稀疏近邻模型文件（与其他模型文件放在一起）
+KNN_MODEL_FILE = 'knn_neighbors.npz'
+
+# 用户 x 小说评分矩阵（CSR），内部 id 即行 / 列号；同一用户重复评分同一小说时取最后一次
+def rating_matrix(users, items, ratings, n_users, n_items):
+    users, items = np.asarray(users, dtype=np.int64), np.asarray(items, dtype=np.int64)
+    _, last = np.unique((users * n_items + items)[::-1], return_index=True)
+    last = len(users) - 1 - last
+    return sparse.csr_matrix(
+        (np.asarray(ratings, dtype=np.float64)[last], (users[last], items[last])),
+        shape=(n_users, n_items))
+
+# 每行只保留相似度最高的 k 个（按 (行, 相似度降序, 邻居 id) 排序），行号为块内行号
+def _top_k_per_row(rows, cols, values, n_rows, k):
+    order = np.lexsort((cols, -values, rows))
+    rows, cols, values = rows[order], cols[order], values[order]
+    row_start = np.searchsorted(rows, np.arange(n_rows))
+    top = np.arange(len(rows)) - row_start[rows] < k
+    return rows[top], cols[top], values[top]
+
+# 一块用户与全体用户的余弦相似度（与 Surprise 相同，只在共同评分的小说上计算），
+# 每行只保留相似度最高的 k 个邻居（不含自己），返回 (行, 邻居, 相似度) 三元组。
+# 另一侧的用户也按 tile_size 分片：热门小说几乎与所有用户共现时，块 × 全体用户的乘积接近稠密，
+# 分片后中间结果至多 块大小 × tile_size 个元素，每片算完立即并入当前的 top-k
+def _block_top_k(matrix, indicator, squares, start, stop, k, min_support, tile_size):
+    block, block_indicator, block_squares = matrix[start:stop], indicator[start:stop], squares[start:stop]
+    best = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))
+    for lo in range(0, matrix.shape[0], tile_size):
+        hi = min(lo + tile_size, matrix.shape[0])
+        dot = (block @ matrix[lo:hi].T).tocsr()
+        # 分母：各自在共同小说上的评分平方和
+        norms = (block_squares @ indicator[lo:hi].T).multiply(block_indicator @ squares[lo:hi].T)
+        sims = dot.multiply(norms.tocsr().sqrt().power(-1)).tocoo()
+        rows, cols, values = sims.row, sims.col, sims.data
+        keep = (rows + start != cols + lo) & (values > 0)
+        if min_support > 1:
+            support = (block_indicator @ indicator[lo:hi].T).tocsr()
+            keep &= np.asarray(support[rows, cols]).ravel() >= min_support
+        tile = (rows[keep], cols[keep] + lo, values[keep])
+        best = _top_k_per_row(*(np.concatenate([b, t]) for b, t in zip(best, tile)), stop - start, k)
+    rows, cols, values = best
+    return rows + start, cols, values
+
+# 分块计算用户相似度，只保留每个用户的 top-k 邻居（CSR 存储）；两侧用户都按 block_size 分片，
+# 峰值内存只与 block_size² 和 k 有关，与用户数无关，n_jobs > 1 时多进程并行
+def build_user_neighbors(matrix, k=40, block_size=2048, min_support=1, n_jobs=1):
+    n_users = matrix.shape[0]
+    indicator = matrix.copy()
+    indicator.data = np.ones_like(indicator.data)
+    squares = matrix.multiply(matrix).tocsr()
+    blocks = Parallel(n_jobs=n_jobs)(
+        delayed(_block_top_k)(matrix, indicator, squares, start, min(start + block_size, n_users), k,
+                              min_support, block_size)
+        for start in range(0, n_users, block_size))
+    rows = np.concatenate([b[0] for b in blocks]) if blocks else np.empty(0, dtype=np.int64)
+    cols = np.concatenate([b[1] for b in blocks]) if blocks else np.empty(0, dtype=np.int64)
+    sims = np.concatenate([b[2] for b in blocks]) if blocks else np.empty(0)
+    # 各块按行号顺序返回、块内已按行排好，三元组可直接组成 CSR
+    return {
+        'indptr': np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n_users))]),
+        'neighbors': cols.astype(np.int32),
+        'sims': sims.astype(np.float32),
+    }
+
+# 训练稀疏 KNN 模型：评分数组使用内部 id，user_raw / item_raw 按内部 id 顺序给出原始 id
+def train_knn_model(users, items, ratings, user_raw, item_raw, k=40, rating_scale=(1, 5),
+                    block_size=2048, min_support=1, n_jobs=1):
+    matrix = rating_matrix(users, items, ratings, len(user_raw), len(item_raw))
+    model = build_user_neighbors(matrix, k, block_size, min_support, n_jobs)
+    model.update({
+        'rating_indptr': matrix.indptr,
+        'rating_items': matrix.indices.astype(np.int32),
+        'ratings': matrix.data.astype(np.float32),
+        'user_raw': np.asarray(user_raw),
+        'item_raw': np.asarray(item_raw),
+        'global_mean': np.float64(np.mean(ratings)) if len(ratings) else np.float64(0),
+        'rating_scale': np.asarray(rating_scale, dtype=np.float64),
+        'k': np.int64(k),
+    })
+    return model
+
+def save_knn_model(model, path=KNN_MODEL_FILE):
+    np.savez(path, **model)
+
+# 加载模型
+def load_knn_model(path=KNN_MODEL_FILE):
+    with np.load(path) as data:
+        return prepare_knn_model({key: data[key] for key in data.files})
+
+# 组装成打分所需的结构（评分矩阵、id 映射）
+def prepare_knn_model(model):
+    n_users, n_items = len(model['user_raw']), len(model['item_raw'])
+    model['matrix'] = sparse.csr_matrix(
+        (model['ratings'], model['rating_items'], model['rating_indptr']), shape=(n_users, n_items))
+    # 按小说取列（为访客计算相似度时只需访客评过的几列）
+    model['matrix_by_item'] = model['matrix'].tocsc()
+    model['user_ids'] = pd.Index(model['user_raw'])
+    model['item_index'] = pd.Index(model['item_raw'])
+    model['item_inner'] = np.arange(n_items, dtype=np.int64)
+    model['global_mean'] = float(model['global_mean'])
+    model['rating_scale'] = tuple(model['rating_scale'])
+    return model
+
+# 用户的邻居及相似度（只保留正相似度，与 KNNBasic 一致）
+def user_neighbors(model, user_inner):
+    start, stop = model['indptr'][user_inner], model['indptr'][user_inner + 1]
+    neighbors, sims = model['neighbors'][start:stop], model['sims'][start:stop]
+    positive = sims > 0
+    return neighbors[positive], sims[positive].astype(np.float64)
+
+# 模型中没有的访客（App 中的新用户）：按其评分（小说原始 id、评分）与全体用户计算余弦相似度，
+# 与训练时的定义相同（只在共同评分的小说上计算），取相似度为正的前 k 个用户作为邻居
+def visitor_neighbors(model, novel_ids, ratings, k=None):
+    k = int(model['k']) if k is None else k
+    inner = align_item_ids(model, novel_ids)
+    known = inner >= 0
+    if not known.any():
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    columns = model['matrix_by_item'][:, inner[known]]
+    ratings = np.asarray(ratings, dtype=np.float64)[known]
+    indicator = columns.copy()
+    indicator.data = np.ones_like(indicator.data)
+    dot = columns @ ratings
+    squares = np.asarray(columns.multiply(columns).sum(axis=1)).ravel()
+    norms = np.sqrt(squares * (indicator @ np.square(ratings)))
+    sims = np.divide(dot, norms, out=np.zeros(len(dot)), where=norms > 0)
+    top = top_n_indices(sims, k)
+    top = top[sims[top] > 0]
+    return top, sims[top]
+
+# 邻居评分估计：相似度加权的邻居评分均值；没有邻居评过的小说为全局均值
+def neighbor_scores(model, item_inner, neighbors, sims):
+    est = np.full(len(item_inner), model['global_mean'])
+    predicted = np.zeros(len(item_inner), dtype=bool)
+    ratings = model['matrix'][neighbors]
+    weighted = ratings.T @ sims
+    rated = ratings.copy()
+    rated.data = np.ones_like(rated.data)
+    weights = rated.T @ sims
+    known = np.flatnonzero(item_inner >= 0)
+    inner = item_inner[known]
+    has_weight = weights[inner] > 0
+    rows = known[has_weight]
+    est[rows] = weighted[inner[has_weight]] / weights[inner[has_weight]]
+    predicted[rows] = True
+    low, high = model['rating_scale']
+    return np.clip(est, low, high), predicted
+
+# 对整个目录打分：相似度加权的邻居评分均值；没有邻居评过的小说（或未知用户）为全局均值。
+# 与 KNNBasic 不同，邻居集合是训练时固定的 top-k，而不是每本小说各取 k 个评过分的邻居
+def knn_score_items(model, item_inner, user_inner=None):
+    if user_inner is None:
+        return np.full(len(item_inner), model['global_mean']), np.zeros(len(item_inner), dtype=bool)
+    return neighbor_scores(model, item_inner, *user_neighbors(model, user_inner))
+
+# 第二路协同过滤信号：在 SVD 分数上融合 KNN 邻居评分（只融合 KNN 能预测的小说），
+# 返回融合后的 top-n 目录下标和分数（保留两位小数，可限定在候选目录行 candidates 中）；
+# 模型中没有该用户时按访客评分 visitor=(小说 id, 评分) 现场找邻居，两者都没有时返回 None
+def blend_knn_top_n(svd_scores, knn_model, novels_df, n=100, user_id=-1, knn_weight=0.5, candidates=None,
+                    visitor=None):
+    user_inner = user_inner_id(knn_model, user_id)
+    if user_inner is not None:
+        neighbors, sims = user_neighbors(knn_model, user_inner)
+    elif visitor is not None:
+        neighbors, sims = visitor_neighbors(knn_model, *visitor)
+    else:
+        return None
+    item_inner = align_item_ids(knn_model, novels_df['id'].to_numpy())
+    knn_est, predicted = neighbor_scores(knn_model, item_inner, neighbors, sims)
+    scores = np.where(predicted, (1 - knn_weight) * svd_scores + knn_weight * knn_est, svd_scores)
+    rows = candidates if candidates is not None else np.arange(len(scores))
+    scores = np.round(scores[rows], 2)
+    top = top_n_indices(scores, n)
+    return rows[top], scores[top]
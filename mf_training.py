@@ -0,0 +1,156 @@
+import io
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# 评分日志中训练需要的列及其紧凑类型
+RATING_COLUMNS = ['user_id', 'novel_id', 'rating']
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块
+    resource = None
+
+# 当前进程的峰值常驻内存（MB）：ru_maxrss 在 Linux 上以 KB 计、在 macOS 上以字节计；
+# Windows 上用 psutil 读取峰值工作集（未安装时返回 NaN）
+def peak_rss_mb():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+    try:
+        import psutil
+    except ImportError:
+        return float('nan')
+    return psutil.Process().memory_info().peak_wset / 2**20
+
+# 分段读取 CSV 日志中 [start, end) 字节范围内的完整行，逐块返回（每块至多 chunksize 行）；
+# end 为水位时只读到水位为止，之后追加的行和正在写入的半行都不会读入（end 为 None 时读到最后一个完整行）
+def read_csv_range(path, start=0, end=None, chunksize=1000000, chunk_bytes=64 * 2**20, **read_options):
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(max(start, len(header)))
+        left = (os.path.getsize(path) if end is None else end) - f.tell()
+        pending = b''
+        while left > 0:
+            data = f.read(min(chunk_bytes, left))
+            if not data:
+                break
+            left -= len(data)
+            data = pending + data
+            cut = data.rfind(b'\n') + 1
+            pending = data[cut:]
+            if cut:
+                yield from pd.read_csv(io.BytesIO(header + data[:cut]), chunksize=chunksize, **read_options)
+
+# 把一块原始 id 编码为连续的内部 id，新出现的 id 追加到映射末尾
+def _encode_ids(values, id_map):
+    codes, uniques = pd.factorize(values)
+    mapped = np.fromiter((id_map.setdefault(raw, len(id_map)) for raw in uniques.tolist()),
+                         dtype=np.int64, count=len(uniques))
+    return mapped[codes].astype(np.int32)
+
+# 流式读取评分日志：分块解析、增量建立 id 映射，写成磁盘上的紧凑数组
+# （int32 用户/小说 id、float32 评分），返回只读内存映射；
+# extra_chunks 为附加的评分块（如反馈日志），接在评分日志之后读入；end 为水位时只读到水位为止
+def stream_ratings(path, work_dir, chunksize=1000000, extra_chunks=(), end=None):
+    os.makedirs(work_dir, exist_ok=True)
+    paths = {name: os.path.join(work_dir, f'{name}.bin') for name in ('users', 'items', 'ratings')}
+    user_ids, item_ids = {}, {}
+    n_ratings, rating_sum = 0, 0.0
+    start = time.perf_counter()
+    with open(paths['users'], 'wb') as users_f, open(paths['items'], 'wb') as items_f, \
+            open(paths['ratings'], 'wb') as ratings_f:
+        chunks = read_csv_range(path, end=end, chunksize=chunksize, usecols=RATING_COLUMNS,
+                                dtype={'rating': np.float32})
+        for chunk in itertools.chain(chunks, extra_chunks):
+            chunk = chunk[RATING_COLUMNS].dropna()
+            _encode_ids(chunk['user_id'].to_numpy(), user_ids).tofile(users_f)
+            _encode_ids(chunk['novel_id'].to_numpy(), item_ids).tofile(items_f)
+            ratings = chunk['rating'].to_numpy(dtype=np.float32)
+            ratings.tofile(ratings_f)
+            n_ratings += len(ratings)
+            rating_sum += float(ratings.sum(dtype=np.float64))
+    elapsed = time.perf_counter() - start
+
+    def open_array(name, dtype):
+        if n_ratings == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(paths[name], dtype=dtype, mode='r', shape=(n_ratings,))
+    return {
+        'users': open_array('users', np.int32),
+        'items': open_array('items', np.int32),
+        'ratings': open_array('ratings', np.float32),
+        'user_ids': user_ids,
+        'item_ids': item_ids,
+        'global_mean': rating_sum / n_ratings if n_ratings else 0.0,
+        'stats': {'rows': n_ratings, 'seconds': elapsed,
+                  'rows_per_sec': n_ratings / elapsed if elapsed else 0.0},
+    }
+
+# 一个 mini-batch 的 SGD 更新（带偏置的矩阵分解，目标与 Surprise SVD 相同）
+def sgd_step(params, users, items, ratings, global_mean, lr, reg):
+    bu, bi, pu, qi = params['bu'], params['bi'], params['pu'], params['qi']
+    pu_batch, qi_batch = pu[users], qi[items]
+    bu_batch, bi_batch = bu[users], bi[items]
+    err = ratings - (global_mean + bu_batch + bi_batch + np.einsum('ij,ij->i', pu_batch, qi_batch))
+    np.add.at(bu, users, lr * (err - reg * bu_batch))
+    np.add.at(bi, items, lr * (err - reg * bi_batch))
+    np.add.at(pu, users, lr * (err[:, None] * qi_batch - reg * pu_batch))
+    np.add.at(qi, items, lr * (err[:, None] * pu_batch - reg * qi_batch))
+    return float(np.square(err).sum())
+
+# mini-batch SGD 训练：按块读取内存映射，块顺序和块内顺序每轮打乱；
+# 传入 params 时在已有参数上继续训练（原地更新），否则随机初始化
+def train_mf_sgd(data, n_factors=100, n_epochs=20, lr=0.005, reg=0.02, init_std=0.1,
+                 batch_size=1024, block_size=1 << 20, random_state=0, verbose=True, params=None):
+    rng = np.random.default_rng(random_state)
+    n_ratings = len(data['ratings'])
+    if params is None:
+        n_users, n_items = len(data['user_ids']), len(data['item_ids'])
+        params = {
+            'bu': np.zeros(n_users, dtype=np.float32),
+            'bi': np.zeros(n_items, dtype=np.float32),
+            'pu': rng.normal(0, init_std, (n_users, n_factors)).astype(np.float32),
+            'qi': rng.normal(0, init_std, (n_items, n_factors)).astype(np.float32),
+        }
+    global_mean = np.float32(data['global_mean'])
+    lr, reg = np.float32(lr), np.float32(reg)
+    start = time.perf_counter()
+    for epoch in range(n_epochs):
+        sq_err = 0.0
+        for block_start in rng.permutation(np.arange(0, n_ratings, block_size)):
+            block = slice(block_start, block_start + block_size)
+            order = rng.permutation(min(block_size, n_ratings - block_start))
+            users = np.asarray(data['users'][block])[order]
+            items = np.asarray(data['items'][block])[order]
+            ratings = np.asarray(data['ratings'][block])[order]
+            for b in range(0, len(order), batch_size):
+                batch = slice(b, b + batch_size)
+                sq_err += sgd_step(params, users[batch], items[batch], ratings[batch],
+                                   global_mean, lr, reg)
+        if verbose:
+            print(f"epoch {epoch + 1}/{n_epochs}: train RMSE {np.sqrt(sq_err / max(n_ratings, 1)):.4f}")
+    elapsed = time.perf_counter() - start
+    stats = {'seconds': elapsed,
+             'rows_per_sec': n_ratings * n_epochs / elapsed if elapsed else 0.0}
+    return params, stats
+
+# 组装成 App 可直接打分的因子字典（与 svd_scoring.extract_svd_factors 的结构一致）
+def build_factors(params, data, rating_scale=(1, 5)):
+    item_raw = list(data['item_ids'].keys())
+    return {
+        'global_mean': float(data['global_mean']),
+        'bu': params['bu'],
+        'bi': params['bi'],
+        'pu': params['pu'],
+        'qi': params['qi'],
+        'biased': True,
+        'rating_scale': tuple(rating_scale),
+        'user_ids': dict(data['user_ids']),
+        'item_index': pd.Index(item_raw),
+        'item_inner': np.arange(len(item_raw), dtype=np.int64),
+    }
@@ -0,0 +1,149 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+# 模型产物目录：每个版本一个子目录，CURRENT 文件指向当前生效的版本
+MODEL_STORE = 'models/svd'
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+# 保留的已发布版本数（含当前版本），更早的版本在发布新版本后删除
+KEEP_VERSIONS = 3
+
+# 因子数组以 float32 存放，用户 / 小说原始 id 按内部 id 顺序存放
+FACTOR_ARRAYS = ('bu', 'bi', 'pu', 'qi')
+
+# 当前生效版本的目录（没有已发布版本时返回 None）
+def current_version_dir(store=MODEL_STORE):
+    try:
+        with open(os.path.join(store, CURRENT_FILE), encoding='utf-8') as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(store, version) if version else None
+
+# 已发布的版本号（升序）
+def _versions(store):
+    return sorted(int(name[1:]) for name in os.listdir(store) if name.startswith('v') and name[1:].isdigit())
+
+# 下一个版本号：已有版本号最大值 + 1
+def _next_version(store):
+    return f"v{max(_versions(store), default=0) + 1:06d}"
+
+# 删除最新 keep 个以外的旧版本（当前版本总是保留）；仍在内存映射旧版本的进程不受影响，
+# 已打开的文件在最后一个映射释放前不会真正从磁盘消失
+def prune_versions(store=MODEL_STORE, keep=KEEP_VERSIONS):
+    current = current_version_dir(store)
+    removed = []
+    for number in _versions(store)[:-keep] if keep > 0 else []:
+        version_dir = os.path.join(store, f"v{number:06d}")
+        if current is not None and os.path.samefile(version_dir, current):
+            continue
+        shutil.rmtree(version_dir, ignore_errors=True)
+        removed.append(os.path.basename(version_dir))
+    return removed
+
+# 原子地写入小文件：先写临时文件再 os.replace
+def _atomic_write(path, text):
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+# 导出并发布一个模型版本：.npy 因子数组 + JSON 清单，最后原子切换 CURRENT 并清理旧版本
+def publish_artifact(factors, store=MODEL_STORE, metadata=None, keep=KEEP_VERSIONS):
+    os.makedirs(store, exist_ok=True)
+    version = _next_version(store)
+    tmp_dir = os.path.join(store, f".{version}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    for name in FACTOR_ARRAYS:
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), np.asarray(factors[name], dtype=np.float32))
+    np.save(os.path.join(tmp_dir, 'user_ids.npy'), _compact_ids(user_raw_ids(factors)))
+    np.save(os.path.join(tmp_dir, 'item_ids.npy'), _compact_ids(item_raw_ids(factors)))
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'model_version': version,
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'global_mean': float(factors['global_mean']),
+        'biased': bool(factors['biased']),
+        'rating_scale': list(factors['rating_scale']),
+        'n_users': len(factors['pu']),
+        'n_items': len(factors['qi']),
+        'n_factors': int(factors['qi'].shape[1]),
+        'training': metadata or {},
+    }
+    _atomic_write(os.path.join(tmp_dir, MANIFEST_FILE), json.dumps(manifest, ensure_ascii=False, indent=2))
+    os.rename(tmp_dir, os.path.join(store, version))
+    _atomic_write(os.path.join(store, CURRENT_FILE), version)
+    prune_versions(store, keep)
+    return version
+
+# 按内部 id 顺序排列的用户原始 id（用户映射可能是 dict 或已加载产物中的 Index）
+def user_raw_ids(factors):
+    user_ids = factors['user_ids']
+    if isinstance(user_ids, pd.Index):
+        return np.asarray(user_ids, dtype=object)
+    user_raw = np.empty(len(factors['pu']), dtype=object)
+    user_raw[np.fromiter(user_ids.values(), dtype=np.int64, count=len(user_ids))] = list(user_ids.keys())
+    return user_raw
+
+# 按内部 id 顺序排列的小说原始 id
+def item_raw_ids(factors):
+    item_raw = np.empty(len(factors['qi']), dtype=object)
+    item_raw[factors['item_inner']] = np.asarray(factors['item_index'], dtype=object)
+    return item_raw
+
+# id 数组尽量存成整数类型（可内存映射），但只在转换无损时：数值 id 须能原样转回（1.5 不会截断成 1），
+# object id 须全部是整数（'007' 这样的字符串 id 不会变成 7）；其他情况存为字符串
+def _compact_ids(raw_ids):
+    raw_ids = np.asarray(raw_ids)
+    if raw_ids.dtype.kind in 'iuf':
+        converted = raw_ids.astype(np.int64)
+        if np.array_equal(converted.astype(raw_ids.dtype), raw_ids):
+            return converted
+    elif raw_ids.dtype == object and all(isinstance(raw_id, (int, np.integer)) and not isinstance(raw_id, bool)
+                                         for raw_id in raw_ids):
+        try:
+            return raw_ids.astype(np.int64)
+        except OverflowError:
+            pass
+    return raw_ids.astype(str)
+
+# 读取清单
+def load_manifest(version_dir):
+    with open(os.path.join(version_dir, MANIFEST_FILE), encoding='utf-8') as f:
+        return json.load(f)
+
+# 以内存映射方式加载当前版本，返回与 svd_scoring 兼容的因子字典；
+# 各进程共享同一份页缓存，加载几乎不复制数据
+def load_artifact(store=MODEL_STORE, version_dir=None):
+    version_dir = version_dir or current_version_dir(store)
+    if version_dir is None:
+        raise FileNotFoundError(f"{store} 中没有已发布的模型版本")
+    manifest = load_manifest(version_dir)
+    if manifest['format_version'] > FORMAT_VERSION:
+        raise ValueError(f"不支持的模型格式版本：{manifest['format_version']}")
+
+    def load(name):
+        return np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode='r')
+    item_ids = load('item_ids')
+    factors = {name: load(name) for name in FACTOR_ARRAYS}
+    factors.update({
+        'global_mean': manifest['global_mean'],
+        'biased': manifest['biased'],
+        'rating_scale': tuple(manifest['rating_scale']),
+        'user_ids': pd.Index(load('user_ids')),
+        'item_index': pd.Index(item_ids),
+        'item_inner': np.arange(len(item_ids), dtype=np.int64),
+        'manifest': manifest,
+    })
+    return factors
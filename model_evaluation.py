@@ -0,0 +1,161 @@
+import hashlib
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from surprise import Reader, Dataset, SVD
+
+from knn_neighbors import knn_score_items, prepare_knn_model, train_knn_model
+from svd_scoring import extract_svd_factors, score_pairs
+
+# 评估结果表与折划分缓存
+RESULTS_FILE = 'data/eval_results.csv'
+FOLD_CACHE_DIR = 'data/eval_cache'
+
+# 默认搜索网格
+SVD_GRID = {
+    'n_factors': [50, 100],
+    'n_epochs': [20],
+    'lr_all': [0.005, 0.01],
+    'reg_all': [0.02, 0.05],
+}
+KNN_GRID = {'k': [20, 40, 80]}
+
+# 排序指标：每个用户在测试集内按预测分排序，真实评分 >= RELEVANT_RATING 视为相关
+RANK_K = 10
+RELEVANT_RATING = 4.0
+
+# 网格展开为参数字典列表
+def expand_grid(grid):
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+# 把评分随机分成 n_folds 折，返回每条评分所属的折号；
+# 按评分内容 + 折数 + 种子缓存到磁盘，同一份数据重复评估时直接复用
+def make_folds(ratings_df, n_folds=5, seed=0, cache_dir=FOLD_CACHE_DIR):
+    digest = hashlib.sha1()
+    for column in ('user_id', 'novel_id', 'rating'):
+        digest.update(np.ascontiguousarray(ratings_df[column].to_numpy()).tobytes())
+    digest.update(f"{n_folds}:{seed}".encode())
+    path = os.path.join(cache_dir, f"folds_{digest.hexdigest()[:16]}.npy")
+    if os.path.exists(path):
+        return np.load(path)
+    rng = np.random.default_rng(seed)
+    folds = (rng.permutation(len(ratings_df)) % n_folds).astype(np.int8)
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(path, folds)
+    return folds
+
+# 训练 SVD 并为测试评分打分
+def _predict_svd(params, train_df, test_df):
+    data = Dataset.load_from_df(train_df, Reader(rating_scale=(1, 5)))
+    algo_svd = SVD(random_state=0, **params)
+    algo_svd.fit(data.build_full_trainset())
+    factors = extract_svd_factors(algo_svd)
+    user_index = pd.Index(list(factors['user_ids']))
+    user_inner = np.fromiter(factors['user_ids'].values(), dtype=np.int64, count=len(user_index))
+    pos = user_index.get_indexer(test_df['user_id'].to_numpy())
+    users = np.where(pos >= 0, user_inner[pos], -1)
+    pos = factors['item_index'].get_indexer(test_df['novel_id'].to_numpy())
+    items = np.where(pos >= 0, factors['item_inner'][pos], -1)
+    return score_pairs(factors, users, items)
+
+# 训练稀疏 KNN 并为测试评分打分（按用户分组，每个用户只算其测试小说）
+def _predict_knn(params, train_df, test_df):
+    user_codes, user_raw = pd.factorize(train_df['user_id'])
+    item_codes, item_raw = pd.factorize(train_df['novel_id'])
+    model = prepare_knn_model(train_knn_model(user_codes, item_codes, train_df['rating'].to_numpy(),
+                                              user_raw, item_raw, **params))
+    users = model['user_ids'].get_indexer(test_df['user_id'].to_numpy())
+    items = model['item_index'].get_indexer(test_df['novel_id'].to_numpy())
+    est = np.full(len(test_df), model['global_mean'])
+    order = np.argsort(users, kind='stable')
+    bounds = np.flatnonzero(np.diff(users[order])) + 1
+    for group in np.split(order, bounds):
+        if len(group) and users[group[0]] >= 0:
+            est[group] = knn_score_items(model, items[group], users[group[0]])[0]
+    return est
+
+PREDICTORS = {'svd': _predict_svd, 'knn': _predict_knn}
+
+# precision@k 与 NDCG@k（二元相关性）；测试小说不足 k 本的用户按实际推荐数计算 precision，
+# 没有相关小说的用户不计入 NDCG
+def ranking_metrics(users, est, true, k=RANK_K, threshold=RELEVANT_RATING):
+    df = pd.DataFrame({'user': users, 'est': est, 'relevant': np.asarray(true) >= threshold})
+    df = df.sort_values(['user', 'est'], ascending=[True, False], kind='stable')
+    rank = df.groupby('user').cumcount().to_numpy()
+    top = rank < k
+    discount = np.where(top, 1 / np.log2(rank + 2), 0)
+    by_user = pd.DataFrame({
+        'user': df['user'].to_numpy(),
+        'hits': df['relevant'].to_numpy() & top,
+        'n_rec': top,
+        'dcg': discount * df['relevant'].to_numpy(),
+        'n_rel': df['relevant'].to_numpy(),
+    }).groupby('user').sum()
+    ideal = np.concatenate([[0], np.cumsum(1 / np.log2(np.arange(k) + 2))])
+    idcg = ideal[np.minimum(by_user['n_rel'].to_numpy(), k)]
+    has_rel = idcg > 0
+    return {
+        f'precision@{k}': float((by_user['hits'] / by_user['n_rec']).mean()),
+        f'ndcg@{k}': float((by_user['dcg'].to_numpy()[has_rel] / idcg[has_rel]).mean()) if has_rel.any() else 0.0,
+    }
+
+# 评估一个 (模型, 参数, 折) 组合：训练、预测并计算 RMSE / MAE / 排序指标
+def evaluate_fold(kind, params, ratings_df, folds, fold, k=RANK_K):
+    test = folds == fold
+    train_df, test_df = ratings_df[~test], ratings_df[test]
+    start = time.perf_counter()
+    est = PREDICTORS[kind](params, train_df, test_df)
+    true = test_df['rating'].to_numpy()
+    metrics = {
+        'model': kind,
+        'params': json.dumps(params, sort_keys=True),
+        'fold': fold,
+        'rmse': float(np.sqrt(np.mean(np.square(est - true)))),
+        'mae': float(np.mean(np.abs(est - true))),
+    }
+    metrics.update(ranking_metrics(test_df['user_id'].to_numpy(), est, true, k))
+    metrics['seconds'] = time.perf_counter() - start
+    return metrics
+
+# 网格搜索：所有 (配置, 折) 组合分发到进程池，返回按配置汇总（各折均值）的结果表
+def grid_search(ratings_df, svd_grid=SVD_GRID, knn_grid=KNN_GRID, n_folds=5, n_jobs=-1, seed=0):
+    ratings_df = ratings_df[['user_id', 'novel_id', 'rating']].reset_index(drop=True)
+    folds = make_folds(ratings_df, n_folds, seed)
+    configs = [('svd', params) for params in expand_grid(svd_grid)] + \
+              [('knn', params) for params in expand_grid(knn_grid)]
+    start = time.perf_counter()
+    rows = Parallel(n_jobs=n_jobs)(
+        delayed(evaluate_fold)(kind, params, ratings_df, folds, fold)
+        for kind, params in configs for fold in range(n_folds))
+    elapsed = time.perf_counter() - start
+    per_fold = pd.DataFrame(rows)
+    results = per_fold.drop(columns='fold').groupby(['model', 'params'], as_index=False).mean()
+    return results.sort_values(['model', 'rmse'], kind='stable').reset_index(drop=True), elapsed
+
+# 每类模型 RMSE 最低的配置：{'svd': (参数, 指标), 'knn': (参数, 指标)}
+def best_configs(results):
+    best = {}
+    for kind, group in results.groupby('model'):
+        row = group.loc[group['rmse'].idxmin()]
+        metrics = row.drop(['model', 'params']).to_dict()
+        best[kind] = (json.loads(row['params']), metrics)
+    return best
+
+# 运行评估并写出结果表；compare_serial 时先串行跑一遍，报告并行加速比
+def run_evaluation(ratings_df, output=RESULTS_FILE, n_folds=5, n_jobs=-1, compare_serial=False, **grids):
+    if compare_serial:
+        _, serial_time = grid_search(ratings_df, n_folds=n_folds, n_jobs=1, **grids)
+    results, elapsed = grid_search(ratings_df, n_folds=n_folds, n_jobs=n_jobs, **grids)
+    print(results.to_string(index=False))
+    print(f"评估耗时 {elapsed:.1f} s（n_jobs={n_jobs}）")
+    if compare_serial:
+        print(f"串行耗时 {serial_time:.1f} s，加速比 {serial_time / elapsed:.2f}x")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    results.to_csv(output, index=False)
+    return results
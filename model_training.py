@@ -1,40 +1,177 @@
+import argparse
+import numpy as np
 import pandas as pd
-from surprise import Reader, Dataset, KNNBasic, SVD
-from surprise.model_selection import train_test_split
 import pickle
+import time
 
-# 加载数据
-def load_data():
-    user_ratings_df = pd.read_csv('data/user_ratings.csv')
-    novels_df = pd.read_csv('data/novels.csv')
+from ann_index import ANN_INDEX_FILE, build_ivf_index, save_ann_index
+from catalog_snapshot import read_novels, read_ratings
+from feedback_log import FEEDBACK_DIR, feedback_rating_chunks
+from incremental_update import RATINGS_FILE, make_watermark, ratings_watermark, update_model
+from knn_neighbors import KNN_MODEL_FILE, save_knn_model, train_knn_model
+from mf_training import stream_ratings, train_mf_sgd, build_factors, peak_rss_mb
+from model_artifact import publish_artifact
+from parallel_sgd import train_mf_dsgd
+from svd_scoring import get_svd_factors
+
+# 加载数据；ratings_end 为评分日志水位时只读到水位为止；
+# 指定 feedback_dir 时并入反馈日志中的会话评分（读到的位置写入 feedback_position）
+def load_data(feedback_dir=None, feedback_position=None, ratings_end=None):
+    user_ratings_df = read_ratings(RATINGS_FILE, end=ratings_end)
+    novels_df = read_novels('data/novels.csv')
+    if feedback_dir:
+        chunks = feedback_rating_chunks(feedback_dir, position=feedback_position)
+        user_ratings_df = pd.concat([user_ratings_df, *chunks], ignore_index=True)
     return user_ratings_df, novels_df
 
-# 准备Surprise数据
+# 准备Surprise数据（只有 Surprise 训练 / 评估才需要安装 scikit-surprise）
 def prepare_surprise_data(user_ratings_df):
+    from surprise import Reader, Dataset
     reader = Reader(rating_scale=(1, 5))
     data = Dataset.load_from_df(user_ratings_df[['user_id', 'novel_id', 'rating']], reader)
     return data
 
-# 训练并保存模型
-def train_and_save_models():
-    user_ratings_df, _ = load_data()
-    data = prepare_surprise_data(user_ratings_df)
-    trainset = data.build_full_trainset()  # 使用完整训练集
+# 训练并保存稀疏 KNN 模型（基于用户的余弦相似度，每个用户只保留 top-k 邻居）
+def train_and_save_knn(users, items, ratings, user_raw, item_raw, output=KNN_MODEL_FILE,
+                       k=40, n_jobs=1):
+    start = time.perf_counter()
+    model = train_knn_model(users, items, ratings, user_raw, item_raw, k=k, n_jobs=n_jobs)
+    print(f"KNN 训练: {time.perf_counter() - start:.1f} s, 用户 {len(user_raw)}, "
+          f"邻居 {len(model['neighbors'])}, 峰值内存 {peak_rss_mb():.0f} MB")
+    save_knn_model(model, output)
+
+# 多核 DSGD 训练 SVD（与 Surprise SVD 相同的目标和默认超参数），返回因子字典和训练参数
+def train_parallel_svd(users, items, ratings, user_raw, item_raw, global_mean, n_workers, n_factors=100,
+                       n_epochs=20, lr_all=0.005, reg_all=0.02):
+    data = {
+        'users': users.astype(np.int32),
+        'items': items.astype(np.int32),
+        'ratings': ratings.astype(np.float32),
+        'user_ids': dict(zip(user_raw, range(len(user_raw)))),
+        'item_ids': dict(zip(item_raw, range(len(item_raw)))),
+        'global_mean': global_mean,
+    }
+    params, stats = train_mf_dsgd(data, n_workers, n_factors=n_factors, n_epochs=n_epochs, lr=lr_all,
+                                  reg=reg_all, verbose=False)
+    print(f"DSGD 训练（{n_workers} 进程）: {stats['seconds']:.1f} s, {stats['rows_per_sec']:.0f} 行/秒")
+    return build_factors(params, data), {'n_factors': n_factors, 'n_epochs': n_epochs, 'lr_all': lr_all,
+                                         'reg_all': reg_all, 'n_workers': n_workers}
+
+# 评分表 -> 内部 id 数组（按首次出现的顺序编号，与 Surprise 的 trainset 一致）及原始 id 列表
+def encode_ratings(user_ratings_df):
+    users, user_raw = pd.factorize(user_ratings_df['user_id'])
+    items, item_raw = pd.factorize(user_ratings_df['novel_id'])
+    ratings = user_ratings_df['rating'].to_numpy(dtype=np.float64)
+    return users, items, ratings, user_raw.tolist(), item_raw.tolist()
 
-    # 训练KNN模型
-    sim_options = {'name': 'cosine', 'user_based': True}
-    algo_knn = KNNBasic(sim_options=sim_options)
-    algo_knn.fit(trainset)
+# 训练并保存模型；tune 时先做 k 折网格搜索，用各自 RMSE 最低的配置训练最终模型。
+# 先训练 KNN 再训练 SVD（KNN 的相似度计算可用 knn_jobs 个进程并行）；
+# sgd_workers > 1 时 SVD 改用多核 DSGD 训练，不需要 Surprise
+def train_and_save_models(knn_jobs=1, tune=False, eval_jobs=-1, feedback_dir=None, sgd_workers=1):
+    # 先记录水位，再只读到水位为止：模型恰好包含水位之前的评分，增量更新从这里接着读
+    ratings_offset, feedback_position = ratings_watermark(RATINGS_FILE), {}
+    user_ratings_df, _ = load_data(feedback_dir, feedback_position, ratings_offset)
+    svd_params, knn_params, evaluation = {}, {}, {}
+    if tune:
+        from model_evaluation import best_configs, run_evaluation
+        best = best_configs(run_evaluation(user_ratings_df, n_jobs=eval_jobs))
+        (svd_params, evaluation), (knn_params, _) = best['svd'], best['knn']
+        print(f"最佳配置: SVD {svd_params}, KNN {knn_params}")
+    users, items, ratings, user_raw, item_raw = encode_ratings(user_ratings_df)
 
-    # 训练SVD模型
-    algo_svd = SVD()
-    algo_svd.fit(trainset)
+    # 训练KNN模型（分块计算相似度，只保存 top-k 邻居）
+    train_and_save_knn(users, items, ratings, user_raw, item_raw, n_jobs=knn_jobs, **knn_params)
 
-    # 保存模型
-    with open('knn_model.pkl', 'wb') as f:
-        pickle.dump(algo_knn, f)
+    # 训练SVD模型并保存
+    if sgd_workers > 1:
+        model, trainer_params = train_parallel_svd(users, items, ratings, user_raw, item_raw,
+                                                   float(ratings.mean()), sgd_workers, **svd_params)
+        trainer = 'parallel_sgd.train_mf_dsgd'
+    else:
+        from surprise import SVD
+        trainset = prepare_surprise_data(user_ratings_df).build_full_trainset()  # 使用完整训练集
+        model = SVD(**svd_params)
+        model.fit(trainset)
+        trainer = 'surprise.SVD'
+        trainer_params = {'n_factors': model.n_factors, 'n_epochs': model.n_epochs,
+                          'lr_all': model.lr_bu, 'reg_all': model.reg_bu}
     with open('svd_model.pkl', 'wb') as f:
-        pickle.dump(algo_svd, f)
+        pickle.dump(model, f)
+
+    # 发布内存映射模型产物，并一同保存近似检索索引
+    factors = get_svd_factors(model)
+    publish_artifact(factors, metadata={
+        'trainer': trainer,
+        'n_ratings': len(ratings),
+        'params': trainer_params,
+        'evaluation': evaluation,
+        'watermark': make_watermark(RATINGS_FILE, ratings_offset, feedback_position),
+    })
+    save_ann_index(build_ivf_index(factors))
+
+# 流式训练（大规模评分日志）：分块读入 + 内存映射 + mini-batch SGD 训练 SVD（sgd_workers > 1 时多核 DSGD）；
+# 指定 knn_output 时同时训练稀疏 KNN 模型
+def train_streaming_model(ratings_path=RATINGS_FILE, work_dir='data/training_cache',
+                          output='svd_model.pkl', ann_index_path=ANN_INDEX_FILE,
+                          knn_output=None, knn_jobs=1, feedback_dir=None, chunksize=1000000,
+                          sgd_workers=1, **sgd_options):
+    ratings_offset, feedback_position = ratings_watermark(ratings_path), {}
+    extra_chunks = ()
+    if feedback_dir:
+        extra_chunks = feedback_rating_chunks(feedback_dir, chunksize, position=feedback_position)
+    data = stream_ratings(ratings_path, work_dir, chunksize=chunksize, extra_chunks=extra_chunks,
+                          end=ratings_offset)
+    ingest = data['stats']
+    print(f"读取评分 {ingest['rows']} 行: {ingest['seconds']:.1f} s, "
+          f"{ingest['rows_per_sec']:.0f} 行/秒, 用户 {len(data['user_ids'])}, 小说 {len(data['item_ids'])}")
+    if knn_output:
+        train_and_save_knn(data['users'], data['items'], data['ratings'], list(data['user_ids']),
+                           list(data['item_ids']), knn_output, n_jobs=knn_jobs)
+    if sgd_workers > 1:
+        params, stats = train_mf_dsgd(data, sgd_workers, work_dir=work_dir, **sgd_options)
+    else:
+        params, stats = train_mf_sgd(data, **sgd_options)
+    print(f"SGD 训练: {stats['seconds']:.1f} s, {stats['rows_per_sec']:.0f} 行/秒, "
+          f"峰值内存 {peak_rss_mb():.0f} MB")
+
+    # 保存为因子字典，App 的打分引擎可直接使用
+    factors = build_factors(params, data)
+    with open(output, 'wb') as f:
+        pickle.dump(factors, f)
+    publish_artifact(factors, metadata={
+        'trainer': 'parallel_sgd.train_mf_dsgd' if sgd_workers > 1 else 'mf_training.train_mf_sgd',
+        'n_ratings': ingest['rows'],
+        'params': dict(sgd_options, sgd_workers=sgd_workers),
+        'watermark': make_watermark(ratings_path, ratings_offset, feedback_position),
+    })
+    save_ann_index(build_ivf_index(factors), ann_index_path)
 
 if __name__ == '__main__':
-    train_and_save_models()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="训练推荐模型")
+    parser.add_argument('--streaming', action='store_true', help="流式训练模式（适用于超大评分日志）")
+    parser.add_argument('--incremental', action='store_true', help="增量更新：只在水位之后的新评分上训练当前模型版本")
+    parser.add_argument('--update-epochs', type=int, default=3, help="SGD 训练轮数（增量模式）")
+    parser.add_argument('--ratings', default=RATINGS_FILE, help="评分日志路径（流式模式）")
+    parser.add_argument('--chunksize', type=int, default=1000000, help="每次读取的行数（流式模式）")
+    parser.add_argument('--epochs', type=int, default=20, help="SGD 训练轮数（流式模式）")
+    parser.add_argument('--batch-size', type=int, default=1024, help="mini-batch 大小（流式模式）")
+    parser.add_argument('--knn', action='store_true', help="同时训练稀疏 KNN 模型（流式模式）")
+    parser.add_argument('--tune', action='store_true', help="先做 k 折网格搜索，用最佳配置训练并保存模型")
+    parser.add_argument('--eval-jobs', type=int, default=-1, help="网格搜索的并行进程数（-1 为全部核心）")
+    parser.add_argument('--evaluate-only', action='store_true', help="只运行评估并报告相对串行的加速比")
+    parser.add_argument('--feedback', action='store_true', help="训练数据并入反馈日志中的会话评分")
+    parser.add_argument('--knn-jobs', type=int, default=1, help="KNN 相似度分块计算的并行进程数")
+    parser.add_argument('--sgd-workers', type=int, default=1, help="SVD 训练的并行进程数（> 1 时使用多核 DSGD）")
+    args = parser.parse_args()
+    feedback_dir = FEEDBACK_DIR if args.feedback else None
+    if args.incremental:
+        update_model(feedback_dir=feedback_dir, n_epochs=args.update_epochs, batch_size=args.batch_size)
+    elif args.streaming:
+        train_streaming_model(args.ratings, knn_output=KNN_MODEL_FILE if args.knn else None,
+                              knn_jobs=args.knn_jobs, feedback_dir=feedback_dir, chunksize=args.chunksize,
+                              sgd_workers=args.sgd_workers, n_epochs=args.epochs, batch_size=args.batch_size)
+    elif args.evaluate_only:
+        from model_evaluation import run_evaluation
+        run_evaluation(load_data(feedback_dir)[0], n_jobs=args.eval_jobs, compare_serial=True)
+    else:
+        train_and_save_models(args.knn_jobs, args.tune, args.eval_jobs, feedback_dir, args.sgd_workers)
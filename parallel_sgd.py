@@ -0,0 +1,101 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+
+from mf_training import sgd_step
+
+# 多核 SGD 矩阵分解（DSGD 分层块）：用户、小说各随机分成 n_workers 组，评分按 (用户组, 小说组)
+# 排成 n_workers × n_workers 个块；每个子轮次取互不共享用户和小说的 n_workers 个块（一个“层”）
+# 由各进程同时训练，参数存放在共享的内存映射文件中，同一层内的更新互不冲突
+PARAM_NAMES = ('bu', 'bi', 'pu', 'qi')
+DATA_NAMES = ('users', 'items', 'ratings')
+
+# 按分组把评分排成块写入 store，返回各块在数组中的起止位置（长度 n_blocks² + 1）。
+# 评分数组可以是内存映射：先分段统计各块行数，再分段把每段评分按块散写进 store 中的内存映射，
+# 内存占用只与 chunk_rows 有关，不随评分总数增长
+def partition_ratings(data, n_blocks, store, rng, chunk_rows=1 << 20):
+    user_group = rng.permutation(len(data['user_ids'])) % n_blocks
+    item_group = rng.permutation(len(data['item_ids'])) % n_blocks
+    columns = [data[name] for name in DATA_NAMES]
+    n_ratings = len(columns[2])
+
+    def chunk_blocks(lo):
+        hi = min(lo + chunk_rows, n_ratings)
+        return user_group[np.asarray(columns[0][lo:hi])] * n_blocks + item_group[np.asarray(columns[1][lo:hi])]
+    counts = np.zeros(n_blocks * n_blocks, dtype=np.int64)
+    for lo in range(0, n_ratings, chunk_rows):
+        counts += np.bincount(chunk_blocks(lo), minlength=n_blocks * n_blocks)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    if n_ratings == 0:  # 长度为 0 的内存映射无法创建
+        for name, values in zip(DATA_NAMES, columns):
+            np.save(os.path.join(store, f'{name}.npy'), np.asarray(values[:0]))
+        return offsets
+
+    outputs = [np.lib.format.open_memmap(os.path.join(store, f'{name}.npy'), mode='w+',
+                                         dtype=np.asarray(values[:0]).dtype, shape=(n_ratings,))
+               for name, values in zip(DATA_NAMES, columns)]
+    cursor = offsets[:-1].copy()
+    for lo in range(0, n_ratings, chunk_rows):
+        block = chunk_blocks(lo)
+        order = np.argsort(block, kind='stable')
+        chunk_counts = np.bincount(block, minlength=n_blocks * n_blocks)
+        chunk_starts = np.cumsum(chunk_counts) - chunk_counts
+        sorted_block = block[order]
+        # 按块排序后段内第 i 个评分写到：该块已写到的位置 + 它在段内同块评分中的序号
+        positions = cursor[sorted_block] + np.arange(len(order)) - chunk_starts[sorted_block]
+        for output, values in zip(outputs, columns):
+            output[positions] = np.asarray(values[lo:lo + len(order)])[order]
+        cursor += chunk_counts
+    for output in outputs:
+        output.flush()
+    return offsets
+
+# 工作进程：以 mini-batch SGD 训练一个块（块内顺序随机），原地更新共享参数，返回平方误差和
+def _train_block(store, lo, hi, global_mean, lr, reg, batch_size, seed):
+    params = {name: np.load(os.path.join(store, f'{name}.npy'), mmap_mode='r+') for name in PARAM_NAMES}
+    order = lo + np.random.default_rng(seed).permutation(hi - lo)
+    users, items, ratings = (np.load(os.path.join(store, f'{name}.npy'), mmap_mode='r')[order]
+                             for name in DATA_NAMES)
+    sq_err = 0.0
+    for b in range(0, len(order), batch_size):
+        batch = slice(b, b + batch_size)
+        sq_err += sgd_step(params, users[batch], items[batch], ratings[batch], global_mean, lr, reg)
+    return sq_err
+
+# DSGD 训练：参数、返回值与 mf_training.train_mf_sgd 相同（目标同为带偏置的矩阵分解）；
+# n_workers=1 时退化为单进程按块训练。work_dir 为块数组和共享参数的临时目录（默认系统临时目录）
+def train_mf_dsgd(data, n_workers=4, n_factors=100, n_epochs=20, lr=0.005, reg=0.02, init_std=0.1,
+                  batch_size=1024, random_state=0, verbose=True, work_dir=None):
+    rng = np.random.default_rng(random_state)
+    n_ratings = len(data['ratings'])
+    n_users, n_items = len(data['user_ids']), len(data['item_ids'])
+    global_mean = np.float32(data['global_mean'])
+    lr, reg = np.float32(lr), np.float32(reg)
+    with tempfile.TemporaryDirectory(dir=work_dir) as store:
+        np.save(os.path.join(store, 'bu.npy'), np.zeros(n_users, dtype=np.float32))
+        np.save(os.path.join(store, 'bi.npy'), np.zeros(n_items, dtype=np.float32))
+        np.save(os.path.join(store, 'pu.npy'), rng.normal(0, init_std, (n_users, n_factors)).astype(np.float32))
+        np.save(os.path.join(store, 'qi.npy'), rng.normal(0, init_std, (n_items, n_factors)).astype(np.float32))
+        offsets = partition_ratings(data, n_workers, store, rng)
+        start = time.perf_counter()
+        with Parallel(n_jobs=n_workers) as parallel:
+            for epoch in range(n_epochs):
+                sq_err = 0.0
+                # 层的顺序每轮打乱；第 s 层由块 (w, (w + s) % n_workers) 组成
+                for s in rng.permutation(n_workers):
+                    blocks = [w * n_workers + (w + s) % n_workers for w in range(n_workers)]
+                    seeds = rng.integers(0, 2**32, n_workers)
+                    sq_err += sum(parallel(
+                        delayed(_train_block)(store, offsets[b], offsets[b + 1], global_mean, lr, reg,
+                                              batch_size, seed)
+                        for b, seed in zip(blocks, seeds)))
+                if verbose:
+                    print(f"epoch {epoch + 1}/{n_epochs}: train RMSE {np.sqrt(sq_err / max(n_ratings, 1)):.4f}")
+        elapsed = time.perf_counter() - start
+        params = {name: np.load(os.path.join(store, f'{name}.npy')) for name in PARAM_NAMES}
+    stats = {'seconds': elapsed, 'n_workers': n_workers,
+             'rows_per_sec': n_ratings * n_epochs / elapsed if elapsed else 0.0}
+    return params, stats
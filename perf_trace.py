@@ -0,0 +1,144 @@
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+
+# 热路径埋点：各阶段的调用次数、耗时、净分配内存块数（sys.getallocatedblocks 差值）。
+# 进程级累计计数器供导出（Prometheus 文本 / JSON），当前请求的逐阶段明细供调试面板展示
+_LOCK = threading.Lock()
+_COUNTERS = {}
+_REQUESTS = {'count': 0, 'seconds': 0.0}
+# tracemalloc 是进程级的：按引用计数开关，最后一个开启它的请求结束时才停止（外部已开启的不由这里停止）
+_TRACEMALLOC = {'users': 0, 'started': False}
+# 每个线程（Streamlit 会话 / 服务工作线程）各自的当前请求
+_LOCAL = threading.local()
+
+def _record(name, elapsed, blocks):
+    with _LOCK:
+        counter = _COUNTERS.setdefault(name, {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'blocks': 0})
+        counter['calls'] += 1
+        counter['seconds'] += elapsed
+        counter['max_seconds'] = max(counter['max_seconds'], elapsed)
+        counter['blocks'] += blocks
+
+# 计时一个阶段；在请求内时同时记入该请求的明细（嵌套阶段记录层级）
+@contextmanager
+def stage(name):
+    request = getattr(_LOCAL, 'request', None)
+    depth = request['depth'] if request is not None else 0
+    if request is not None:
+        request['depth'] += 1
+    start_blocks = sys.getallocatedblocks()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        blocks = sys.getallocatedblocks() - start_blocks
+        _record(name, elapsed, blocks)
+        if request is not None:
+            request['depth'] -= 1
+            request['stages'].append({'stage': name, 'depth': depth, 'ms': elapsed * 1000, 'blocks': blocks,
+                                      'offset_ms': (start - request['start']) * 1000})
+
+# 函数装饰器：整个调用作为一个阶段（默认以函数名命名）
+def traced(name=None):
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# 开始一个请求：可选开启 cProfile（仅当前线程）和 tracemalloc（进程级，有明显开销，按需开启）
+def start_request(profile=False, trace_memory=False):
+    request = {'stages': [], 'depth': 0, 'start': time.perf_counter(), 'profiler': None,
+               'trace_memory': trace_memory, 'notes': []}
+    if profile:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            request['profiler'] = profiler
+        except ValueError:  # 已有其他分析器在运行（例如另一个会话正在采样）
+            request['notes'].append("cProfile 未启用：已有其他分析器在运行")
+    if trace_memory:
+        with _LOCK:
+            if _TRACEMALLOC['users'] == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _TRACEMALLOC['started'] = True
+            _TRACEMALLOC['users'] += 1
+        tracemalloc.reset_peak()
+    _LOCAL.request = request
+    return request
+
+# 结束当前请求，返回逐阶段明细（按开始时间排序）以及可选的 cProfile / tracemalloc 结果
+def finish_request(top=20):
+    request = getattr(_LOCAL, 'request', None)
+    _LOCAL.request = None
+    if request is None:
+        return None
+    elapsed = time.perf_counter() - request['start']
+    result = {
+        'total_ms': elapsed * 1000,
+        'stages': sorted(request['stages'], key=lambda s: (s['offset_ms'], s['depth'])),
+        'notes': request['notes'],
+    }
+    if request['profiler'] is not None:
+        request['profiler'].disable()
+        stream = io.StringIO()
+        pstats.Stats(request['profiler'], stream=stream).sort_stats('cumulative').print_stats(top)
+        result['profile'] = stream.getvalue()
+    if request['trace_memory']:
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            result['memory_peak_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+            result['top_allocations'] = [str(stat) for stat in snapshot.statistics('lineno')[:top]]
+        with _LOCK:
+            _TRACEMALLOC['users'] -= 1
+            if _TRACEMALLOC['users'] == 0 and _TRACEMALLOC['started']:
+                tracemalloc.stop()
+                _TRACEMALLOC['started'] = False
+    with _LOCK:
+        _REQUESTS['count'] += 1
+        _REQUESTS['seconds'] += elapsed
+    return result
+
+# 累计计数器（JSON 友好的字典）
+def export_json():
+    with _LOCK:
+        return {'requests': dict(_REQUESTS), 'stages': {name: dict(c) for name, c in _COUNTERS.items()}}
+
+# 累计计数器的 Prometheus 文本格式
+def export_prometheus(prefix='novel'):
+    counters = export_json()
+    metrics = [
+        ('stage_calls_total', 'counter', "阶段调用次数", 'calls'),
+        ('stage_seconds_total', 'counter', "阶段累计耗时（秒）", 'seconds'),
+        ('stage_max_seconds', 'gauge', "阶段单次最大耗时（秒）", 'max_seconds'),
+        ('stage_net_allocated_blocks', 'gauge', "阶段累计净分配内存块数", 'blocks'),
+    ]
+    lines = []
+    for metric, kind, help_text, field in metrics:
+        lines += [f"# HELP {prefix}_{metric} {help_text}", f"# TYPE {prefix}_{metric} {kind}"]
+        for name, counter in sorted(counters['stages'].items()):
+            lines.append(f'{prefix}_{metric}{{stage="{name}"}} {counter[field]}')
+    lines += [f"# HELP {prefix}_requests_total 请求数", f"# TYPE {prefix}_requests_total counter",
+              f"{prefix}_requests_total {counters['requests']['count']}",
+              f"# HELP {prefix}_request_seconds_total 请求累计耗时（秒）",
+              f"# TYPE {prefix}_request_seconds_total counter",
+              f"{prefix}_request_seconds_total {counters['requests']['seconds']}"]
+    return '\n'.join(lines) + '\n'
+
+# 清空计数器（测试或重新开始统计时使用）
+def reset_counters():
+    with _LOCK:
+        _COUNTERS.clear()
+        _REQUESTS.update(count=0, seconds=0.0)
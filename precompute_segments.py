@@ -0,0 +1,146 @@
+import argparse
+import itertools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from joblib import Parallel, delayed
+
+from recommendation import (ALL_TAGS, GENDERS, OCCUPATIONS, PLATFORMS, READING_TIMES,
+                            generate_preferred_tags, profile_key, recommend_for_profile,
+                            recommendation_content_version)
+from resource_cache import get_resource
+
+# 画像分群推荐表（与模型文件放在一起）
+SEGMENT_FILE = 'segment_recommendations.npz'
+
+# 各年龄段的代表年龄（generate_preferred_tags 按 <20、<30、<40、其余 分段）
+AGE_BANDS = (18, 25, 35, 45)
+
+# 服务端查表统计（App 各会话线程和推荐服务共用）
+_LOCK = threading.Lock()
+_STATS = {'hits': 0, 'misses': 0, 'seconds': 0.0}
+
+# 画像键的字符串形式（查表用）
+def encode_key(key):
+    return json.dumps(key, ensure_ascii=False)
+
+# 不超过 max_size 个元素的全部组合（含空集）
+def _subsets(options, max_size):
+    return [list(combo) for size in range(max_size + 1) for combo in itertools.combinations(options, size)]
+
+# 枚举全部画像分群：性别 × 年龄段 × 职业 × 阅读时长，再乘以至多 max_favorite_tags 个喜欢的标签、
+# 至多 max_platforms 个常用平台；按规范化画像去重（很多人口属性组合得到相同的偏好标签）
+def enumerate_segments(max_favorite_tags=1, max_platforms=1):
+    year = datetime.now().year
+    preferred = {
+        tuple(sorted(set(generate_preferred_tags(gender, year - age, occupation, reading_time))))
+        for gender, age, occupation, reading_time in itertools.product(GENDERS, AGE_BANDS, OCCUPATIONS,
+                                                                      READING_TIMES)
+    }
+    keys = {
+        profile_key(tags, {'favorite_tags': favorite, 'preferred_platform': platforms})
+        for tags in sorted(preferred)
+        for favorite in _subsets(ALL_TAGS, max_favorite_tags)
+        for platforms in _subsets(PLATFORMS, max_platforms)
+    }
+    return sorted(keys)
+
+# 一批画像的推荐结果（在工作进程中运行，数据和模型按进程缓存）
+def _compute_batch(keys, n):
+    return [recommend_for_profile(key, n) for key in keys]
+
+# 离线计算全部分群的 top-n 并写成查表文件：下标 / 分数为定长矩阵（不足 n 个以 -1 补齐）；
+# 表的版本按模型 / 数据文件内容计算，拷贝到其他机器后仍能通过版本校验
+def precompute_segments(output=SEGMENT_FILE, n=100, n_jobs=-1, batch_size=256,
+                        max_favorite_tags=1, max_platforms=1):
+    version = recommendation_content_version()
+    keys = enumerate_segments(max_favorite_tags, max_platforms)
+    start = time.perf_counter()
+    batches = Parallel(n_jobs=n_jobs)(
+        delayed(_compute_batch)(keys[i:i + batch_size], n) for i in range(0, len(keys), batch_size))
+    results = [result for batch in batches for result in batch]
+    elapsed = time.perf_counter() - start
+    if any(result is None for result in results):
+        raise RuntimeError("模型或数据缺失，无法预计算分群推荐")
+
+    indices = np.full((len(keys), n), -1, dtype=np.int32)
+    scores = np.zeros((len(keys), n), dtype=np.float32)
+    counts = np.zeros(len(keys), dtype=np.int32)
+    for row, (idx, score) in enumerate(results):
+        counts[row] = len(idx)
+        indices[row, :len(idx)] = idx
+        scores[row, :len(idx)] = score
+    np.savez(output, keys=np.array([encode_key(key) for key in keys]), indices=indices, scores=scores,
+             counts=counts, version=np.array(encode_key(version)))
+    print(f"分群 {len(keys)} 个: {elapsed:.1f} s, {len(keys) / elapsed:.0f} 个/秒（n_jobs={n_jobs}）")
+    return keys
+
+# 加载查表文件：画像键 -> 行号
+def load_segment_table(path=SEGMENT_FILE):
+    with np.load(path) as data:
+        table = {key: data[key] for key in data.files}
+    table['rows'] = {key: row for row, key in enumerate(table['keys'].tolist())}
+    table['version'] = str(table['version'])
+    return table
+
+# 服务端使用的查表（进程级缓存，文件更新后重新加载）；未预计算时返回 None
+def load_segments_cached(path=SEGMENT_FILE):
+    if not os.path.exists(path):
+        return None
+    return get_resource('segments', [path], lambda: load_segment_table(path))
+
+# 查表：命中且表与当前模型 / 数据的内容版本（recommendation_content_version）一致时
+# 返回 (目录下标, 分数)，否则返回 None
+def lookup_segment(table, key, version):
+    start = time.perf_counter()
+    row = table['rows'].get(encode_key(key)) if table['version'] == encode_key(version) else None
+    result = None
+    if row is not None:
+        count = table['counts'][row]
+        result = table['indices'][row, :count].astype(np.int64), table['scores'][row, :count].astype(np.float64)
+    with _LOCK:
+        _STATS['hits' if result is not None else 'misses'] += 1
+        _STATS['seconds'] += time.perf_counter() - start
+    return result
+
+# 查表命中率与平均延迟（微秒）
+def segment_stats():
+    with _LOCK:
+        stats = dict(_STATS)
+    lookups = stats['hits'] + stats['misses']
+    return {
+        'hits': stats['hits'],
+        'misses': stats['misses'],
+        'hit_rate': stats['hits'] / lookups if lookups else 0.0,
+        'avg_lookup_us': stats['seconds'] / lookups * 1e6 if lookups else 0.0,
+    }
+
+# 服务延迟：逐个查询全部分群，对比现场计算
+def report_serving_latency(keys, path=SEGMENT_FILE, n=100, live_samples=50):
+    table = load_segment_table(path)
+    version = recommendation_content_version()
+    start = time.perf_counter()
+    for key in keys:
+        lookup_segment(table, key, version)
+    lookup_us = (time.perf_counter() - start) / len(keys) * 1e6
+    sample = keys[::max(1, len(keys) // live_samples)]
+    start = time.perf_counter()
+    for key in sample:
+        recommend_for_profile(key, n)
+    live_ms = (time.perf_counter() - start) / len(sample) * 1000
+    print(f"服务延迟: 查表 {lookup_us:.1f} µs/次, 现场计算 {live_ms:.2f} ms/次")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="离线预计算全部画像分群的推荐结果")
+    parser.add_argument('--output', default=SEGMENT_FILE, help="查表文件路径")
+    parser.add_argument('--jobs', type=int, default=-1, help="并行进程数（-1 为全部核心）")
+    parser.add_argument('--max-favorite-tags', type=int, default=1, help="枚举的喜欢标签个数上限")
+    parser.add_argument('--max-platforms', type=int, default=1, help="枚举的常用平台个数上限")
+    args = parser.parse_args()
+    segment_keys = precompute_segments(args.output, n_jobs=args.jobs, max_favorite_tags=args.max_favorite_tags,
+                                       max_platforms=args.max_platforms)
+    report_serving_latency(segment_keys, args.output)
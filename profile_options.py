@@ -0,0 +1,61 @@
+from datetime import datetime
+
+# 画像选项与偏好标签规则（只依赖标准库，界面首屏渲染无需导入数值计算库）
+
+# 画像中表示“不透露”的选项，不参与 fold-in
+UNDISCLOSED = "不想透露"
+
+# 标签列表
+ALL_TAGS = ["玄幻", "都市", "历史", "科幻", "悬疑", "武侠", "穿越", "奇幻", "冒险",
+            "仙侠", "重生", "灵异", "战争", "言情", "搞笑", "无限流", "修真", "系统",
+            "游戏", "娱乐", "异能", "权谋", "修仙", "校园", "江湖", "末世", "异世界"]
+
+# 画像选项（与界面中的选择项一致）
+GENDERS = ("男", "女", UNDISCLOSED)
+OCCUPATIONS = ('学生', '上班族', '自由职业者', '退休', UNDISCLOSED)
+READING_TIMES = ("几乎不阅读", "1-3小时", "4-6小时", "7-10小时", "10小时以上")
+PLATFORMS = ["微信读书", "QQ 阅读", "Kindle 商店", "番茄小说", "起点读书"]
+
+# 基于用户画像生成偏好标签（内部逻辑，不展示）
+def generate_preferred_tags(gender, birth_year, occupation, reading_time):
+    preferred_tags = []
+    # 性别偏好
+    if gender == '男':
+        preferred_tags.extend(['玄幻', '科幻', '武侠', '战争'])
+    elif gender == '女':
+        preferred_tags.extend(['言情', '校园', '都市', '重生'])
+    # 年龄偏好
+    age = datetime.now().year - birth_year
+    if age < 20:  
+        preferred_tags.extend(['校园', '修真', '异能', '搞笑'])
+    elif age < 30:  
+        preferred_tags.extend(['都市', '系统', '无限流', '职场'])
+    elif age < 40:  
+        preferred_tags.extend(['历史', '权谋', '战争', '悬疑'])
+    else:  
+        preferred_tags.extend(['历史', '现实', '职场', '文学'])
+    # 职业偏好
+    if occupation == '学生':
+        preferred_tags.extend(['校园', '青春', '异能', '修真'])
+    elif occupation == '上班族':
+        preferred_tags.extend(['职场', '现实', '都市', '系统'])
+    elif occupation == '自由职业者':
+        preferred_tags.extend(['冒险', '奇幻', '武侠', '灵异'])
+    elif occupation == '退休':
+        preferred_tags.extend(['历史', '文学', '现实', '战争'])
+    # 阅读时长偏好
+    if reading_time == "几乎不阅读":  
+        preferred_tags.extend(['短篇', '言情', '搞笑', '校园'])
+    elif reading_time == "1-3小时":  
+        preferred_tags.extend(['都市', '修真', '异能', '悬疑'])
+    elif reading_time == "4-6小时":  
+        preferred_tags.extend(['玄幻', '武侠', '无限流', '历史'])
+    elif reading_time == "7-10小时" or reading_time == "10小时以上":  
+        preferred_tags.extend(['长篇', '史诗', '系统', '修仙'])
+    
+    # 统计高频标签（取前4个）
+    tag_counts = {}
+    for tag in preferred_tags:
+        tag_counts[tag] = tag_counts.get(tag, 0) + 1
+    sorted_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)
+    return [tag for tag, _ in sorted_tags[:4]]
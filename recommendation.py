@@ -0,0 +1,241 @@
+import os
+import pickle
+
+import numpy as np
+
+from ann_index import ANN_INDEX_FILE, ann_svd_top_n, index_matches, load_ann_index
+from catalog import prepare_catalog
+from catalog_snapshot import MANIFEST_FILE as SNAPSHOT_MANIFEST, SNAPSHOT_DIR, read_novels, read_ratings
+from filter_index import candidate_rows, get_filter_index, platform_filter
+from fold_in import fold_in_visitor
+from hybrid_fusion import fuse_candidates
+from knn_neighbors import KNN_MODEL_FILE, blend_knn_top_n, load_knn_model
+from model_artifact import CURRENT_FILE, MANIFEST_FILE, MODEL_STORE, current_version_dir, load_artifact
+from perf_trace import stage, traced
+from profile_options import (ALL_TAGS, GENDERS, OCCUPATIONS, PLATFORMS, READING_TIMES, UNDISCLOSED,
+                             generate_preferred_tags)
+from resource_cache import files_content_version, get_resource
+from result_cache import files_version
+from svd_scoring import (get_item_alignment, get_svd_factors, score_items, score_items_batch, svd_top_n,
+                         top_n_indices, user_inner_id)
+from tag_index import get_tag_index, tag_top_n
+
+# 平台图标映射
+PLATFORM_ICONS = {
+    "微信读书": "logos/weixin_reading_logo.png",
+    "QQ 阅读": "logos/qq_reading_logo.png",
+    "Kindle 商店": "logos/kindle_store_logo.png",
+    "番茄小说": "logos/tomato_novel_logo.png",
+    "起点读书": "logos/qidian_reading_logo.png",
+}
+
+# 数据与模型文件
+USER_RATINGS_FILE = 'data/user_ratings.csv'
+NOVELS_FILE = 'data/novels.csv'
+SVD_MODEL_FILE = 'svd_model.pkl'
+
+# 打分逻辑版本：推荐结果的计算方式改变时加一，使磁盘缓存和离线分群表失效
+SCORING_REVISION = 3
+
+# SVD 召回模式：exact 全目录精确打分；approximate 使用 IVF 近似索引（索引缺失时退回精确模式）
+RETRIEVAL_MODE = os.environ.get('NOVEL_RETRIEVAL_MODE', 'exact')
+ANN_N_PROBE = int(os.environ.get('NOVEL_ANN_N_PROBE', '8'))
+
+# 读数据：有最新的类型化快照时读快照（评分只读打分用到的列），否则解析 CSV
+def read_data():
+    with stage('read_data_files'):
+        user_ratings_df = read_ratings(USER_RATINGS_FILE)
+        novels_df = read_novels(NOVELS_FILE)
+    with stage('prepare_catalog'):
+        novels_df = prepare_catalog(novels_df, get_platform_icon)
+    return user_ratings_df, novels_df
+
+@traced('unpickle_model')
+def read_models():
+    with open(SVD_MODEL_FILE, 'rb') as f:
+        return pickle.load(f)
+
+@traced('load_artifact')
+def read_artifact():
+    return load_artifact()
+
+# 数据依赖的文件（快照清单存在时一并监视，重新转换快照后自动重新加载）
+def data_files():
+    manifest = os.path.join(SNAPSHOT_DIR, SNAPSHOT_MANIFEST)
+    return [USER_RATINGS_FILE, NOVELS_FILE] + ([manifest] if os.path.exists(manifest) else [])
+
+# 加载数据（进程级缓存，文件变化时才重新解析）
+@traced()
+def load_catalog_data():
+    return get_resource('data', data_files(), read_data)
+
+# 加载模型（进程级缓存）：优先内存映射已发布的模型产物，没有时退回 pickle
+@traced()
+def load_svd_model():
+    current_file = os.path.join(MODEL_STORE, CURRENT_FILE)
+    if os.path.exists(current_file):
+        return get_resource('svd_model', [current_file], read_artifact)
+    return get_resource('svd_model', [SVD_MODEL_FILE], read_models)
+
+# 加载稀疏 KNN 模型（第二路协同过滤信号，文件不存在时不使用）
+def load_knn_model_cached():
+    if not os.path.exists(KNN_MODEL_FILE):
+        return None
+    try:
+        return get_resource('knn_model', [KNN_MODEL_FILE], load_knn_model)
+    except Exception:
+        return None
+
+# 加载近似检索索引（仅近似模式使用）
+def load_ann_index_cached():
+    if RETRIEVAL_MODE != 'approximate' or not os.path.exists(ANN_INDEX_FILE):
+        return None
+    try:
+        return get_resource('ann_index', [ANN_INDEX_FILE], load_ann_index)
+    except Exception:
+        return None
+
+# 获取平台图标路径
+def get_platform_icon(platform_name):
+    for key, path in PLATFORM_ICONS.items():
+        if key in platform_name or platform_name in key:
+            if os.path.exists(path):
+                return path
+    return "logos/default_logo.png"  # 默认图标
+
+# 候选过滤：用户选择了常用平台时只推荐这些平台上的小说，返回候选目录行号；
+# 不过滤（未选平台，或目录中没有所选平台的小说）时返回 None
+@traced()
+def profile_candidates(novels_df, preferred_platforms):
+    expr = platform_filter(set(preferred_platforms) - {UNDISCLOSED})
+    if expr is None or novels_df.empty:
+        return None
+    rows = candidate_rows(get_filter_index(novels_df), expr)
+    return rows if len(rows) else None
+
+# 协同过滤推荐（SVD 全目录矩阵打分或近似索引召回，可融合 KNN 邻居评分），返回目录下标和预测评分；
+# 新用户传入 fold-in 向量 folded_user 时按其个性化打分；传入候选行号 candidates 时只为候选打分
+# （候选集已经缩小，直接精确打分，不走近似索引）；visitor=(小说 id, 评分) 为新用户的画像伪评分 + 会话内评分
+@traced()
+def svd_recommendations(algo_svd, novels_df, user_ratings_df, n=100, user_id=-1, folded_user=None,
+                        candidates=None, visitor=None):
+    if algo_svd is None or novels_df.empty:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    # KNN 模型认识该用户、或给出了新用户的评分（现场找邻居）时，在全目录 SVD 分数上融合邻居评分
+    knn_model = load_knn_model_cached()
+    if knn_model is not None and (visitor is not None or user_inner_id(knn_model, user_id) is not None):
+        factors = get_svd_factors(algo_svd)
+        item_inner = get_item_alignment(factors, novels_df)['item_inner']
+        user = folded_user if folded_user is not None else user_inner_id(factors, user_id)
+        return blend_knn_top_n(score_items(factors, item_inner, user), knn_model, novels_df, n, user_id,
+                               candidates=candidates, visitor=visitor)
+    ann_index = load_ann_index_cached() if candidates is None else None
+    if ann_index is not None and index_matches(ann_index, get_svd_factors(algo_svd)):
+        return ann_svd_top_n(algo_svd, novels_df, ann_index, n, user_id, ANN_N_PROBE, folded_user)
+    return svd_top_n(algo_svd, novels_df, n, user_id, folded_user, candidates)
+
+# 内容推荐（标签匹配，基于预先构建的标签倒排索引），返回目录下标和命中标签数
+@traced()
+def content_based_recommendations(novels_df, preferred_tags, n=50, candidates=None):
+    if novels_df.empty:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return tag_top_n(get_tag_index(novels_df), preferred_tags, n, candidates)
+
+# 混合推荐（协同过滤 + 内容推荐），候选全程以目录下标表示
+@traced()
+def hybrid_recommendations(algo_svd, novels_df, user_ratings_df, preferred_tags, n=100, folded_user=None,
+                           candidates=None, visitor=None):
+    if novels_df.empty:
+        return {}
+    # 1. 协同过滤结果
+    cf_idx, cf_scores = svd_recommendations(algo_svd, novels_df, user_ratings_df, n,
+                                            folded_user=folded_user, candidates=candidates, visitor=visitor)
+    # 2. 内容推荐结果并融合
+    indices, final_scores = fuse_with_content(novels_df, preferred_tags, cf_idx, cf_scores, n, candidates)
+    return {
+        'catalog': novels_df,
+        'indices': indices,
+        'scores': final_scores,
+    }
+
+# 内容推荐 + 融合（去重、70/30 加权、平台评分校准、top-n 全部为数组运算），返回目录下标和最终分
+def fuse_with_content(novels_df, preferred_tags, cf_idx, cf_scores, n=100, candidates=None):
+    content_idx, match_counts = content_based_recommendations(novels_df, preferred_tags, n, candidates)
+    with stage('fuse_candidates'):
+        indices, final_scores = fuse_candidates(
+            novels_df['id'].to_numpy(), novels_df['platform_rating'].to_numpy(),
+            content_idx, match_counts, cf_idx, cf_scores, n
+        )
+    return indices, np.round(final_scores, 2)
+
+# 推荐结果依赖的模型 / 数据文件；模型产物另按 CURRENT（修改时间）或当前版本的清单（内容）计入版本
+DATA_FILES = (NOVELS_FILE, SVD_MODEL_FILE, KNN_MODEL_FILE, ANN_INDEX_FILE)
+VERSION_FILES = (*DATA_FILES, os.path.join(MODEL_STORE, CURRENT_FILE))
+
+# 推荐结果依赖的模型 / 数据版本：任一文件变化（或召回配置、打分逻辑版本不同）即为新版本
+def recommendation_version():
+    return (SCORING_REVISION, RETRIEVAL_MODE, ANN_N_PROBE) + files_version(
+        [os.path.join(SNAPSHOT_DIR, SNAPSHOT_MANIFEST), *VERSION_FILES])
+
+# 当前生效模型产物的清单（load_artifact 加载的版本）：CURRENT 只是 v000001 这样的计数器，
+# 不同机器 / 不同训练发布的同号版本内容不同，清单记录了训练时间、参数与水位，每次发布都不同
+def current_manifest_file(store=MODEL_STORE):
+    version_dir = current_version_dir(store)
+    return os.path.join(version_dir, MANIFEST_FILE) if version_dir else os.path.join(store, MANIFEST_FILE)
+
+# 按文件内容计算的版本：离线分群表在一台机器上生成、拷贝到其他机器使用，不能依赖修改时间
+def recommendation_content_version():
+    return (SCORING_REVISION, RETRIEVAL_MODE, ANN_N_PROBE) + files_content_version(
+        [*DATA_FILES, current_manifest_file()])
+
+# 规范化画像：结果只取决于偏好标签、喜欢的标签和常用平台（与顺序无关）
+def profile_key(preferred_tags, user_data):
+    return (tuple(sorted(set(preferred_tags))),
+            tuple(sorted(set(user_data['favorite_tags']) - {UNDISCLOSED})),
+            tuple(sorted(set(user_data['preferred_platform']) - {UNDISCLOSED})))
+
+# 按规范化画像计算混合推荐（不含会话内评分），返回目录下标和最终分；模型或数据缺失时返回 None
+def recommend_for_profile(key, n=100):
+    user_ratings_df, novels_df = load_catalog_data()
+    algo_svd = load_svd_model()
+    if algo_svd is None or novels_df.empty:
+        return None
+    preferred_tags, favorite_tags, preferred_platforms = key
+    folded_user, visitor = fold_in_visitor(get_svd_factors(algo_svd), novels_df, favorite_tags,
+                                           preferred_platforms)
+    recommendations = hybrid_recommendations(algo_svd, novels_df, user_ratings_df, preferred_tags, n,
+                                             folded_user, profile_candidates(novels_df, preferred_platforms),
+                                             visitor)
+    return recommendations['indices'], recommendations['scores']
+
+# 批量混合推荐（服务端微批处理用）：一批请求的 SVD 部分合并为一次矩阵打分。
+# 每个请求为 {'key': 规范化画像, 'session_ratings': {小说 id: 评分}, 'n': 数量}；
+# 有 KNN 模型时按各请求的评分现场找邻居融合，结果与精确召回模式下的 hybrid_recommendations 一致。
+# 返回与请求一一对应的 (目录下标, 最终分)，模型或数据缺失时为 None
+@traced()
+def recommend_batch(requests):
+    user_ratings_df, novels_df = load_catalog_data()
+    algo_svd = load_svd_model()
+    if algo_svd is None or novels_df.empty:
+        return [None] * len(requests)
+    factors = get_svd_factors(algo_svd)
+    profiles = [fold_in_visitor(factors, novels_df, request['key'][1], request['key'][2],
+                                request.get('session_ratings'))
+                for request in requests]
+    alignment = get_item_alignment(factors, novels_df)
+    raw_scores = score_items_batch(factors, alignment['item_inner'], [folded for folded, _ in profiles])
+    scores = np.round(raw_scores, 2)
+    knn_model = load_knn_model_cached()
+    results = []
+    for request, (_, visitor), raw_row, row in zip(requests, profiles, raw_scores, scores):
+        candidates = profile_candidates(novels_df, request['key'][2])
+        if knn_model is not None:
+            cf_idx, cf_scores = blend_knn_top_n(raw_row, knn_model, novels_df, request['n'],
+                                                candidates=candidates, visitor=visitor)
+        else:
+            rows = candidates if candidates is not None else np.arange(len(row))
+            cf_idx = rows[top_n_indices(row[rows], request['n'])]
+            cf_scores = row[cf_idx]
+        results.append(fuse_with_content(novels_df, request['key'][0], cf_idx, cf_scores, request['n'],
+                                         candidates))
+    return results
@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+from perf_trace import export_json, export_prometheus
+from precompute_segments import load_segments_cached, lookup_segment
+from recommendation import (generate_preferred_tags, load_catalog_data, load_svd_model, profile_key,
+                            recommend_batch, recommendation_content_version, recommendation_version)
+
+# 推荐服务：常驻内存的模型 + 基于 asyncio 的 HTTP/JSON 接口，并发请求合并为一次矩阵打分
+SERVICE_HOST = '127.0.0.1'
+SERVICE_PORT = 8765
+# App 作为客户端时的服务地址（未设置时 App 在本进程内计算）
+SERVICE_URL = os.environ.get('NOVEL_SERVICE_URL')
+
+# 微批处理：收到第一个请求后最多再等 MAX_WAIT 秒，凑满 MAX_BATCH 个立即处理
+MAX_BATCH = 64
+MAX_WAIT = 0.005
+# 单次请求的上限
+MAX_N = 1000
+MAX_BODY_BYTES = 1 << 20
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+_STATS = {'requests': 0, 'segment_hits': 0, 'batches': 0, 'batched_requests': 0, 'errors': 0,
+          'seconds': 0.0}
+
+# 请求 JSON -> 推荐请求：偏好标签可直接给出，也可由性别 / 出生年份 / 职业 / 阅读时长生成
+def parse_request(payload):
+    if not isinstance(payload, dict):
+        raise ValueError("请求体必须是 JSON 对象")
+    preferred_tags = payload.get('preferred_tags')
+    if preferred_tags is None:
+        preferred_tags = generate_preferred_tags(payload['gender'], int(payload['birth_year']),
+                                                 payload['occupation'], payload['reading_time'])
+    user_data = {'favorite_tags': list(payload.get('favorite_tags', [])),
+                 'preferred_platform': list(payload.get('preferred_platform', []))}
+    n = int(payload.get('n', 100))
+    if not 0 < n <= MAX_N:
+        raise ValueError(f"n 必须在 1 到 {MAX_N} 之间")
+    session_ratings = {int(novel_id): float(rating)
+                       for novel_id, rating in (payload.get('session_ratings') or {}).items()}
+    return {'key': profile_key(list(preferred_tags), user_data), 'session_ratings': session_ratings, 'n': n}
+
+# 推荐结果 -> 响应 JSON（目录下标、小说 id、最终分）
+def _response(novels_df, indices, scores):
+    return {'indices': indices.tolist(), 'ids': novels_df['id'].to_numpy()[indices].tolist(),
+            'scores': np.asarray(scores).tolist()}
+
+# 查离线分群表，命中时直接返回响应（在线程池中运行：加载目录 / 分群表、计算内容版本都要读文件）；
+# 表中每个画像只存了前若干个结果，n 超过表宽时不查表，改走现场打分
+def _segment_response(request):
+    segments = load_segments_cached()
+    if segments is None or request['n'] > segments['indices'].shape[1]:
+        return None
+    result = lookup_segment(segments, request['key'], recommendation_content_version())
+    if result is None:
+        return None
+    _, novels_df = load_catalog_data()
+    indices, scores = result
+    return _response(novels_df, indices[:request['n']], scores[:request['n']])
+
+# 一批请求一次打分并转换为响应（在线程池中运行）；模型或数据缺失时对应项为 None
+def _batch_responses(requests):
+    _, novels_df = load_catalog_data()
+    return [None if result is None else _response(novels_df, *result) for result in recommend_batch(requests)]
+
+# 微批处理协程：从队列取出一批请求，在线程池中一次打分（numpy 运算释放 GIL，不阻塞事件循环）
+async def _batch_worker(queue, max_batch, max_wait):
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + max_wait
+        while len(batch) < max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        try:
+            results = await loop.run_in_executor(None, _batch_responses, [request for request, _ in batch])
+        except Exception as e:  # 一批失败时逐个通知等待中的请求
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+        _STATS['batches'] += 1
+        _STATS['batched_requests'] += len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+# 处理一个推荐请求：无会话内评分时先查离线分群表，否则进入微批队列；
+# 读文件的步骤都在线程池中完成，事件循环只做调度
+async def recommend(queue, payload):
+    request = parse_request(payload)
+    loop = asyncio.get_running_loop()
+    if not request['session_ratings']:
+        response = await loop.run_in_executor(None, _segment_response, request)
+        if response is not None:
+            _STATS['segment_hits'] += 1
+            return response
+    future = loop.create_future()
+    await queue.put((request, future))
+    response = await future
+    if response is None:
+        raise LookupError("模型或数据缺失")
+    return response
+
+# 请求路由：POST /recommend 返回推荐结果，GET /health 返回模型版本与统计，
+# GET /metrics 导出各阶段累计计数器（Prometheus 文本；?format=json 为 JSON）
+async def _dispatch(queue, method, path, body):
+    path, _, query = path.partition('?')
+    if path == '/metrics':
+        if method != 'GET':
+            return 405, {'error': "只支持 GET"}
+        return 200, export_json() if query == 'format=json' else export_prometheus()
+    if path == '/health':
+        if method != 'GET':
+            return 405, {'error': "只支持 GET"}
+        version = await asyncio.get_running_loop().run_in_executor(None, recommendation_version)
+        return 200, {'status': 'ok', 'version': version, 'stats': service_stats()}
+    if path != '/recommend':
+        return 404, {'error': f"未知路径 {path}"}
+    if method != 'POST':
+        return 405, {'error': "只支持 POST"}
+    try:
+        return 200, await recommend(queue, json.loads(body or b'{}'))
+    except (KeyError, TypeError, ValueError) as e:
+        return 400, {'error': f"请求无效: {e}"}
+    except LookupError as e:
+        return 503, {'error': str(e)}
+    except Exception as e:  # 打分出错时返回 500，连接保持可用
+        return 500, {'error': f"推荐失败: {e}"}
+
+# 一个 HTTP/1.1 连接：支持 keep-alive，逐个读取请求并回写 JSON
+async def _handle_connection(reader, writer, queue):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length', 0))
+            start = time.perf_counter()
+            if length > MAX_BODY_BYTES:
+                status, payload = 413, {'error': "请求体过大"}
+            else:
+                body = await reader.readexactly(length) if length else b''
+                status, payload = await _dispatch(queue, method, path, body)
+            _STATS['requests'] += 1
+            _STATS['errors'] += status != 200
+            _STATS['seconds'] += time.perf_counter() - start
+            if isinstance(payload, str):
+                data, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4'
+            else:
+                data, content_type = json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json'
+            close = headers.get('connection', '').lower() == 'close' or status == 413
+            writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                         f"Content-Type: {content_type}; charset=utf-8\r\n"
+                         f"Content-Length: {len(data)}\r\n"
+                         f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode('latin-1') + data)
+            await writer.drain()
+            if close:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+# 服务统计：请求数、分群表命中数、平均批大小与平均延迟（毫秒）
+def service_stats():
+    stats = dict(_STATS)
+    seconds = stats.pop('seconds')
+    stats['avg_batch_size'] = stats['batched_requests'] / stats['batches'] if stats['batches'] else 0.0
+    stats['avg_latency_ms'] = seconds / stats['requests'] * 1000 if stats['requests'] else 0.0
+    return stats
+
+# 启动服务：先加载数据和模型（常驻内存），再开始接受连接
+async def serve(host=SERVICE_HOST, port=SERVICE_PORT, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, load_catalog_data)
+    if await loop.run_in_executor(None, load_svd_model) is None:
+        raise RuntimeError("找不到 SVD 模型，请先运行 model_training.py")
+    queue = asyncio.Queue()
+    worker = asyncio.create_task(_batch_worker(queue, max_batch, max_wait))
+    server = await asyncio.start_server(lambda r, w: _handle_connection(r, w, queue), host, port)
+    print(f"推荐服务已启动: http://{host}:{port}（微批 ≤{max_batch} 个 / {max_wait * 1000:.1f} ms）")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        worker.cancel()
+
+# 客户端：向推荐服务请求推荐，返回 (小说 id, 最终分)；服务不可用时抛出 OSError / ValueError。
+# 服务端目录可能与本地不同，不使用响应中的目录下标，由调用方用 local_rows 映射到本地目录
+def request_recommendations(payload, url=SERVICE_URL, timeout=5.0):
+    request = urllib.request.Request(url.rstrip('/') + '/recommend',
+                                     data=json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        result = json.loads(response.read())
+    return np.asarray(result['ids'], dtype=np.int64), np.asarray(result['scores'], dtype=np.float64)
+
+# 小说 id -> 本地目录下标（目录中重复的 id 取第一次出现的行）；本地目录中没有的小说连同分数一起丢弃
+def local_rows(novels_df, ids, scores):
+    catalog_ids = pd.Index(novels_df['id'])
+    first = ~catalog_ids.duplicated()
+    positions = catalog_ids[first].get_indexer(ids)
+    keep = positions >= 0
+    return np.flatnonzero(first)[positions[keep]], scores[keep]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="无界面的推荐服务（HTTP/JSON）")
+    parser.add_argument('--host', default=SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=SERVICE_PORT)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help="每批最多合并的请求数")
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT * 1000, help="凑批最长等待（毫秒）")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_batch, args.max_wait_ms / 1000))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import threading
+import time
+
+# 进程级资源缓存：所有 Streamlit 会话共享同一份已解析的数据和模型。
+# 全局锁只保护缓存表和统计；检查文件、加载资源时只持有该资源自己的锁，
+# 加载模型不会阻塞数据读取，同一资源的并发请求等待同一次加载
+_LOCK = threading.Lock()
+_ENTRIES = {}
+_KEY_LOCKS = {}
+_STATS = {'hits': 0, 'misses': 0, 'reloads': 0}
+_HASHES = {}
+
+# 两次检查文件状态之间的最小间隔（秒），间隔内的命中完全不触碰磁盘
+CHECK_INTERVAL = 1.0
+
+# 文件签名：修改时间 + 大小，只需一次 stat
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+# 文件内容哈希：签名变化时用来判断内容是否真的改变
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# 一组文件的内容版本：路径 + 内容哈希（不存在的文件记为 None），与修改时间无关，拷贝到其他机器后不变；
+# 哈希按文件签名缓存，文件未变化时只需 stat
+def files_content_version(paths):
+    version = []
+    for path in paths:
+        try:
+            signature = _file_signature(path)
+        except FileNotFoundError:
+            version.append((path, None))
+            continue
+        with _LOCK:
+            cached = _HASHES.get(path)
+        if cached is None or cached[0] != signature:
+            cached = signature, _file_hash(path)
+            with _LOCK:
+                _HASHES[path] = cached
+        version.append((path, cached[1]))
+    return tuple(version)
+
+def _key_lock(key):
+    with _LOCK:
+        return _KEY_LOCKS.setdefault(key, threading.Lock())
+
+def _count(name):
+    with _LOCK:
+        _STATS[name] += 1
+
+# 获取缓存资源；依赖文件内容变化时重新调用 loader 加载。
+# 首次加载只记录签名（不读全文件），签名变化时才计算内容哈希，
+# 与上次重新加载时记录的哈希相同（只是被 touch 过）则不重新加载
+def get_resource(key, paths, loader, check_interval=CHECK_INTERVAL):
+    with _LOCK:
+        entry = _ENTRIES.get(key)
+        if entry is not None and time.monotonic() - entry['checked_at'] < check_interval:
+            _STATS['hits'] += 1
+            return entry['value']
+    with _key_lock(key):
+        now = time.monotonic()
+        entry = _ENTRIES.get(key)
+        if entry is not None and now - entry['checked_at'] < check_interval:  # 等锁期间已被其他线程刷新
+            _count('hits')
+            return entry['value']
+        signatures = [_file_signature(p) for p in paths]
+        hashes = None
+        if entry is not None:
+            entry['checked_at'] = now
+            if signatures == entry['signatures']:
+                _count('hits')
+                return entry['value']
+            hashes = [_file_hash(p) for p in paths]
+            if hashes == entry['hashes']:
+                # 只是被 touch 过，内容未变
+                entry['signatures'] = signatures
+                _count('hits')
+                return entry['value']
+            _count('reloads')
+        else:
+            _count('misses')
+        # 先记录签名再加载：加载期间文件被改写，下次检查时仍会重新加载
+        value = loader()
+        with _LOCK:
+            _ENTRIES[key] = {
+                'value': value,
+                'signatures': signatures,
+                'hashes': hashes,
+                'checked_at': now,
+            }
+        return value
+
+# 当前缓存命中 / 未命中 / 重新加载次数
+def cache_stats():
+    with _LOCK:
+        return dict(_STATS, entries=len(_ENTRIES))
+
+# 清空缓存（测试或强制重新加载时使用）
+def clear_cache():
+    with _LOCK:
+        _ENTRIES.clear()
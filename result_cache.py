@@ -0,0 +1,166 @@
+import hashlib
+import hmac
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+# 推荐结果缓存：按 (模型/数据版本, 规范化画像) 缓存混合推荐结果，LRU 淘汰 + TTL 过期；
+# 不同版本的条目互不影响，旧版本条目不再被访问后由 LRU / TTL 自然淘汰
+MAX_ENTRIES = 1024
+TTL_SECONDS = 600
+
+# 可选的共享磁盘后端（多个 App 进程共用）：同时设置目录和签名密钥后启用；
+# 每个文件带 HMAC-SHA256 签名，验签失败（被篡改或不是用同一密钥写入）的文件不会被反序列化
+DISK_KEY = os.environ.get('NOVEL_RESULT_CACHE_KEY', '').encode('utf-8')
+DISK_DIR = os.environ.get('NOVEL_RESULT_CACHE_DIR') if DISK_KEY else None
+# 每写入多少次磁盘条目清理一次过期 / 超量文件
+DISK_PRUNE_EVERY = 64
+
+_LOCK = threading.Lock()
+_ENTRIES = OrderedDict()
+_STATE = {'disk_writes': 0}
+_STATS = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0, 'disk_errors': 0,
+          'hit_seconds': 0.0, 'miss_seconds': 0.0}
+
+# 一组文件的版本：路径 + 修改时间 + 大小（不存在的文件记为 None），任一文件变化即为新版本
+def files_version(paths):
+    version = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            version.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            version.append((path, None))
+    return tuple(version)
+
+def _disk_path(disk_dir, version, key):
+    digest = hashlib.sha1(repr((version, key)).encode('utf-8')).hexdigest()
+    return os.path.join(disk_dir, f"{digest}.pkl")
+
+def _signature(payload):
+    return hmac.new(DISK_KEY, payload, hashlib.sha256).digest()
+
+# 读取磁盘条目：先验签再反序列化，签名不符的文件当作未命中
+def _disk_get(disk_dir, version, key, ttl):
+    path = _disk_path(disk_dir, version, key)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    size = hashlib.sha256().digest_size
+    signature, payload = data[:size], data[size:]
+    if not hmac.compare_digest(signature, _signature(payload)):
+        return None
+    try:
+        created_at, value = pickle.loads(payload)
+    except (EOFError, pickle.UnpicklingError):
+        return None
+    return (created_at, value) if time.time() - created_at < ttl else None
+
+# 原子写入（临时文件 + os.replace），其他进程不会读到半个文件；文件内容为签名 + pickle 数据。
+# 磁盘不可写（目录无权限、磁盘满等）时只记一次 disk_errors，结果照常返回并留在内存缓存中
+def _disk_put(disk_dir, version, key, created_at, value, ttl, max_entries):
+    path = _disk_path(disk_dir, version, key)
+    tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+    payload = pickle.dumps((created_at, value), protocol=pickle.HIGHEST_PROTOCOL)
+    try:
+        os.makedirs(disk_dir, mode=0o700, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(_signature(payload) + payload)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        with _LOCK:
+            _STATS['disk_errors'] += 1
+        return
+    with _LOCK:
+        _STATE['disk_writes'] += 1
+        prune = _STATE['disk_writes'] % DISK_PRUNE_EVERY == 0
+    if prune:
+        try:
+            _disk_prune(disk_dir, ttl, max_entries)
+        except OSError:
+            with _LOCK:
+                _STATS['disk_errors'] += 1
+
+# 删除过期文件，并只保留最近写入的 max_entries 个；其他进程同时删除的文件直接跳过
+def _disk_prune(disk_dir, ttl, max_entries):
+    now = time.time()
+    files = []
+    for entry in os.scandir(disk_dir):
+        if entry.name.endswith('.pkl'):
+            try:
+                files.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                pass
+    files.sort(reverse=True)
+    for rank, (mtime, path) in enumerate(files):
+        if rank >= max_entries or now - mtime >= ttl:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+# 获取缓存结果，未命中时调用 compute() 计算并写入（返回 None 的结果不缓存）；
+# 条目按 (version, key) 存放，新旧版本的请求交替到达时不会互相清空
+def get_or_compute(key, version, compute, ttl=TTL_SECONDS, max_entries=MAX_ENTRIES, disk_dir=DISK_DIR):
+    start = time.perf_counter()
+    disk_dir = disk_dir if DISK_KEY else None
+    entry_key = (version, key)
+    with _LOCK:
+        entry = _ENTRIES.get(entry_key)
+        if entry is not None:
+            if time.time() - entry[0] < ttl:
+                _ENTRIES.move_to_end(entry_key)
+                _STATS['hits'] += 1
+                _STATS['hit_seconds'] += time.perf_counter() - start
+                return entry[1]
+            del _ENTRIES[entry_key]
+            _STATS['expired'] += 1
+    # 磁盘读写和计算都不持锁，不阻塞其他会话
+    entry = _disk_get(disk_dir, version, key, ttl) if disk_dir else None
+    if entry is not None:
+        stat = 'disk_hits'
+    else:
+        stat = 'misses'
+        value = compute()
+        if value is None:
+            with _LOCK:
+                _STATS['misses'] += 1
+                _STATS['miss_seconds'] += time.perf_counter() - start
+            return None
+        entry = (time.time(), value)
+        if disk_dir:
+            _disk_put(disk_dir, version, key, entry[0], value, ttl, max_entries)
+    with _LOCK:
+        _ENTRIES[entry_key] = entry
+        _ENTRIES.move_to_end(entry_key)
+        while len(_ENTRIES) > max_entries:
+            _ENTRIES.popitem(last=False)
+            _STATS['evictions'] += 1
+        _STATS[stat] += 1
+        _STATS['hit_seconds' if stat == 'disk_hits' else 'miss_seconds'] += time.perf_counter() - start
+    return entry[1]
+
+# 命中率与平均延迟（毫秒）等统计；versions 为内存中条目涉及的版本数
+def cache_stats():
+    with _LOCK:
+        stats = dict(_STATS, entries=len(_ENTRIES), versions=len({version for version, _ in _ENTRIES}))
+    hits = stats['hits'] + stats['disk_hits']
+    lookups = hits + stats['misses']
+    stats['hit_rate'] = hits / lookups if lookups else 0.0
+    hit_seconds, miss_seconds = stats.pop('hit_seconds'), stats.pop('miss_seconds')
+    stats['avg_hit_ms'] = hit_seconds / hits * 1000 if hits else 0.0
+    stats['avg_miss_ms'] = miss_seconds / stats['misses'] * 1000 if stats['misses'] else 0.0
+    return stats
+
+# 清空内存缓存（磁盘条目按版本区分，无需清理）
+def clear_cache():
+    with _LOCK:
+        _ENTRIES.clear()
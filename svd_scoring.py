@@ -0,0 +1,182 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# 每个模型对象只抽取一次因子（模型被回收后自动失效）
+_FACTOR_CACHE = weakref.WeakKeyDictionary()
+# 每个小说表与当前模型的 id 对齐关系（表被回收后自动清除）
+_ALIGN_CACHE = {}
+
+# 从训练好的 Surprise SVD 模型中抽取打分所需的全部参数
+def extract_svd_factors(algo_svd):
+    trainset = algo_svd.trainset
+    item_raw2inner = trainset._raw2inner_id_items
+    return {
+        'global_mean': float(trainset.global_mean),
+        'bu': np.asarray(algo_svd.bu, dtype=np.float64),
+        'bi': np.asarray(algo_svd.bi, dtype=np.float64),
+        'pu': np.asarray(algo_svd.pu, dtype=np.float64),
+        'qi': np.asarray(algo_svd.qi, dtype=np.float64),
+        'biased': bool(algo_svd.biased),
+        'rating_scale': tuple(trainset.rating_scale),
+        'user_ids': dict(trainset._raw2inner_id_users),
+        'item_index': pd.Index(list(item_raw2inner.keys())),
+        'item_inner': np.fromiter(item_raw2inner.values(), dtype=np.int64,
+                                  count=len(item_raw2inner)),
+    }
+
+# 获取（并缓存）模型因子；流式训练 / 模型产物加载得到的本身就是因子字典
+def get_svd_factors(algo_svd):
+    if isinstance(algo_svd, dict):
+        return algo_svd
+    try:
+        factors = _FACTOR_CACHE.get(algo_svd)
+    except TypeError:  # 不支持弱引用的对象直接抽取
+        return extract_svd_factors(algo_svd)
+    if factors is None:
+        factors = extract_svd_factors(algo_svd)
+        _FACTOR_CACHE[algo_svd] = factors
+    return factors
+
+# 用户原始 id -> 内部 id（未知用户返回 None）；映射可能是 dict 或 Index
+def user_inner_id(factors, user_id):
+    user_ids = factors['user_ids']
+    if isinstance(user_ids, pd.Index):
+        pos = user_ids.get_indexer([user_id])[0]
+        return int(pos) if pos >= 0 else None
+    return user_ids.get(user_id)
+
+# 用户的 (偏置, 隐向量)：user 可以是内部 id，也可以是 fold-in 得到的 {'bu', 'pu'}；未知用户为 None
+def user_params(factors, user):
+    if user is None:
+        return None
+    if isinstance(user, dict):
+        return user['bu'], user['pu']
+    return factors['bu'][user], factors['pu'][user]
+
+# 将小说原始 id 批量映射为模型内部 id（未参与训练的小说为 -1）
+def align_item_ids(factors, novel_ids):
+    pos = factors['item_index'].get_indexer(np.asarray(novel_ids))
+    return np.where(pos >= 0, factors['item_inner'][pos], -1)
+
+# 获取（并缓存）小说表与模型物品的对齐关系：
+# 目录行 -> 内部 id，内部 id -> 目录行，以及模型未见过的目录行
+def get_item_alignment(factors, novels_df):
+    key = id(novels_df)
+    alignment = _ALIGN_CACHE.get(key)
+    if alignment is None or alignment['factors'] is not factors:
+        item_inner = align_item_ids(factors, novels_df['id'].to_numpy())
+        rows = np.flatnonzero(item_inner >= 0)
+        item_rows = np.full(len(factors['qi']), -1, dtype=np.int64)
+        item_rows[item_inner[rows][::-1]] = rows[::-1]  # 重复 id 取目录中第一次出现的行
+        if key not in _ALIGN_CACHE:
+            weakref.finalize(novels_df, _ALIGN_CACHE.pop, key, None)
+        alignment = {
+            'factors': factors,
+            'item_inner': item_inner,
+            'item_rows': item_rows,
+            'unknown_rows': np.flatnonzero(item_inner < 0),
+            'anonymous_top': {},
+        }
+        _ALIGN_CACHE[key] = alignment
+    return alignment
+
+# 用户向量与全部物品因子的点积：先对整个 qi 做矩阵-向量乘再按下标取值，
+# 不复制 qi 的行（内存映射的模型产物也只按页读取），用户向量按 qi 的精度参与运算
+def _item_dots(factors, vectors):
+    qi = factors['qi']
+    return np.asarray(vectors, dtype=qi.dtype) @ qi.T
+
+# 对整个目录一次性打分，结果与 algo_svd.predict(uid, iid).est 一致；
+# user 为内部 id 或 fold-in 用户（见 user_params）
+def score_items(factors, item_inner, user=None):
+    known = item_inner >= 0
+    inner = item_inner[known]
+    est = np.full(len(item_inner), factors['global_mean'])
+    params = user_params(factors, user)
+    if factors['biased']:
+        est[known] += factors['bi'][inner]
+        if params is not None:
+            est += params[0]
+            est[known] += _item_dots(factors, params[1])[inner]
+    elif params is not None:
+        # 无偏置模型只有用户、物品都已知时才能预测，否则退回全局均值
+        est[known] = _item_dots(factors, params[1])[inner]
+    low, high = factors['rating_scale']
+    return np.clip(est, low, high)
+
+# 一批用户对整个目录打分：一次矩阵乘法得到 (用户数, 目录行数) 的分数矩阵，每行与 score_items 一致；
+# users 中每项为内部 id、fold-in 用户或 None（未知用户）
+def score_items_batch(factors, item_inner, users):
+    known = item_inner >= 0
+    inner = item_inner[known]
+    bu = np.zeros(len(users))
+    pu = np.zeros((len(users), factors['qi'].shape[1]))
+    has_user = np.zeros(len(users), dtype=bool)
+    for row, user in enumerate(users):
+        params = user_params(factors, user)
+        if params is not None:
+            bu[row], pu[row], has_user[row] = params[0], params[1], True
+    dot = _item_dots(factors, pu)[:, inner]
+    est = np.full((len(users), len(item_inner)), factors['global_mean'])
+    if factors['biased']:
+        est[:, known] += factors['bi'][inner] + dot
+        est += bu[:, None]
+    else:
+        est[np.ix_(has_user, known)] = dot[has_user]
+    low, high = factors['rating_scale']
+    return np.clip(est, low, high)
+
+# 逐对打分（评估用）：user_inner / item_inner 为等长数组，未知用户 / 小说为 -1，
+# 结果与 algo_svd.predict(uid, iid).est 一致
+def score_pairs(factors, user_inner, item_inner):
+    user_known, item_known = user_inner >= 0, item_inner >= 0
+    both = user_known & item_known
+    dot = np.zeros(len(user_inner))
+    dot[both] = np.einsum('ij,ij->i', factors['pu'][user_inner[both]], factors['qi'][item_inner[both]])
+    est = np.full(len(user_inner), factors['global_mean'])
+    if factors['biased']:
+        est[user_known] += factors['bu'][user_inner[user_known]]
+        est[item_known] += factors['bi'][item_inner[item_known]]
+        est += dot
+    else:
+        est[both] = dot[both]
+    low, high = factors['rating_scale']
+    return np.clip(est, low, high)
+
+# 取分数最高的 n 个下标；同分按目录顺序排列（与 list.sort 的稳定排序一致）
+def top_n_indices(scores, n):
+    scores = np.asarray(scores)
+    total = len(scores)
+    if n <= 0 or total == 0:
+        return np.empty(0, dtype=np.int64)
+    if n < total:
+        threshold = scores[np.argpartition(-scores, n - 1)[:n]].min()
+        above = np.flatnonzero(scores > threshold)
+        ties = np.flatnonzero(scores == threshold)[:n - len(above)]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(total)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][:n]
+
+# SVD 批量推荐：返回 top-n 在目录中的下标及其预测评分（保留两位小数）；
+# 传入 folded_user 时按 fold-in 向量打分，传入 candidates（升序目录行号）时只为这些小说打分。
+# 未知用户的全目录结果与用户无关，按目录缓存
+def svd_top_n(algo_svd, novels_df, n=100, user_id=-1, folded_user=None, candidates=None):
+    factors = get_svd_factors(algo_svd)
+    alignment = get_item_alignment(factors, novels_df)
+    user = folded_user if folded_user is not None else user_inner_id(factors, user_id)
+    if candidates is not None:
+        scores = np.round(score_items(factors, alignment['item_inner'][candidates], user), 2)
+        top = top_n_indices(scores, n)
+        return candidates[top], scores[top]
+    anonymous = alignment['anonymous_top']
+    if user is None and n in anonymous:
+        return anonymous[n]
+    scores = np.round(score_items(factors, alignment['item_inner'], user), 2)
+    top = top_n_indices(scores, n)
+    if user is None:
+        anonymous[n] = (top, scores[top])
+    return top, scores[top]
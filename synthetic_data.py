@@ -0,0 +1,105 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from tag_index import TAG_SEPARATORS
+
+# 合成数据默认输出目录（与真实数据分开）
+SYNTHETIC_DIR = 'data/synthetic'
+# 真实数据：标签 / 平台 / 用户画像的分布从这里统计
+REAL_NOVELS_FILE = 'data/novels.csv'
+REAL_RATINGS_FILE = 'data/user_ratings.csv'
+
+# 用户活跃度、小说热度服从幂律（排名越靠前越活跃 / 越热门）
+ACTIVITY_EXPONENT = 0.8
+POPULARITY_EXPONENT = 1.0
+# 评分由低秩偏好生成，维度与噪声
+N_TASTE_FACTORS = 8
+RATING_NOISE = 0.4
+
+# 幂律权重（随机打乱排名，热门 id 不集中在开头）
+def _power_law_weights(rng, n, exponent):
+    weights = 1.0 / (np.arange(n) + 10.0) ** exponent
+    weights = weights[rng.permutation(n)]
+    return weights / weights.sum()
+
+# 按真实数据的标签 / 平台分布生成合成小说目录（列与 novels.csv 相同）
+def synthetic_novels(n_novels, seed=0, novels_path=REAL_NOVELS_FILE):
+    rng = np.random.default_rng(seed)
+    real_df = pd.read_csv(novels_path)
+    tag_freq = real_df['tags'].str.split(TAG_SEPARATORS, regex=True).explode().value_counts()
+    vocabulary = tag_freq.index.to_numpy()
+    tag_probs = (tag_freq / tag_freq.sum()).to_numpy()
+    platform_freq = real_df['platform'].value_counts(normalize=True)
+    n_tags = rng.integers(2, 5, n_novels)
+    picks = rng.choice(len(vocabulary), n_tags.sum(), p=tag_probs)
+    bounds = np.concatenate([[0], np.cumsum(n_tags)])
+    tags = ['、'.join(vocabulary[picks[a:b]]) for a, b in zip(bounds[:-1], bounds[1:])]
+    ids = np.arange(n_novels)
+    return pd.DataFrame({
+        'id': ids,
+        'title': [f"合成小说{i}" for i in ids],
+        'author': [f"作者{i}" for i in rng.integers(0, max(1, n_novels // 5), n_novels)],
+        'rating': np.round(rng.normal(3.2, 0.6, n_novels).clip(1, 5), 1),
+        'tags': tags,
+        'platform': rng.choice(platform_freq.index.to_numpy(), n_novels, p=platform_freq.to_numpy()),
+    })
+
+# 分块生成合成评分（列与 user_ratings.csv 相同）：用户活跃度 / 小说热度为幂律分布，
+# 评分来自低秩偏好 + 噪声，用户画像从真实用户中抽样
+def synthetic_rating_chunks(n_ratings, n_users, n_novels, seed=0, chunksize=1000000,
+                            ratings_path=REAL_RATINGS_FILE):
+    rng = np.random.default_rng(seed)
+    real_users = pd.read_csv(ratings_path).drop_duplicates('user_id')
+    profiles = real_users[['gender', 'age', 'interests', 'reading_time']].iloc[
+        rng.integers(0, len(real_users), n_users)].reset_index(drop=True)
+    user_weights = _power_law_weights(rng, n_users, ACTIVITY_EXPONENT)
+    novel_weights = _power_law_weights(rng, n_novels, POPULARITY_EXPONENT)
+    pu = rng.normal(0, 0.3, (n_users, N_TASTE_FACTORS)).astype(np.float32)
+    qi = rng.normal(0, 0.3, (n_novels, N_TASTE_FACTORS)).astype(np.float32)
+    bu = rng.normal(0, 0.3, n_users).astype(np.float32)
+    bi = rng.normal(0, 0.4, n_novels).astype(np.float32)
+    for start in range(0, n_ratings, chunksize):
+        size = min(chunksize, n_ratings - start)
+        users = rng.choice(n_users, size, p=user_weights)
+        novels = rng.choice(n_novels, size, p=novel_weights)
+        ratings = (3.2 + bu[users] + bi[novels] + np.einsum('ij,ij->i', pu[users], qi[novels])
+                   + rng.normal(0, RATING_NOISE, size))
+        chunk = pd.DataFrame({'user_id': users + 1, 'novel_id': novels,
+                              'rating': np.round(ratings.clip(1, 5), 1)})
+        yield pd.concat([chunk, profiles.iloc[users].reset_index(drop=True)], axis=1)
+
+# 未指定用户数时的默认值：平均每个用户 20 条评分
+def default_user_count(n_ratings):
+    return max(1, n_ratings // 20)
+
+# 生成一整套合成数据（novels.csv + user_ratings.csv），评分分块追加写入，内存占用与总行数无关
+def write_synthetic_dataset(out_dir=SYNTHETIC_DIR, n_novels=10000, n_ratings=100000, n_users=None,
+                            seed=0, chunksize=1000000):
+    n_users = n_users or default_user_count(n_ratings)
+    os.makedirs(out_dir, exist_ok=True)
+    novels_path = os.path.join(out_dir, 'novels.csv')
+    ratings_path = os.path.join(out_dir, 'user_ratings.csv')
+    start = time.perf_counter()
+    synthetic_novels(n_novels, seed).to_csv(novels_path, index=False)
+    header = True
+    for chunk in synthetic_rating_chunks(n_ratings, n_users, n_novels, seed, chunksize):
+        chunk.to_csv(ratings_path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+    print(f"合成数据 -> {out_dir}: 小说 {n_novels}, 用户 {n_users}, 评分 {n_ratings}, "
+          f"{time.perf_counter() - start:.1f} s")
+    return novels_path, ratings_path
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="按真实分布生成指定规模的合成小说 / 评分数据")
+    parser.add_argument('--out', default=SYNTHETIC_DIR, help="输出目录")
+    parser.add_argument('--novels', type=int, default=10000, help="小说数")
+    parser.add_argument('--ratings', type=int, default=100000, help="评分行数（可到千万级）")
+    parser.add_argument('--users', type=int, default=None, help="用户数（默认评分数 / 20）")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunksize', type=int, default=1000000, help="每块生成 / 写入的评分行数")
+    args = parser.parse_args()
+    write_synthetic_dataset(args.out, args.novels, args.ratings, args.users, args.seed, args.chunksize)
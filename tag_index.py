@@ -0,0 +1,63 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from svd_scoring import top_n_indices
+
+# 标签分隔符：数据以“、”为主，少量旧数据混用了逗号
+TAG_SEPARATORS = r'\s*[、,，]\s*'
+
+# 每个小说表只建一次索引（表被回收后自动清除）
+_INDEX_CACHE = {}
+
+# 由小说表构建倒排索引：标签 -> 整数 id，每个标签一条有序倒排链（CSR 存储）；
+# 快照中已拆分好的 tag_list 列直接使用
+def build_tag_index(novels_df):
+    if 'tag_list' in novels_df:
+        tags = novels_df['tag_list']
+    else:
+        tags = novels_df['tags'].fillna('').astype(str).str.split(TAG_SEPARATORS, regex=True)
+    pairs = tags.explode().reset_index(drop=True).to_frame('tag')
+    pairs['row'] = np.repeat(np.arange(len(novels_df)), tags.map(len).to_numpy())
+    pairs = pairs[pairs['tag'].str.len() > 0].drop_duplicates()
+    codes, vocabulary = pd.factorize(pairs['tag'], sort=True)
+    rows = pairs['row'].to_numpy(dtype=np.int64)
+    # 按 (标签, 小说行号) 排序后，每个标签的小说行号连续存放
+    order = np.lexsort((rows, codes))
+    return {
+        'tag_ids': {tag: i for i, tag in enumerate(vocabulary)},
+        'indptr': np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(vocabulary)))]),
+        'indices': rows[order],
+        'n_novels': len(novels_df),
+    }
+
+# 获取（并缓存）小说表的标签索引
+def get_tag_index(novels_df):
+    key = id(novels_df)
+    index = _INDEX_CACHE.get(key)
+    if index is None:
+        index = build_tag_index(novels_df)
+        _INDEX_CACHE[key] = index
+        weakref.finalize(novels_df, _INDEX_CACHE.pop, key, None)
+    return index
+
+# 每本小说命中偏好标签的个数（按完整标签匹配，不做子串匹配）
+def match_counts(index, preferred_tags):
+    postings = [
+        index['indices'][index['indptr'][i]:index['indptr'][i + 1]]
+        for i in {index['tag_ids'][tag] for tag in preferred_tags if tag in index['tag_ids']}
+    ]
+    if not postings:
+        return np.zeros(index['n_novels'], dtype=np.int64)
+    return np.bincount(np.concatenate(postings), minlength=index['n_novels'])
+
+# 标签匹配 top-n：返回命中数 > 0 的小说下标及命中数，同分保持目录顺序；
+# 传入 candidates（升序目录行号）时只在这些小说中选
+def tag_top_n(index, preferred_tags, n=50, candidates=None):
+    counts = match_counts(index, preferred_tags)
+    rows = candidates if candidates is not None else np.arange(len(counts))
+    counts = counts[rows]
+    top = top_n_indices(counts, n)
+    top = top[counts[top] > 0]
+    return rows[top], counts[top]
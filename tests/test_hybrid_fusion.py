@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+
+from fusion_reference import fuse_candidates_loop, random_fusion_inputs
+from hybrid_fusion import fuse_candidates
+
+@pytest.mark.parametrize('seed', range(30))
+def test_fuse_candidates_matches_loop(seed):
+    inputs = random_fusion_inputs(np.random.default_rng(seed), n_novels=500)
+    expected_idx, expected_scores = fuse_candidates_loop(*inputs)
+    indices, scores = fuse_candidates(*inputs)
+    assert indices.tolist() == expected_idx
+    np.testing.assert_allclose(scores, expected_scores, rtol=0, atol=1e-12)
+
+def test_fuse_candidates_empty():
+    novel_ids = np.arange(10)
+    indices, scores = fuse_candidates(novel_ids, np.full(10, 4.0), np.empty(0, dtype=np.int64),
+                                      np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))
+    assert len(indices) == 0 and len(scores) == 0
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import recommendation
+from ann_index import build_ivf_index, index_matches, load_ann_index, save_ann_index
+from incremental_update import make_watermark, ratings_watermark, update_model
+from model_artifact import load_artifact, publish_artifact
+
+N_USERS, N_FACTORS = 20, 4
+NOVEL_IDS = np.arange(100, 150)
+
+def random_ratings(rng, n, novel_ids):
+    return pd.DataFrame({
+        'user_id': rng.integers(0, N_USERS, n),
+        'novel_id': rng.choice(novel_ids, n),
+        'rating': np.round(rng.uniform(1, 5, n), 1),
+    })
+
+# 已发布的初始版本（水位在已有评分末尾）及其近似检索索引，之后日志追加了包含新小说的评分
+@pytest.fixture
+def store(tmp_path):
+    rng = np.random.default_rng(0)
+    ratings_file = tmp_path / 'user_ratings.csv'
+    random_ratings(rng, 300, NOVEL_IDS).to_csv(ratings_file, index=False)
+    factors = {
+        'bu': rng.normal(0, 0.1, N_USERS),
+        'bi': rng.normal(0, 0.1, len(NOVEL_IDS)),
+        'pu': rng.normal(0, 0.1, (N_USERS, N_FACTORS)),
+        'qi': rng.normal(0, 0.1, (len(NOVEL_IDS), N_FACTORS)),
+        'global_mean': 3.0,
+        'biased': True,
+        'rating_scale': (1, 5),
+        'user_ids': {u: u for u in range(N_USERS)},
+        'item_index': pd.Index(NOVEL_IDS),
+        'item_inner': np.arange(len(NOVEL_IDS), dtype=np.int64),
+    }
+    store = tmp_path / 'models'
+    watermark = make_watermark(str(ratings_file), ratings_watermark(str(ratings_file)))
+    publish_artifact(factors, str(store), metadata={'watermark': watermark})
+    save_ann_index(build_ivf_index(load_artifact(str(store))), str(tmp_path / 'index.npz'))
+    new_ratings = random_ratings(rng, 100, np.arange(100, 160))
+    new_ratings.to_csv(ratings_file, mode='a', header=False, index=False)
+    return store
+
+# 增量更新后索引随新版本重建，近似模式继续走索引召回而不是退回精确打分
+def test_update_rebuilds_ann_index(store, monkeypatch):
+    index_path = str(store.parent / 'index.npz')
+    assert update_model(str(store), feedback_dir=None, ann_index_path=index_path, n_epochs=2, batch_size=16)
+    factors = load_artifact(str(store))
+    assert len(factors['qi']) > len(NOVEL_IDS)
+    assert index_matches(load_ann_index(index_path), factors)
+
+    calls = []
+    ann_svd_top_n = recommendation.ann_svd_top_n
+    monkeypatch.setattr(recommendation, 'RETRIEVAL_MODE', 'approximate')
+    monkeypatch.setattr(recommendation, 'ANN_INDEX_FILE', index_path)
+    monkeypatch.setattr(recommendation, 'load_knn_model_cached', lambda: None)
+    monkeypatch.setattr(recommendation, 'ann_svd_top_n', lambda *args: calls.append(args) or ann_svd_top_n(*args))
+    novels_df = pd.DataFrame({'id': np.arange(100, 160)})
+    indices, _ = recommendation.svd_recommendations(factors, novels_df, None, n=10, user_id=3)
+    assert len(calls) == 1 and len(indices) == 10
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('scipy')
+pytest.importorskip('joblib')
+
+import recommendation
+from catalog import prepare_catalog
+from knn_neighbors import prepare_knn_model, train_knn_model, visitor_neighbors
+from mf_training import build_factors, train_mf_sgd
+
+NOVEL_IDS = np.arange(100, 160)
+TAGS = ['都市', '玄幻', '历史', '言情']
+
+@pytest.fixture(scope='module')
+def ratings():
+    rng = np.random.default_rng(0)
+    pairs = rng.choice(40 * len(NOVEL_IDS), 600, replace=False)
+    return {
+        'users': (pairs // len(NOVEL_IDS)).astype(np.int32),
+        'items': (pairs % len(NOVEL_IDS)).astype(np.int32),
+        'ratings': np.round(rng.uniform(1, 5, len(pairs)), 1).astype(np.float32),
+    }
+
+@pytest.fixture(scope='module')
+def knn_model(ratings):
+    model = train_knn_model(ratings['users'], ratings['items'], ratings['ratings'], list(range(40)),
+                            NOVEL_IDS.tolist(), k=10)
+    return prepare_knn_model(model)
+
+@pytest.fixture(scope='module')
+def factors(ratings):
+    data = dict(ratings, user_ids={u: u for u in range(40)},
+                item_ids={int(novel_id): i for i, novel_id in enumerate(NOVEL_IDS)},
+                global_mean=float(ratings['ratings'].mean()))
+    params, _ = train_mf_sgd(data, n_factors=4, n_epochs=5, batch_size=32, verbose=False)
+    return build_factors(params, data)
+
+@pytest.fixture(scope='module')
+def catalog():
+    rng = np.random.default_rng(1)
+    novels_df = pd.DataFrame({
+        'id': NOVEL_IDS,
+        'tags': ['、'.join(rng.choice(TAGS, 2, replace=False)) for _ in NOVEL_IDS],
+        'platform': rng.choice(['微信读书', '起点读书'], len(NOVEL_IDS)),
+        'rating': np.round(rng.uniform(0, 5, len(NOVEL_IDS)), 1),
+    })
+    return prepare_catalog(novels_df, lambda platform: '')
+
+# 暴力计算：访客与每个用户在共同评分小说上的余弦相似度
+def brute_force_sims(ratings, visitor):
+    sims = np.zeros(40)
+    for user in range(40):
+        mine = {int(NOVEL_IDS[i]): r for u, i, r in zip(ratings['users'], ratings['items'], ratings['ratings'])
+                if u == user}
+        common = [novel_id for novel_id in visitor if novel_id in mine]
+        if common:
+            dot = sum(mine[n] * visitor[n] for n in common)
+            sims[user] = dot / np.sqrt(sum(mine[n] ** 2 for n in common) * sum(visitor[n] ** 2 for n in common))
+    return sims
+
+def test_visitor_neighbors_match_cosine(ratings, knn_model):
+    visitor = {101: 4.0, 117: 2.5, 130: 5.0, 142: 1.0, 999: 3.0}
+    neighbors, sims = visitor_neighbors(knn_model, list(visitor), list(visitor.values()), k=40)
+    expected = brute_force_sims(ratings, visitor)
+    assert sorted(neighbors.tolist()) == np.flatnonzero(expected > 0).tolist()
+    np.testing.assert_allclose(sims, expected[neighbors], rtol=1e-6)
+    assert (np.diff(sims) <= 0).all()
+
+@pytest.fixture
+def spy_blend(monkeypatch, catalog, factors, knn_model):
+    calls = []
+    blend = recommendation.blend_knn_top_n
+
+    def spy(*args, **kwargs):
+        calls.append(kwargs.get('visitor'))
+        return blend(*args, **kwargs)
+    monkeypatch.setattr(recommendation, 'blend_knn_top_n', spy)
+    monkeypatch.setattr(recommendation, 'load_catalog_data', lambda: (None, catalog))
+    monkeypatch.setattr(recommendation, 'load_svd_model', lambda: factors)
+    monkeypatch.setattr(recommendation, 'load_knn_model_cached', lambda: knn_model)
+    return calls
+
+# App 的画像推荐（分群表 / 结果缓存）对新用户也融合 KNN 信号
+def test_profile_recommendations_blend_knn_for_visitor(spy_blend):
+    indices, scores = recommendation.recommend_for_profile((('都市',), ('都市', '玄幻'), ()), n=10)
+    assert len(indices) == 10
+    assert len(spy_blend) == 1 and len(spy_blend[0][0]) > 0
+
+# 带会话内评分的请求（App 现场计算 / 推荐服务）按会话评分找邻居
+def test_batch_recommendations_blend_knn_with_session_ratings(spy_blend, catalog):
+    session_ratings = {101: 5.0, 130: 1.0}
+    results = recommendation.recommend_batch([{'key': (('都市',), (), ()), 'session_ratings': session_ratings,
+                                               'n': 10}])
+    assert len(results[0][0]) == 10
+    (visitor,) = spy_blend
+    assert set(session_ratings) <= set(visitor[0].tolist())
+
+# 两侧分片只影响峰值内存：不同块大小得到相同的 top-k 邻居
+@pytest.mark.parametrize('block_size', [3, 7, 64])
+def test_block_size_does_not_change_neighbors(ratings, block_size):
+    args = (ratings['users'], ratings['items'], ratings['ratings'], list(range(40)), NOVEL_IDS.tolist())
+    expected = train_knn_model(*args, k=10, block_size=4096)
+    model = train_knn_model(*args, k=10, block_size=block_size, min_support=1)
+    np.testing.assert_array_equal(model['indptr'], expected['indptr'])
+    np.testing.assert_array_equal(model['neighbors'], expected['neighbors'])
+    np.testing.assert_allclose(model['sims'], expected['sims'], rtol=1e-6)
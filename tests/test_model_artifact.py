@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from model_artifact import load_artifact, publish_artifact
+
+def make_factors(user_raw, item_raw, n_factors=3):
+    rng = np.random.default_rng(0)
+    return {
+        'bu': rng.normal(size=len(user_raw)),
+        'bi': rng.normal(size=len(item_raw)),
+        'pu': rng.normal(size=(len(user_raw), n_factors)),
+        'qi': rng.normal(size=(len(item_raw), n_factors)),
+        'global_mean': 3.5,
+        'biased': True,
+        'rating_scale': (1, 5),
+        'user_ids': {raw: inner for inner, raw in enumerate(user_raw)},
+        'item_index': pd.Index(item_raw),
+        'item_inner': np.arange(len(item_raw), dtype=np.int64),
+    }
+
+# 原始 id 经发布 / 加载后不丢信息：整数 id 存为 int64，其他 id 存为字符串（不截断小数、不去掉前导零）
+@pytest.mark.parametrize('raw_ids, expected', [
+    ([3, 1, 2], [3, 1, 2]),
+    ([np.int64(5), 6], [5, 6]),
+    (['007', '7', 'x'], ['007', '7', 'x']),
+    ([1.5, 2.0], ['1.5', '2.0']),
+    ([1, 'a'], ['1', 'a']),
+])
+def test_raw_ids_round_trip(tmp_path, raw_ids, expected):
+    publish_artifact(make_factors(raw_ids, raw_ids), store=str(tmp_path))
+    factors = load_artifact(str(tmp_path))
+    assert factors['user_ids'].tolist() == expected
+    assert factors['item_index'].tolist() == expected
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('joblib')
+
+from mf_training import train_mf_sgd
+from parallel_sgd import DATA_NAMES, partition_ratings, train_mf_dsgd
+
+# 低秩模型生成的合成评分（每个 (用户, 小说) 至多一条）
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    n_users, n_items, n_ratings = 300, 120, 6000
+    pairs = rng.choice(n_users * n_items, n_ratings, replace=False)
+    users, items = (pairs // n_items).astype(np.int32), (pairs % n_items).astype(np.int32)
+    pu, qi = rng.normal(0, 0.5, (n_users, 5)), rng.normal(0, 0.5, (n_items, 5))
+    ratings = np.clip(3.5 + np.einsum('ij,ij->i', pu[users], qi[items]) + rng.normal(0, 0.1, n_ratings), 1, 5)
+    return {
+        'users': users,
+        'items': items,
+        'ratings': ratings.astype(np.float32),
+        'user_ids': {u: u for u in range(n_users)},
+        'item_ids': {i: i for i in range(n_items)},
+        'global_mean': float(ratings.mean()),
+    }
+
+def train_rmse(params, data):
+    users, items = data['users'], data['items']
+    est = (data['global_mean'] + params['bu'][users] + params['bi'][items]
+           + np.einsum('ij,ij->i', params['pu'][users], params['qi'][items]))
+    return float(np.sqrt(np.mean(np.square(est - data['ratings']))))
+
+def read_partition(data, n_blocks, store, chunk_rows):
+    offsets = partition_ratings(data, n_blocks, str(store), np.random.default_rng(1), chunk_rows=chunk_rows)
+    return offsets, {name: np.load(store / f'{name}.npy') for name in DATA_NAMES}
+
+@pytest.mark.parametrize('chunk_rows', [7, 1000, 1 << 20])
+def test_partition_keeps_every_rating_in_its_block(data, tmp_path, chunk_rows):
+    n_blocks = 3
+    offsets, blocks = read_partition(data, n_blocks, tmp_path, chunk_rows)
+    assert offsets[0] == 0 and offsets[-1] == len(data['ratings'])
+    original = sorted(zip(data['users'].tolist(), data['items'].tolist(), data['ratings'].tolist()))
+    assert sorted(zip(*(blocks[name].tolist() for name in DATA_NAMES))) == original
+    # 每个用户只出现在同一行的块里，每本小说只出现在同一列的块里
+    user_row, item_col = {}, {}
+    for b in range(n_blocks * n_blocks):
+        for u in blocks['users'][offsets[b]:offsets[b + 1]].tolist():
+            assert user_row.setdefault(u, b // n_blocks) == b // n_blocks
+        for i in blocks['items'][offsets[b]:offsets[b + 1]].tolist():
+            assert item_col.setdefault(i, b % n_blocks) == b % n_blocks
+
+def test_partition_does_not_depend_on_chunk_size(data, tmp_path):
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    offsets_a, blocks_a = read_partition(data, 4, tmp_path / 'a', 5)
+    offsets_b, blocks_b = read_partition(data, 4, tmp_path / 'b', 1 << 20)
+    np.testing.assert_array_equal(offsets_a, offsets_b)
+    for name in DATA_NAMES:
+        np.testing.assert_array_equal(blocks_a[name], blocks_b[name])
+
+def test_dsgd_matches_serial_sgd_rmse(data, tmp_path):
+    options = {'n_factors': 10, 'n_epochs': 15, 'batch_size': 64, 'verbose': False}
+    serial, _ = train_mf_sgd(data, **options)
+    parallel, _ = train_mf_dsgd(data, n_workers=2, work_dir=str(tmp_path), **options)
+    assert train_rmse(parallel, data) == pytest.approx(train_rmse(serial, data), abs=0.05)
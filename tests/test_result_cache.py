@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+import result_cache
+
+@pytest.fixture(autouse=True)
+def disk_key(monkeypatch):
+    monkeypatch.setattr(result_cache, 'DISK_KEY', b'test-key')
+    result_cache.clear_cache()
+
+# 磁盘后端不可写时照常返回计算结果，并计入 disk_errors
+def test_unwritable_disk_dir_falls_back_to_computed_value(tmp_path):
+    blocker = tmp_path / 'not-a-dir'
+    blocker.write_text('')
+    before = result_cache.cache_stats()['disk_errors']
+    value = result_cache.get_or_compute(('k',), 'v1', lambda: [1, 2, 3], disk_dir=str(blocker / 'cache'))
+    assert value == [1, 2, 3]
+    assert result_cache.cache_stats()['disk_errors'] == before + 1
+    # 结果仍留在内存缓存中
+    assert result_cache.get_or_compute(('k',), 'v1', lambda: None, disk_dir=str(blocker / 'cache')) == [1, 2, 3]
+
+# 清理时其他进程已删除的文件直接跳过
+def test_prune_skips_files_removed_concurrently(tmp_path, monkeypatch):
+    for i in range(3):
+        (tmp_path / f'{i}.pkl').write_bytes(b'')
+    entries = list(os.scandir(tmp_path))
+    os.remove(entries[0].path)
+    monkeypatch.setattr(result_cache.os, 'scandir', lambda path: iter(entries))
+    result_cache._disk_prune(str(tmp_path), ttl=0, max_entries=10)
+    assert not list(tmp_path.iterdir())
+
+# 同一版本的结果跨进程共享：另一进程（清空内存缓存后）从磁盘命中
+def test_disk_round_trip(tmp_path):
+    result_cache.get_or_compute(('k',), 'v1', lambda: {'a': 1}, disk_dir=str(tmp_path))
+    result_cache.clear_cache()
+    assert result_cache.get_or_compute(('k',), 'v1', lambda: None, disk_dir=str(tmp_path)) == {'a': 1}
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+surprise = pytest.importorskip('surprise')
+
+from svd_scoring import (align_item_ids, get_svd_factors, score_items, score_items_batch, top_n_indices,
+                         user_inner_id)
+
+# 目录中 80-99 号小说没有评分（模型未见过）
+NOVEL_IDS = np.arange(100)
+
+@pytest.fixture(scope='module')
+def algo_svd():
+    rng = np.random.default_rng(0)
+    ratings_df = pd.DataFrame({
+        'user_id': rng.integers(0, 50, 2000),
+        'novel_id': rng.integers(0, 80, 2000),
+        'rating': np.round(rng.uniform(1, 5, 2000), 1),
+    })
+    data = surprise.Dataset.load_from_df(ratings_df, surprise.Reader(rating_scale=(1, 5)))
+    algo_svd = surprise.SVD(n_factors=8, n_epochs=5, random_state=0)
+    algo_svd.fit(data.build_full_trainset())
+    return algo_svd
+
+@pytest.mark.parametrize('user_id', [-1, 0, 7])
+def test_score_items_matches_predict(algo_svd, user_id):
+    factors = get_svd_factors(algo_svd)
+    scores = score_items(factors, align_item_ids(factors, NOVEL_IDS), user_inner_id(factors, user_id))
+    expected = [algo_svd.predict(user_id, int(novel_id)).est for novel_id in NOVEL_IDS]
+    np.testing.assert_allclose(scores, expected, rtol=0, atol=1e-9)
+
+def test_score_items_batch_matches_score_items(algo_svd):
+    factors = get_svd_factors(algo_svd)
+    item_inner = align_item_ids(factors, NOVEL_IDS)
+    users = [None, user_inner_id(factors, 0), {'bu': 0.1, 'pu': np.full(factors['qi'].shape[1], 0.05)}]
+    batch = score_items_batch(factors, item_inner, users)
+    for row, user in enumerate(users):
+        np.testing.assert_allclose(batch[row], score_items(factors, item_inner, user), rtol=0, atol=1e-12)
+
+def test_top_n_matches_predict_loop(algo_svd):
+    factors = get_svd_factors(algo_svd)
+    scores = np.round(score_items(factors, align_item_ids(factors, NOVEL_IDS)), 2)
+    predictions = [(novel_id, round(algo_svd.predict(-1, int(novel_id)).est, 2)) for novel_id in NOVEL_IDS]
+    predictions.sort(key=lambda x: x[1], reverse=True)
+    assert NOVEL_IDS[top_n_indices(scores, 20)].tolist() == [novel_id for novel_id, _ in predictions[:20]]
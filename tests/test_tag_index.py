@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from tag_index import build_tag_index, tag_top_n
+
+PREFERRED_TAGS = ['都市', '异能', '修真', '玄幻']
+
+# 旧实现：逐行子串匹配，按命中数稳定排序
+def substring_top_n(novels_df, preferred_tags, n):
+    counts = [sum(1 for tag in preferred_tags if tag in str(tags)) for tags in novels_df['tags']]
+    order = sorted(range(len(counts)), key=lambda i: counts[i], reverse=True)
+    return [(i, counts[i]) for i in order if counts[i] > 0][:n]
+
+def test_tag_top_n_matches_substring_scan():
+    novels_df = pd.DataFrame({'tags': ['都市、异能', '玄幻,修真', '历史', None, '都市、玄幻、异能', '科幻 、 都市',
+                                       '修真、都市、玄幻、异能', '言情']})
+    rows, counts = tag_top_n(build_tag_index(novels_df), PREFERRED_TAGS, n=5)
+    assert list(zip(rows.tolist(), counts.tolist())) == substring_top_n(novels_df, PREFERRED_TAGS, 5)
+
+def test_tag_top_n_ignores_partial_tags():
+    # 子串扫描会把“修真者”“都市言情”误算为命中，索引只按完整标签匹配
+    novels_df = pd.DataFrame({'tags': ['修真者、历史', '都市言情', '都市']})
+    rows, counts = tag_top_n(build_tag_index(novels_df), PREFERRED_TAGS)
+    assert rows.tolist() == [2] and counts.tolist() == [1]
+    assert len(substring_top_n(novels_df, PREFERRED_TAGS, 10)) == 3
+
+def test_tag_top_n_candidates():
+    novels_df = pd.DataFrame({'tags': ['都市、异能', '玄幻', '都市', '历史']})
+    rows, counts = tag_top_n(build_tag_index(novels_df), PREFERRED_TAGS, candidates=np.array([1, 2, 3]))
+    assert rows.tolist() == [1, 2] and counts.tolist() == [1, 1]
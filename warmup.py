@@ -0,0 +1,99 @@
+import importlib
+import logging
+import os
+import threading
+import time
+
+from perf_trace import stage
+
+# 冷启动预热：进程启动后在后台线程中依次导入重量级模块、加载数据 / 模型 / 索引，
+# 界面首屏不必等待；各项耗时同时记入 perf_trace 计数器（import:模块名 / warmup:步骤名）
+WARMUP_ENABLED = os.environ.get('NOVEL_WARMUP', '1') != '0'
+
+# 按依赖顺序导入，每项耗时即该模块新增的导入开销；可选依赖缺失时记为跳过
+WARM_IMPORTS = ('numpy', 'pandas', 'pyarrow', 'surprise', 'joblib', 'recommendation', 'precompute_segments',
+                'result_cache', 'recommendation_service', 'feedback_log')
+OPTIONAL_IMPORTS = ('pyarrow', 'surprise', 'joblib')
+
+logger = logging.getLogger(__name__)
+
+_LOCK = threading.Lock()
+_READY = threading.Event()
+_STATE = {'state': 'idle', 'current': None, 'imports': [], 'stages': [], 'started': None, 'seconds': None,
+          'error': None}
+
+def _timed(kind, name, func, *args):
+    with _LOCK:
+        _STATE['current'] = name
+    start = time.perf_counter()
+    with stage(f"{'import' if kind == 'imports' else 'warmup'}:{name}"):
+        result = func(*args)
+    with _LOCK:
+        _STATE[kind].append({'name': name, 'ms': (time.perf_counter() - start) * 1000})
+    return result
+
+# 预热数据、模型和各类索引（都进入进程级缓存，之后的推荐请求直接命中）
+def _warm_resources():
+    from filter_index import get_filter_index
+    from precompute_segments import load_segments_cached
+    from recommendation import (load_ann_index_cached, load_catalog_data, load_knn_model_cached,
+                                load_svd_model)
+    from svd_scoring import get_item_alignment, get_svd_factors
+    from tag_index import get_tag_index
+
+    _, novels_df = _timed('stages', 'catalog_data', load_catalog_data)
+    algo_svd = _timed('stages', 'svd_model', load_svd_model)
+    if not novels_df.empty:
+        _timed('stages', 'tag_index', get_tag_index, novels_df)
+        _timed('stages', 'filter_index', get_filter_index, novels_df)
+        if algo_svd is not None:
+            _timed('stages', 'item_alignment', get_item_alignment, get_svd_factors(algo_svd), novels_df)
+    _timed('stages', 'knn_model', load_knn_model_cached)
+    _timed('stages', 'ann_index', load_ann_index_cached)
+    _timed('stages', 'segment_table', load_segments_cached)
+
+def _run():
+    try:
+        for module in WARM_IMPORTS:
+            try:
+                _timed('imports', module, importlib.import_module, module)
+            except ImportError:
+                if module not in OPTIONAL_IMPORTS:
+                    raise
+        _warm_resources()
+        state, error = 'ready', None
+    except Exception as e:  # 预热失败不影响服务：首个请求时照常同步加载并报错
+        state, error = 'failed', f"{type(e).__name__}: {e}"
+    with _LOCK:
+        _STATE.update(state=state, error=error, current=None, seconds=time.perf_counter() - _STATE['started'])
+    _READY.set()
+    if error:
+        logger.warning("预热失败: %.2f s（%s）", _STATE['seconds'], error)
+    else:
+        logger.info("预热完成: %.2f s", _STATE['seconds'])
+
+# 启动后台预热（每个进程只启动一次，重复调用无效）
+def start_warmup():
+    with _LOCK:
+        if _STATE['state'] != 'idle':
+            return
+        _STATE.update(state='warming', started=time.perf_counter())
+    threading.Thread(target=_run, name='warmup', daemon=True).start()
+
+# 预热已结束（成功或失败）；未启动预热时视为已就绪
+def warmup_done():
+    return _STATE['state'] == 'idle' or _READY.is_set()
+
+# 等待预热结束，超时返回 False
+def wait_for_warmup(timeout=None):
+    return warmup_done() or _READY.wait(timeout)
+
+# 预热状态与耗时明细（导入 / 预热步骤各自的毫秒数）
+def warmup_report():
+    with _LOCK:
+        report = {key: list(value) if isinstance(value, list) else value for key, value in _STATE.items()}
+    if report['state'] == 'warming':
+        report['seconds'] = time.perf_counter() - report['started']
+    report['import_ms'] = sum(item['ms'] for item in report['imports'])
+    report['warmup_ms'] = sum(item['ms'] for item in report['stages'])
+    return report